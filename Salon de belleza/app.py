@@ -251,6 +251,54 @@ sistema = inicializar_sistema()
 if sistema is None:
     st.stop()
 
+# ============================================
+# CONSULTAS CACHEADAS
+# ============================================
+# Cada interacción vuelve a ejecutar el script entero. Las consultas se
+# cachean con una etiqueta de los datos como clave: mientras nadie escriba
+# (desde esta u otra sesión o proceso) se reutiliza el resultado en lugar de
+# volver a leer los archivos. La fecha forma parte de la clave porque las
+# estadísticas cuentan los turnos futuros. Los servicios no pasan por aquí:
+# el catálogo ya los tiene en memoria y copiarlos desde la caché costaría más.
+
+def etag_datos():
+    """Etiqueta barata que cambia con cada escritura de turnos o servicios y con el día."""
+    return f"{sistema.turno_repository.obtener_etag()}-{date.today().isoformat()}"
+
+@st.cache_data(show_spinner=False, max_entries=100)
+def _obtener_estadisticas_cache(etag):
+    return sistema.obtener_estadisticas()
+
+@st.cache_data(show_spinner=False, max_entries=100)
+def _obtener_turnos_cache(etag, fecha, profesional_id, estado, limite, despues):
+    return sistema.obtener_turnos(
+        fecha=fecha, profesional_id=profesional_id, estado=estado, limite=limite, despues=despues
+    )
+
+@st.cache_data(show_spinner=False, max_entries=100)
+def _contar_turnos_cache(etag, fecha, profesional_id, estado):
+    return sistema.contar_turnos(fecha=fecha, profesional_id=profesional_id, estado=estado)
+
+@st.cache_data(show_spinner=False, max_entries=100)
+def _obtener_turnos_rango_cache(etag, desde, hasta):
+    return sistema.obtener_turnos_rango(desde, hasta)
+
+def obtener_estadisticas_cache():
+    """Como sistema.obtener_estadisticas(), cacheado hasta la próxima escritura."""
+    return _obtener_estadisticas_cache(etag_datos())
+
+def obtener_turnos_cache(fecha=None, profesional_id=None, estado=None, limite=None, despues=None):
+    """Como sistema.obtener_turnos(), cacheado hasta la próxima escritura."""
+    return _obtener_turnos_cache(etag_datos(), fecha, profesional_id, estado, limite, despues)
+
+def contar_turnos_cache(fecha=None, profesional_id=None, estado=None):
+    """Como sistema.contar_turnos(), cacheado hasta la próxima escritura."""
+    return _contar_turnos_cache(etag_datos(), fecha, profesional_id, estado)
+
+def obtener_turnos_rango_cache(desde, hasta):
+    """Como sistema.obtener_turnos_rango(), cacheado hasta la próxima escritura."""
+    return _obtener_turnos_rango_cache(etag_datos(), desde, hasta)
+
 # ============================================
 # COMPONENTES REUTILIZABLES
 # ============================================
@@ -368,7 +416,7 @@ def mostrar_dashboard():
     mostrar_encabezado_pagina("Dashboard Principal")
     
     # Fila de métricas principales
-    stats = sistema.obtener_estadisticas()
+    stats = obtener_estadisticas_cache()
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -383,7 +431,7 @@ def mostrar_dashboard():
     with col2:
         st.markdown(crear_metrica(
             "TURNOS HOY",
-            len(sistema.obtener_turnos(fecha=datetime.now().strftime("%Y-%m-%d"))),
+            len(obtener_turnos_cache(fecha=datetime.now().strftime("%Y-%m-%d"))),
             "🎯",
             "#870847"
         ), unsafe_allow_html=True)
@@ -446,7 +494,7 @@ def mostrar_dashboard():
         st.subheader("📅 Turnos de Hoy")
         
         fecha_hoy = datetime.now().strftime("%Y-%m-%d")
-        turnos_hoy = sistema.obtener_turnos(fecha=fecha_hoy)
+        turnos_hoy = obtener_turnos_cache(fecha=fecha_hoy)
         
         if turnos_hoy:
             # Crear contenedor con scroll
@@ -468,11 +516,10 @@ def mostrar_dashboard():
     # Próximos turnos (3 días)
     st.subheader("📅 Próximos Turnos (3 días)")
     
-    proximos_turnos = []
-    for i in range(3):
-        fecha = (datetime.now() + timedelta(days=i)).strftime("%Y-%m-%d")
-        turnos_dia = sistema.obtener_turnos(fecha=fecha)
-        proximos_turnos.extend(turnos_dia)
+    proximos_turnos = obtener_turnos_rango_cache(
+        datetime.now().strftime("%Y-%m-%d"),
+        (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%d")
+    )
     
     if proximos_turnos:
         # Crear DataFrame para mostrar
@@ -592,6 +639,11 @@ def mostrar_crear_turno():
                     st.warning("⚠️ No hay horarios disponibles para esta fecha")
             else:
                 st.error("❌ El salón está cerrado este día")
+                huecos = list(sistema.buscar_proximos_huecos(servicio_seleccionado.id, fecha_str, 5))
+                if huecos:
+                    st.info("🔎 Próximos horarios libres: " + ", ".join(
+                        f"{hueco['fecha']} {hueco['hora']}" for hueco in huecos
+                    ))
                 return
         
         st.markdown("---")
@@ -624,13 +676,29 @@ def mostrar_crear_turno():
                         key=f"hora_{horario}",
                         use_container_width=True
                     ):
+                        # Liberar el bloqueo anterior y reservar el nuevo horario
+                        if 'bloqueo_id' in st.session_state:
+                            sistema.liberar_bloqueo(st.session_state.pop('bloqueo_id'))
+                        
+                        bloqueado, mensaje_bloqueo, bloqueo = sistema.bloquear_horario(
+                            fecha_str, horario, servicio_seleccionado.id
+                        )
                         horario_seleccionado = horario
                         st.session_state['horario_seleccionado'] = horario
+                        if bloqueado:
+                            st.session_state['bloqueo_id'] = bloqueo["id"]
+                        else:
+                            st.warning(f"⚠️ {horario}: {mensaje_bloqueo}")
             
             # Si hay horario seleccionado, mostrarlo
             if 'horario_seleccionado' in st.session_state:
                 horario_seleccionado = st.session_state['horario_seleccionado']
                 st.success(f"✅ **Horario seleccionado:** {horario_seleccionado}")
+                if 'bloqueo_id' in st.session_state:
+                    st.caption(
+                        f"⏳ El horario queda reservado por {sistema.bloqueos.duracion_segundos // 60} minutos "
+                        "mientras completas los datos"
+                    )
         else:
             st.warning("⚠️ No hay horarios disponibles para esta fecha")
             return
@@ -699,7 +767,9 @@ def mostrar_crear_turno():
                         servicio_id=servicio_seleccionado.id,
                         telefono=telefono,
                         email=email,
-                        profesional_id=profesional_id
+                        profesional_id=profesional_id,
+                        asignar_automaticamente=profesional_id is None,
+                        bloqueo_id=st.session_state.get('bloqueo_id')
                     )
                     
                     if exito:
@@ -725,7 +795,7 @@ def mostrar_crear_turno():
                         """, unsafe_allow_html=True)
                         
                         # Limpiar selecciones
-                        for key in ['servicio_seleccionado', 'horario_seleccionado', 'fecha_seleccionada']:
+                        for key in ['servicio_seleccionado', 'horario_seleccionado', 'fecha_seleccionada', 'bloqueo_id']:
                             if key in st.session_state:
                                 del st.session_state[key]
                     else:
@@ -784,6 +854,9 @@ def mostrar_crear_turno():
 # PÁGINA: GESTIÓN DE TURNOS
 # ============================================
 
+TURNOS_POR_PAGINA = [10, 20, 50]
+ESTADOS_TURNO = ["pendiente", "confirmado", "completado", "cancelado"]
+
 def mostrar_gestion_turnos():
     """Interfaz para gestionar turnos existentes."""
     mostrar_encabezado_pagina("Gestión de Turnos", "📋")
@@ -801,11 +874,11 @@ def mostrar_gestion_turnos():
         with col_busq2:
             estado_filtro = st.selectbox(
                 "📊 Filtrar por estado",
-                options=["Todos", "pendiente", "confirmado", "completado", "cancelado"]
+                options=["Todos"] + ESTADOS_TURNO
             )
         
         with col_busq3:
-            st.write("")  # Espaciador
+            por_pagina = st.selectbox("📄 Por página", options=TURNOS_POR_PAGINA)
             if st.button("🔍 Buscar", use_container_width=True):
                 st.session_state['buscar_turnos'] = True
     
@@ -833,16 +906,29 @@ def mostrar_gestion_turnos():
         
         if 'turno_especifico' in st.session_state:
             turnos = [st.session_state['turno_especifico']]
+            total = 1
+            hay_siguiente = False
             mostrar_especifico = True
         else:
-            if fecha_filtro:
-                fecha_str = fecha_filtro.strftime("%Y-%m-%d")
-                turnos = sistema.obtener_turnos(fecha=fecha_str)
-            else:
-                turnos = sistema.obtener_turnos()
+            fecha_str = fecha_filtro.strftime("%Y-%m-%d") if fecha_filtro else None
+            estado_str = estado_filtro if estado_filtro != "Todos" else None
             
-            if estado_filtro != "Todos":
-                turnos = [t for t in turnos if t.estado == estado_filtro]
+            # Paginación por cursor: se guarda la clave del último turno de cada
+            # página ya vista, así cada página se pide directamente al sistema
+            # sin cargar las anteriores. Cambiar un filtro vuelve a la primera.
+            filtros = (fecha_str, estado_str, por_pagina)
+            if st.session_state.get('filtros_turnos') != filtros:
+                st.session_state['filtros_turnos'] = filtros
+                st.session_state['cursores_turnos'] = [None]
+            cursores = st.session_state['cursores_turnos']
+            
+            # Se pide uno de más para saber si hay otra página
+            turnos = obtener_turnos_cache(
+                fecha=fecha_str, estado=estado_str, limite=por_pagina + 1, despues=cursores[-1]
+            )
+            hay_siguiente = len(turnos) > por_pagina
+            turnos = turnos[:por_pagina]
+            total = contar_turnos_cache(fecha=fecha_str, estado=estado_str)
             
             mostrar_especifico = False
         
@@ -850,14 +936,21 @@ def mostrar_gestion_turnos():
             st.info("📭 No se encontraron turnos con los filtros aplicados")
             if 'turno_especifico' in st.session_state:
                 del st.session_state['turno_especifico']
+            elif len(cursores) > 1:
+                # La página quedó vacía (se borraron sus turnos): volver al inicio
+                if st.button("⏮️ Volver a la primera página"):
+                    st.session_state['cursores_turnos'] = [None]
+                    st.rerun()
         else:
-            st.subheader(f"📋 {len(turnos)} Turno{'s' if len(turnos) != 1 else ''} Encontrado{'s' if len(turnos) != 1 else ''}")
+            st.subheader(f"📋 {total} Turno{'s' if total != 1 else ''} Encontrado{'s' if total != 1 else ''}")
             
-            # Contador de turnos por estado
-            if not mostrar_especifico and len(turnos) > 1:
+            # Contador de turnos por estado (contados por el sistema, sin cargarlos)
+            if not mostrar_especifico and total > 1:
                 conteo_estados = {}
-                for turno in turnos:
-                    conteo_estados[turno.estado] = conteo_estados.get(turno.estado, 0) + 1
+                for estado in ([estado_str] if estado_str else ESTADOS_TURNO):
+                    cantidad = contar_turnos_cache(fecha=fecha_str, estado=estado)
+                    if cantidad:
+                        conteo_estados[estado] = cantidad
                 
                 cols_contadores = st.columns(len(conteo_estados))
                 for idx, (estado, cantidad) in enumerate(conteo_estados.items()):
@@ -872,6 +965,12 @@ def mostrar_gestion_turnos():
                 with st.container():
                     st.markdown(crear_tarjeta_turno(turno), unsafe_allow_html=True)
                     
+                    # Versión con la que se mostró el turno antes del clic: si otro
+                    # usuario lo modificó en el medio, confirmar/cancelar se rechaza
+                    clave_version = f'version_turno_{turno.id}'
+                    version_vista = st.session_state.get(clave_version, turno.version)
+                    st.session_state[clave_version] = turno.version
+                    
                     # Botones de acción
                     col_acc1, col_acc2, col_acc3, col_acc4 = st.columns(4)
                     
@@ -882,25 +981,31 @@ def mostrar_gestion_turnos():
                     with col_acc2:
                         if turno.estado in ["pendiente", "confirmado"]:
                             if st.button(f"✅ Confirmar", key=f"conf_{turno.id}", use_container_width=True):
-                                exito, mensaje = sistema.confirmar_turno(str(turno.id))
+                                exito, mensaje = sistema.confirmar_turno(str(turno.id), version_vista)
                                 if exito:
                                     st.success(mensaje)
                                     st.rerun()
+                                else:
+                                    st.error(mensaje)
                     
                     with col_acc3:
                         if turno.estado in ["pendiente", "confirmado"]:
                             if st.button(f"❌ Cancelar", key=f"canc_{turno.id}", use_container_width=True):
-                                exito, mensaje = sistema.cancelar_turno(str(turno.id))
+                                exito, mensaje = sistema.cancelar_turno(str(turno.id), version_vista)
                                 if exito:
                                     st.success(mensaje)
                                     st.rerun()
+                                else:
+                                    st.error(mensaje)
                     
                     with col_acc4:
                         if st.button(f"🗑️ Eliminar", key=f"elim_{turno.id}", use_container_width=True):
-                            exito = sistema.turno_repository.eliminar_turno(str(turno.id))
+                            exito, mensaje = sistema.eliminar_turno(str(turno.id))
                             if exito:
-                                st.success("Turno eliminado")
+                                st.success(mensaje)
                                 st.rerun()
+                            else:
+                                st.error(mensaje)
                     
                     # Detalles expandibles
                     if st.session_state.get(f'detalle_{turno.id}', False):
@@ -929,15 +1034,38 @@ def mostrar_gestion_turnos():
                                     st.write(f"**Notas:** {turno.notas_internas}")
                     
                     st.markdown("---")
+            
+            # Navegación entre páginas
+            if not mostrar_especifico and (hay_siguiente or len(cursores) > 1):
+                col_ant, col_pag, col_sig = st.columns([1, 2, 1])
+                
+                with col_ant:
+                    if st.button("⬅️ Anterior", disabled=len(cursores) == 1, use_container_width=True):
+                        cursores.pop()
+                        st.rerun()
+                
+                with col_pag:
+                    paginas = max(1, -(-total // por_pagina))
+                    st.markdown(
+                        f"<p style='text-align: center;'>Página {len(cursores)} de {paginas}</p>",
+                        unsafe_allow_html=True
+                    )
+                
+                with col_sig:
+                    if st.button("Siguiente ➡️", disabled=not hay_siguiente, use_container_width=True):
+                        cursores.append(turnos[-1].clave_orden)
+                        st.rerun()
     
     else:
-        # Vista por defecto: turnos de hoy y mañana
+        # Vista por defecto: turnos de hoy y mañana (una sola consulta)
         col_hoy, col_manana = st.columns(2)
+        fecha_hoy = datetime.now().strftime("%Y-%m-%d")
+        fecha_manana = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+        turnos_dos_dias = obtener_turnos_rango_cache(fecha_hoy, fecha_manana)
         
         with col_hoy:
             st.subheader("📅 Turnos de Hoy")
-            fecha_hoy = datetime.now().strftime("%Y-%m-%d")
-            turnos_hoy = sistema.obtener_turnos(fecha=fecha_hoy)
+            turnos_hoy = [t for t in turnos_dos_dias if t.fecha == fecha_hoy]
             
             if turnos_hoy:
                 for turno in turnos_hoy[:3]:
@@ -949,8 +1077,7 @@ def mostrar_gestion_turnos():
         
         with col_manana:
             st.subheader("📅 Turnos de Mañana")
-            fecha_manana = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
-            turnos_manana = sistema.obtener_turnos(fecha=fecha_manana)
+            turnos_manana = [t for t in turnos_dos_dias if t.fecha == fecha_manana]
             
             if turnos_manana:
                 for turno in turnos_manana[:3]:
@@ -989,7 +1116,7 @@ def mostrar_servicios():
     # Estadísticas de servicios
     st.markdown("### 📊 Estadísticas de Servicios")
     
-    turnos = sistema.obtener_turnos()
+    turnos = obtener_turnos_cache()
     
     if turnos:
         # Contar turnos por servicio
@@ -1105,7 +1232,7 @@ def mostrar_profesionales():
     for profesional in profesionales:
         with st.expander(f"👩‍💼 Agenda de {profesional['nombre']}", expanded=False):
             # Obtener turnos del profesional
-            turnos_prof = sistema.obtener_turnos(profesional_id=profesional['id'])
+            turnos_prof = obtener_turnos_cache(profesional_id=profesional['id'])
             
             if turnos_prof:
                 # Agrupar por fecha
@@ -1153,7 +1280,7 @@ def mostrar_estadisticas():
     with tab1:
         st.markdown("### 📊 Estadísticas Generales")
         
-        stats = sistema.obtener_estadisticas()
+        stats = obtener_estadisticas_cache()
         
         # Métricas principales
         col1, col2, col3 = st.columns(3)
@@ -1222,7 +1349,7 @@ def mostrar_estadisticas():
     with tab2:
         st.markdown("### 📅 Análisis Temporal")
         
-        turnos = sistema.obtener_turnos()
+        turnos = obtener_turnos_cache()
         
         if turnos:
             # Convertir a DataFrame
@@ -1282,7 +1409,7 @@ def mostrar_estadisticas():
     with tab3:
         st.markdown("### 👥 Análisis de Clientes")
         
-        turnos = sistema.obtener_turnos()
+        turnos = obtener_turnos_cache()
         
         if turnos:
             # Clientes más frecuentes
@@ -1361,7 +1488,7 @@ def mostrar_configuracion():
             """, unsafe_allow_html=True)
         
         with col_info2:
-            stats = sistema.obtener_estadisticas()
+            stats = obtener_estadisticas_cache()
             st.markdown(f"""
             <div class="tarjeta-rosa">
                 <h4>📊 Estadísticas Actuales</h4>
@@ -1382,12 +1509,15 @@ def mostrar_configuracion():
             if st.button("🔄 Recargar Datos", use_container_width=True):
                 sistema._cargar_servicios()
                 sistema._cargar_profesionales()
+                sistema.calendario.recargar_configuracion()
+                st.cache_data.clear()
                 st.success("✅ Datos recargados exitosamente")
                 st.rerun()
         
         with col_her2:
             if st.button("🧹 Limpiar Cache", use_container_width=True):
                 st.cache_resource.clear()
+                st.cache_data.clear()
                 st.success("✅ Cache limpiado exitosamente")
                 st.rerun()
         
@@ -1485,7 +1615,7 @@ st.sidebar.markdown("<hr style='border-color: rgba(255, 255, 255, 0.2);'>", unsa
 
 # Mostrar información actual
 hoy = datetime.now().strftime("%d/%m/%Y")
-turnos_hoy = len(sistema.obtener_turnos(fecha=datetime.now().strftime("%Y-%m-%d")))
+turnos_hoy = len(obtener_turnos_cache(fecha=datetime.now().strftime("%Y-%m-%d")))
 
 st.sidebar.markdown(f"""
 <div style="background: rgba(255, 255, 255, 0.1); padding: 15px; border-radius: 10px; margin: 10px 0;">
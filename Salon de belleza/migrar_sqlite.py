@@ -0,0 +1,32 @@
+# migrar_sqlite.py
+"""
+Migra los turnos de data/turnos.json a la base SQLite (data/turnos.db).
+
+Uso:
+    python migrar_sqlite.py [directorio_datos]
+
+Después de migrar, activar el almacenamiento en data/config.json:
+    "almacenamiento": {"tipo": "sqlite"}
+"""
+import sys
+import os
+
+# Agregar el directorio actual al path para importaciones
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from salon_belleza.persistence.sqlite_storage import migrar_turnos_json
+
+def main():
+    """Función principal."""
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else "data"
+    
+    if not os.path.exists(os.path.join(data_dir, "turnos.json")):
+        print(f"❌ No se encontró {data_dir}/turnos.json")
+        return 1
+    
+    migrados = migrar_turnos_json(data_dir)
+    print(f"✅ {migrados} turnos migrados a {data_dir}/turnos.db")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -18,7 +18,8 @@ def mostrar_menu_principal():
     print("5. Ver estadísticas")
     print("6. Listar servicios")
     print("7. Listar profesionales")
-    print("8. Salir")
+    print("8. Crear reserva múltiple")
+    print("9. Salir")
     print("="*60)
 
 def crear_turno_interactivo(sistema: SistemaSalon):
@@ -31,6 +32,7 @@ def crear_turno_interactivo(sistema: SistemaSalon):
     for servicio in servicios:
         print(f"  {servicio.id}. {servicio.nombre} ({servicio.duracion_minutos}min - ${servicio.precio_base})")
     
+    bloqueo_id = None
     try:
         servicio_id = int(input("\nID del servicio: "))
         
@@ -77,6 +79,17 @@ def crear_turno_interactivo(sistema: SistemaSalon):
             print("  ⚠️  No hay profesionales disponibles para este horario")
             profesional_id = None
         
+        # Reservar el horario mientras se cargan los datos del cliente
+        bloqueado, mensaje, bloqueo = sistema.bloquear_horario(fecha, hora, servicio_id, profesional_id)
+        if bloqueado:
+            bloqueo_id = bloqueo["id"]
+            print(f"\n⏳ {mensaje}")
+        elif profesional_id:
+            print(f"\n❌ {mensaje}")
+            return
+        else:
+            print(f"\n⚠️  {mensaje}: el turno quedará sin profesional asignado")
+        
         # Datos del cliente
         print("\nDatos del cliente:")
         cliente_nombre = input("Nombre completo: ")
@@ -104,7 +117,8 @@ def crear_turno_interactivo(sistema: SistemaSalon):
                 servicio_id=servicio_id,
                 telefono=telefono,
                 email=email,
-                profesional_id=profesional_id
+                profesional_id=profesional_id,
+                bloqueo_id=bloqueo_id
             )
             
             if exito:
@@ -119,6 +133,58 @@ def crear_turno_interactivo(sistema: SistemaSalon):
         print(f"\n❌ Error: {e}")
     except KeyboardInterrupt:
         print("\n\n❌ Operación cancelada por el usuario")
+    finally:
+        # Si el turno no se creó, el horario vuelve a quedar libre
+        if bloqueo_id is not None:
+            sistema.liberar_bloqueo(bloqueo_id)
+
+def crear_reserva_multiple_interactiva(sistema: SistemaSalon):
+    """Guía interactiva para reservar varios servicios el mismo día."""
+    print("\n--- CREAR RESERVA MÚLTIPLE ---")
+    
+    print("\nServicios disponibles:")
+    for servicio in sistema.obtener_servicios():
+        print(f"  {servicio.id}. {servicio.nombre} ({servicio.duracion_minutos}min - ${servicio.precio_base})")
+    
+    try:
+        ids = input("\nIDs de los servicios separados por coma: ")
+        servicio_ids = [int(valor) for valor in ids.split(",") if valor.strip()]
+        
+        from datetime import datetime, timedelta
+        fecha_ejemplo = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+        fecha = input(f"Fecha ({fecha_ejemplo}): ") or fecha_ejemplo
+        hora = input("Hora de inicio (Enter para la primera disponible): ").strip() or None
+        paralelo = input("¿Permitir servicios simultáneos? (s/n): ").lower() != "n"
+        
+        print("\nDatos del cliente:")
+        cliente_nombre = input("Nombre completo: ")
+        telefono = input("Teléfono (opcional): ")
+        email = input("Email (opcional): ")
+        
+        exito, mensaje, reserva = sistema.crear_reserva_multiple(
+            cliente_nombre=cliente_nombre,
+            fecha=fecha,
+            servicio_ids=servicio_ids,
+            telefono=telefono,
+            email=email,
+            hora=hora,
+            paralelo=paralelo
+        )
+        
+        if exito:
+            print(f"\n✅ {mensaje}")
+            for turno in reserva.turnos:
+                servicio = sistema.obtener_servicio_por_id(turno.servicio_id)
+                profesional = sistema.obtener_profesional_por_id(turno.profesional_id) if turno.profesional_id else None
+                print(f"   {turno.hora} - {servicio.nombre if servicio else 'N/A'} "
+                      f"({profesional['nombre'] if profesional else 'Sin asignar'}) - ID {turno.id}")
+        else:
+            print(f"\n❌ {mensaje}")
+    
+    except ValueError as e:
+        print(f"\n❌ Error: {e}")
+    except KeyboardInterrupt:
+        print("\n\n❌ Operación cancelada por el usuario")
 
 def ver_turnos_dia(sistema: SistemaSalon):
     """Muestra los turnos del día actual."""
@@ -170,6 +236,7 @@ def buscar_disponibilidad(sistema: SistemaSalon):
         
         if not disponibilidad.get("abierto", False):
             print(f"\n❌ El salón está cerrado el {fecha}")
+            mostrar_proximos_huecos(sistema, servicio_id, fecha)
             return
         
         print(f"\n📅 Disponibilidad para {fecha}:")
@@ -189,6 +256,17 @@ def buscar_disponibilidad(sistema: SistemaSalon):
     except ValueError as e:
         print(f"\n❌ Error: {e}")
 
+def mostrar_proximos_huecos(sistema: SistemaSalon, servicio_id: int, desde: str, cantidad: int = 10):
+    """Muestra los próximos horarios libres a partir de una fecha."""
+    huecos = list(sistema.buscar_proximos_huecos(servicio_id, desde, cantidad))
+    if not huecos:
+        print("   No hay horarios libres dentro del período de reservas")
+        return
+    
+    print("\n🔎 Próximos horarios libres:")
+    for hueco in huecos:
+        print(f"  • {hueco['fecha']} {hueco['hora']}")
+
 def cancelar_turno(sistema: SistemaSalon):
     """Cancela un turno existente."""
     print("\n--- CANCELAR TURNO ---")
@@ -289,7 +367,7 @@ def main():
             mostrar_menu_principal()
             
             try:
-                opcion = input("\nSeleccione una opción (1-8): ")
+                opcion = input("\nSeleccione una opción (1-9): ")
                 
                 if opcion == "1":
                     crear_turno_interactivo(sistema)
@@ -306,6 +384,8 @@ def main():
                 elif opcion == "7":
                     listar_profesionales(sistema)
                 elif opcion == "8":
+                    crear_reserva_multiple_interactiva(sistema)
+                elif opcion == "9":
                     print("\n👋 ¡Gracias por usar el sistema! Hasta pronto.")
                     break
                 else:
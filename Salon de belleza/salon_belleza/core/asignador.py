@@ -0,0 +1,359 @@
+# salon_belleza/core/asignador.py
+"""
+Asignación automática de profesionales y recursos a los turnos de un día.
+"""
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterable, FrozenSet
+from ..models.turno import Turno
+from ..models.servicio import Servicio
+from ..persistence.indice_intervalos import IndiceIntervalos
+
+# Asignación de un turno: (profesional_id, recurso)
+Asignacion = Tuple[Any, str]
+
+class AsignadorTurnos:
+    """
+    Asigna a cada turno un profesional especializado y un recurso libre.
+    
+    El objetivo es ubicar la mayor cantidad de turnos posible y, entre
+    soluciones con la misma cantidad (y los mismos minutos de trabajo),
+    repartir esos minutos de forma pareja entre profesionales.
+    
+    Se usa una heurística voraz (turnos ordenados por hora de fin, cada uno
+    al profesional menos cargado que esté libre) y, si hay pocos turnos,
+    una búsqueda exacta con poda que parte de la solución voraz.
+    """
+    
+    LIMITE_EXACTO = 8
+    MAX_NODOS = 200000
+    
+    def __init__(self, profesionales: List[Dict[str, Any]],
+                 obtener_servicio: Callable[[Any], Optional[Servicio]]):
+        """
+        Inicializa el asignador.
+        
+        Args:
+            profesionales: Profesionales que pueden recibir turnos
+            obtener_servicio: Función que devuelve el Servicio de un ID
+        """
+        self.profesionales = profesionales
+        self.obtener_servicio = obtener_servicio
+    
+    def opciones(self, servicio: Servicio, profesional_id: Optional[Any] = None) -> List[Asignacion]:
+        """
+        Lista los pares (profesional, recurso) que pueden atender un servicio.
+        
+        Los recursos de cada profesional salen de `recursos_posibles`, con su
+        `preferencia_recurso` primero; los servicios que requieren camilla
+        solo pueden usar la camilla.
+        
+        Args:
+            servicio: Servicio a realizar
+            profesional_id: (Opcional) Limitar a un profesional
+            
+        Returns:
+            Lista de tuplas (profesional_id, recurso) en orden de preferencia
+        """
+        opciones = []
+        for profesional in self.profesionales:
+            if profesional_id is not None and profesional.get("id") != profesional_id:
+                continue
+            if servicio.id not in profesional.get("especialidades", []):
+                continue
+            opciones.extend(
+                (profesional["id"], recurso) for recurso in self.recursos_para(servicio, profesional)
+            )
+        return opciones
+    
+    @staticmethod
+    def recursos_para(servicio: Servicio, profesional: Dict[str, Any]) -> List[str]:
+        """Recursos que puede usar un profesional para un servicio, el preferido primero."""
+        if servicio.requiere_camilla:
+            return ["camilla"]
+        preferido = profesional.get("preferencia_recurso", "mesa_1")
+        return list(dict.fromkeys([preferido] + profesional.get("recursos_posibles", [])))
+    
+    def _intervalo(self, turno: Turno) -> Tuple[int, int]:
+        """Obtiene [inicio, fin) en minutos según la duración del servicio."""
+        servicio = self.obtener_servicio(turno.servicio_id)
+        inicio = turno.inicio_minutos
+        if servicio is None:
+            return inicio, turno.fin_minutos
+        return inicio, inicio + servicio.duracion_minutos
+    
+    def asignar(self, pendientes: Iterable[Turno], fijos: Iterable[Turno] = (),
+                exacto: Optional[bool] = None) -> Dict[Any, Optional[Asignacion]]:
+        """
+        Calcula profesional y recurso para turnos del mismo día.
+        
+        Args:
+            pendientes: Turnos a asignar
+            fijos: Turnos que ya tienen profesional o recurso y no se mueven
+            exacto: True fuerza la búsqueda exacta, False usa solo la
+                heurística; por defecto es exacta con hasta LIMITE_EXACTO turnos
+                
+        Returns:
+            {ID del turno: (profesional_id, recurso) o None si no entra}
+        """
+        estado = _Estado()
+        for turno in fijos:
+            if turno.estado == "cancelado":
+                continue
+            inicio, fin = self._intervalo(turno)
+            estado.ocupar(turno.profesional_id, turno.recurso, inicio, fin, turno.id)
+        
+        # Turnos con sus opciones, ordenados por hora de fin (planificación de intervalos)
+        tareas = []
+        for turno in pendientes:
+            servicio = self.obtener_servicio(turno.servicio_id)
+            opciones = self.opciones(servicio) if servicio else []
+            inicio, fin = self._intervalo(turno)
+            tareas.append((fin, inicio, turno.id, opciones))
+        tareas.sort(key=lambda tarea: (tarea[0], tarea[1]))
+        
+        solucion = self._voraz(estado, tareas)
+        if exacto or (exacto is None and len(tareas) <= self.LIMITE_EXACTO):
+            solucion = self._exacta(estado, tareas, solucion)
+        
+        return {tarea[2]: asignacion for tarea, asignacion in zip(tareas, solucion)}
+    
+    def _voraz(self, estado: '_Estado', tareas: List[Tuple]) -> List[Optional[Asignacion]]:
+        """Asigna cada turno al profesional libre menos cargado."""
+        solucion = []
+        colocados = []
+        for fin, inicio, clave, opciones in tareas:
+            libres = [
+                (estado.carga.get(profesional, 0), orden, profesional, recurso)
+                for orden, (profesional, recurso) in enumerate(opciones)
+                if estado.libre(profesional, recurso, inicio, fin)
+            ]
+            if libres:
+                _, _, profesional, recurso = min(libres)
+                estado.ocupar(profesional, recurso, inicio, fin, clave)
+                colocados.append((profesional, recurso, inicio, fin, clave))
+                solucion.append((profesional, recurso))
+            else:
+                solucion.append(None)
+        
+        # Dejar el estado como estaba para la búsqueda exacta
+        for colocado in colocados:
+            estado.liberar(*colocado)
+        return solucion
+    
+    def _exacta(self, estado: '_Estado', tareas: List[Tuple],
+                inicial: List[Optional[Asignacion]]) -> List[Optional[Asignacion]]:
+        """
+        Busca la mejor asignación por backtracking con poda.
+        
+        Compara (turnos ubicados, minutos ubicados, -suma de cargas al
+        cuadrado) y parte de la solución voraz; si se agota MAX_NODOS
+        devuelve la mejor encontrada. Con los mismos minutos repartidos, la
+        suma de cuadrados es menor cuanto más parejo es el reparto.
+        """
+        # Carga de los turnos fijos solamente: durante la búsqueda estado.carga
+        # incluye además los pendientes ya ubicados, que se suman aparte
+        carga_fija = dict(estado.carga)
+        
+        def evaluar(asignacion: List[Optional[Asignacion]]) -> Tuple[int, int]:
+            """Devuelve (minutos ubicados, -suma de cargas al cuadrado)."""
+            carga = dict(carga_fija)
+            minutos = 0
+            for (fin, inicio, _, _), elegido in zip(tareas, asignacion):
+                if elegido:
+                    minutos += fin - inicio
+                    if elegido[0]:
+                        carga[elegido[0]] = carga.get(elegido[0], 0) + fin - inicio
+            return minutos, -sum(valor * valor for valor in carga.values())
+        
+        mejor = [(sum(1 for a in inicial if a),) + evaluar(inicial), list(inicial)]
+        actual: List[Optional[Asignacion]] = []
+        nodos = 0
+        
+        def buscar(i: int, ubicados: int):
+            nonlocal nodos
+            nodos += 1
+            if nodos > self.MAX_NODOS:
+                return
+            # Ni ubicando todos los restantes se alcanza la mejor cantidad
+            if ubicados + len(tareas) - i < mejor[0][0]:
+                return
+            if i == len(tareas):
+                puntaje = (ubicados,) + evaluar(actual)
+                if puntaje > mejor[0]:
+                    mejor[:] = [puntaje, list(actual)]
+                return
+            
+            fin, inicio, clave, opciones = tareas[i]
+            for profesional, recurso in opciones:
+                if estado.libre(profesional, recurso, inicio, fin):
+                    estado.ocupar(profesional, recurso, inicio, fin, clave)
+                    actual.append((profesional, recurso))
+                    buscar(i + 1, ubicados + 1)
+                    actual.pop()
+                    estado.liberar(profesional, recurso, inicio, fin, clave)
+            
+            actual.append(None)
+            buscar(i + 1, ubicados)
+            actual.pop()
+        
+        buscar(0, 0)
+        return mejor[1]
+    
+    def planificar_reserva(self, servicios: List[Servicio], inicios_validos: Dict[int, FrozenSet[int]],
+                           fijos: Iterable[Turno] = (), turnos_cliente: Iterable[Turno] = (),
+                           paralelo: bool = True,
+                           comienzo: Optional[int] = None) -> Optional[List[Tuple[int, Asignacion]]]:
+        """
+        Busca horarios consecutivos para varios servicios de un mismo cliente.
+        
+        Cada servicio empieza al comienzo del bloque o cuando termina otro
+        servicio del bloque, así que no quedan huecos. Con `paralelo`, dos
+        servicios pueden coincidir si los hacen profesionales distintos con
+        recursos distintos (por ejemplo manicura y pedicura a la vez).
+        
+        Se prueban los comienzos de más temprano a más tarde y, para cada uno,
+        un backtracking con poda elige orden, horario, profesional y recurso
+        minimizando la hora de fin. Devuelve la primera solución encontrada
+        recorriendo los comienzos en orden.
+        
+        Args:
+            servicios: Servicios de la reserva
+            inicios_validos: {duración en minutos: minutos de inicio permitidos}
+            fijos: Turnos del día que ya ocupan profesionales o recursos
+            turnos_cliente: Turnos del día que el cliente ya tiene
+            paralelo: Permitir que dos servicios de la reserva se superpongan
+            comienzo: (Opcional) Minuto en que debe empezar la reserva
+            
+        Returns:
+            Lista alineada con `servicios` de (minuto de inicio, (profesional_id, recurso)),
+            o None si no hay forma de ubicarlos. Los servicios sin profesionales
+            especializados se ubican con (None, None)
+        """
+        estado = _Estado()
+        for turno in fijos:
+            if turno.estado == "cancelado":
+                continue
+            inicio, fin = self._intervalo(turno)
+            estado.ocupar(turno.profesional_id, turno.recurso, inicio, fin, turno.id)
+        
+        agenda_cliente = IndiceIntervalos()
+        for turno in turnos_cliente:
+            if turno.estado != "cancelado":
+                agenda_cliente.agregar(*self._intervalo(turno), turno.id)
+        
+        tareas = [
+            (servicio, servicio.duracion_minutos, self.opciones(servicio) or [(None, None)])
+            for servicio in servicios
+        ]
+        if comienzo is not None:
+            comienzos = [comienzo]
+        else:
+            comienzos = sorted(set().union(*(inicios_validos.get(duracion, ()) for _, duracion, _ in tareas)))
+        
+        for minuto in comienzos:
+            plan = self._planificar_bloque(minuto, tareas, inicios_validos, estado, agenda_cliente, paralelo)
+            if plan is not None:
+                return plan
+        return None
+    
+    def _planificar_bloque(self, comienzo: int, tareas: List[Tuple], inicios_validos: Dict[int, FrozenSet[int]],
+                           estado: '_Estado', agenda_cliente: IndiceIntervalos,
+                           paralelo: bool) -> Optional[List[Tuple[int, Asignacion]]]:
+        """Backtracking de planificar_reserva para un comienzo fijo."""
+        # La reserva del cliente se marca con claves propias para no chocar con IDs reales
+        reserva = IndiceIntervalos()
+        pendientes = list(range(len(tareas)))
+        puntos = [comienzo]
+        actual: Dict[int, Tuple[int, Asignacion]] = {}
+        mejor: List[Any] = [None, None]
+        nodos = 0
+        
+        def buscar(fin_bloque: int):
+            nonlocal nodos
+            nodos += 1
+            if nodos > self.MAX_NODOS:
+                return
+            if mejor[0] is not None and fin_bloque >= mejor[0]:
+                return
+            if not pendientes:
+                mejor[:] = [fin_bloque, dict(actual)]
+                return
+            
+            probados = set()
+            for indice in list(pendientes):
+                servicio, duracion, opciones = tareas[indice]
+                # Servicios repetidos dan las mismas ramas
+                if servicio.id in probados:
+                    continue
+                probados.add(servicio.id)
+                
+                permitidos = inicios_validos.get(duracion, frozenset())
+                for inicio in sorted(set(puntos)):
+                    fin = inicio + duracion
+                    if inicio not in permitidos:
+                        continue
+                    # La hora de fin solo puede crecer: si ya no mejora, se poda
+                    if mejor[0] is not None and max(fin_bloque, fin) >= mejor[0]:
+                        continue
+                    if agenda_cliente.hay_superposicion(inicio, fin):
+                        continue
+                    if not paralelo and reserva.hay_superposicion(inicio, fin):
+                        continue
+                    
+                    for profesional, recurso in opciones:
+                        if not estado.libre(profesional, recurso, inicio, fin):
+                            continue
+                        clave = ("reserva", indice)
+                        estado.ocupar(profesional, recurso, inicio, fin, clave)
+                        reserva.agregar(inicio, fin, clave)
+                        pendientes.remove(indice)
+                        puntos.append(fin)
+                        actual[indice] = (inicio, (profesional, recurso))
+                        
+                        buscar(max(fin_bloque, fin))
+                        
+                        del actual[indice]
+                        puntos.pop()
+                        pendientes.append(indice)
+                        pendientes.sort()
+                        reserva.quitar(inicio, fin, clave)
+                        estado.liberar(profesional, recurso, inicio, fin, clave)
+        
+        buscar(comienzo)
+        if mejor[1] is None:
+            return None
+        return [mejor[1][indice] for indice in range(len(tareas))]
+
+
+class _Estado:
+    """Ocupación de profesionales y recursos durante la asignación."""
+    
+    def __init__(self):
+        self.profesionales: Dict[Any, IndiceIntervalos] = {}
+        self.recursos: Dict[Any, IndiceIntervalos] = {}
+        self.carga: Dict[Any, int] = {}
+    
+    def libre(self, profesional: Any, recurso: Any, inicio: int, fin: int) -> bool:
+        """Indica si el profesional y el recurso están libres en [inicio, fin)."""
+        for indices, clave in ((self.profesionales, profesional), (self.recursos, recurso)):
+            indice = indices.get(clave)
+            if indice is not None and indice.hay_superposicion(inicio, fin):
+                return False
+        return True
+    
+    def ocupar(self, profesional: Any, recurso: Any, inicio: int, fin: int, clave: Any):
+        """Marca el intervalo como ocupado para el profesional y el recurso."""
+        if profesional:
+            self.profesionales.setdefault(profesional, IndiceIntervalos()).agregar(inicio, fin, clave)
+            self.carga[profesional] = self.carga.get(profesional, 0) + fin - inicio
+        if recurso:
+            self.recursos.setdefault(recurso, IndiceIntervalos()).agregar(inicio, fin, clave)
+    
+    def liberar(self, profesional: Any, recurso: Any, inicio: int, fin: int, clave: Any):
+        """Deshace un ocupar()."""
+        if profesional:
+            self.profesionales[profesional].quitar(inicio, fin, clave)
+            self.carga[profesional] -= fin - inicio
+        if recurso:
+            self.recursos[recurso].quitar(inicio, fin, clave)
+
+print("✅ Clase 'AsignadorTurnos' definida")
\ No newline at end of file
@@ -0,0 +1,90 @@
+# salon_belleza/core/bloqueo_lectura_escritura.py
+"""
+Bloqueo de lectura/escritura entre hilos de un mismo proceso.
+"""
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterator, Optional
+
+class BloqueoLecturaEscritura:
+    """
+    Muchos lectores a la vez o un solo escritor.
+    
+    Da prioridad a los escritores: cuando uno espera, los lectores nuevos
+    esperan detrás de él para que una ráfaga de consultas no lo postergue
+    indefinidamente. Es reentrante por hilo: quien escribe puede volver a
+    escribir o leer, y quien lee puede volver a leer aunque haya un escritor
+    esperando. Pasar de lectura a escritura no está permitido (dos hilos
+    haciéndolo se trabarían entre sí).
+    """
+    
+    def __init__(self):
+        """Inicializa el bloqueo libre."""
+        self._condicion = threading.Condition(threading.Lock())
+        self._lectores: Dict[int, int] = {}
+        self._escritor: Optional[int] = None
+        self._nivel_escritura = 0
+        self._escritores_esperando = 0
+    
+    @contextmanager
+    def lectura(self) -> Iterator[None]:
+        """Bloqueo compartido para consultas."""
+        hilo = threading.get_ident()
+        with self._condicion:
+            if self._escritor != hilo and hilo not in self._lectores:
+                while self._escritor is not None or self._escritores_esperando:
+                    self._condicion.wait()
+            self._lectores[hilo] = self._lectores.get(hilo, 0) + 1
+        try:
+            yield
+        finally:
+            with self._condicion:
+                self._lectores[hilo] -= 1
+                if not self._lectores[hilo]:
+                    del self._lectores[hilo]
+                    if not self._lectores:
+                        self._condicion.notify_all()
+    
+    @contextmanager
+    def escritura(self) -> Iterator[None]:
+        """Bloqueo exclusivo para modificaciones."""
+        hilo = threading.get_ident()
+        with self._condicion:
+            if self._escritor != hilo:
+                if hilo in self._lectores:
+                    raise RuntimeError("No se puede pedir escritura mientras se tiene lectura")
+                self._escritores_esperando += 1
+                try:
+                    while self._escritor is not None or self._lectores:
+                        self._condicion.wait()
+                finally:
+                    self._escritores_esperando -= 1
+                self._escritor = hilo
+            self._nivel_escritura += 1
+        try:
+            yield
+        finally:
+            with self._condicion:
+                self._nivel_escritura -= 1
+                if not self._nivel_escritura:
+                    self._escritor = None
+                    self._condicion.notify_all()
+
+def con_lectura(metodo: Callable) -> Callable:
+    """Ejecuta el método con el bloqueo de lectura de `self._bloqueo_rw`."""
+    @wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        with self._bloqueo_rw.lectura():
+            return metodo(self, *args, **kwargs)
+    return envoltura
+
+def con_escritura(metodo: Callable) -> Callable:
+    """Ejecuta el método con el bloqueo de escritura de `self._bloqueo_rw`."""
+    @wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        with self._bloqueo_rw.escritura():
+            return metodo(self, *args, **kwargs)
+    return envoltura
+
+print("✅ Clase 'BloqueoLecturaEscritura' definida")
\ No newline at end of file
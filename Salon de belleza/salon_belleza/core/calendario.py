@@ -4,12 +4,42 @@ Módulo de gestión de calendario y horarios.
 """
 import json
 import os
+import threading
 from datetime import datetime, timedelta, date
-from typing import List, Dict, Any, Optional, Tuple
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple, FrozenSet
 from pathlib import Path
 
+# Plantilla de horarios: (minutos de inicio ordenados, horarios HH:MM, conjunto de horarios)
+Plantilla = Tuple[Tuple[int, ...], Tuple[str, ...], FrozenSet[str]]
+
+# Horario de una fecha: (abierto, apertura, cierre)
+Horario = Tuple[bool, Optional[str], Optional[str]]
+
 class Calendario:
-    """Gestión de horarios del salón."""
+    """
+    Gestión de horarios del salón.
+    
+    El horario de cada fecha (según el día de la semana y las excepciones
+    de config.json, como feriados u horarios especiales) se precalcula en
+    una tabla indexada por el ordinal de la fecha, desde hoy hasta
+    `anticipacion_maxima_dias`. Las fechas fuera de ese horizonte se
+    calculan al consultarlas.
+    
+    Los horarios posibles dependen solo de la apertura, el cierre y la
+    duración del servicio, así que se compilan una vez por combinación y
+    se guardan en una caché LRU. Todo se descarta cuando se recarga la
+    configuración.
+    
+    Formato de las excepciones en config.json:
+        "excepciones": {
+            "2025-12-25": {"abre": false, "motivo": "Navidad"},
+            "2025-12-24": {"apertura": "09:00", "cierre": "14:00"}
+        }
+    """
+    
+    DIAS_SEMANA = ["lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"]
+    MAX_PLANTILLAS = 128
     
     def __init__(self, config_path: str = "data/config.json"):
         """
@@ -19,17 +49,19 @@ class Calendario:
             config_path: Ruta al archivo de configuración
         """
         self.config_path = Path(config_path)
+        # Publica la configuración y la tabla de horarios de forma atómica entre hilos
+        self._mutex = threading.RLock()
         self._cargar_configuracion()
     
     def _cargar_configuracion(self):
         """Carga la configuración desde el archivo JSON."""
         try:
             with open(self.config_path, 'r', encoding='utf-8') as f:
-                self.config = json.load(f)
+                config = json.load(f)
         except (FileNotFoundError, json.JSONDecodeError) as e:
             # Configuración por defecto
             print(f"⚠️  No se pudo cargar configuración: {e}. Usando valores por defecto.")
-            self.config = {
+            config = {
                 "horarios": {
                     "semana": {
                         "dias": ["lunes", "martes", "miércoles", "jueves", "viernes"],
@@ -58,6 +90,99 @@ class Calendario:
                     "max_turnos_dia": 25
                 }
             }
+        
+        # Publicar todo junto, descartando lo compilado con la configuración anterior
+        excepciones = self._cargar_excepciones(config)
+        with self._mutex:
+            self.config = config
+            self._horarios_dia: Dict[int, Horario] = {}
+            self._excepciones = excepciones
+            # (ordinal del primer día, horarios): se reemplaza entera, nunca se modifica
+            self._tabla: Tuple[Optional[int], Tuple[Horario, ...]] = (None, ())
+            self._plantilla = lru_cache(maxsize=self.MAX_PLANTILLAS)(self._compilar_plantilla)
+    
+    def _cargar_excepciones(self, config: Dict[str, Any]) -> Dict[int, Dict[str, Any]]:
+        """Lee las excepciones de la configuración indexadas por ordinal de fecha."""
+        excepciones = {}
+        for fecha_str, excepcion in config.get("excepciones", {}).items():
+            try:
+                excepciones[self._ordinal_fecha(fecha_str)] = excepcion
+            except ValueError:
+                print(f"⚠️  Excepción de calendario con fecha inválida: {fecha_str}")
+        return excepciones
+    
+    def recargar_configuracion(self):
+        """Vuelve a leer config.json y descarta las plantillas de horarios."""
+        self._cargar_configuracion()
+    
+    @staticmethod
+    def _ordinal_fecha(fecha_str: str) -> int:
+        """Obtiene el ordinal de una fecha YYYY-MM-DD validando el formato."""
+        try:
+            if (len(fecha_str) == 10 and fecha_str[4] == "-" and fecha_str[7] == "-"
+                    and fecha_str[:4].isdigit() and fecha_str[5:7].isdigit() and fecha_str[8:].isdigit()):
+                return date(int(fecha_str[:4]), int(fecha_str[5:7]), int(fecha_str[8:])).toordinal()
+            return datetime.strptime(fecha_str, "%Y-%m-%d").toordinal()
+        except (TypeError, ValueError):
+            raise ValueError("Formato de fecha inválido. Use YYYY-MM-DD")
+    
+    def _asegurar_tabla(self) -> Tuple[int, Tuple[Horario, ...]]:
+        """
+        Obtiene la tabla de horarios del horizonte de reservas, construyéndola si hace falta.
+        
+        Se reconstruye cuando cambia el día actual. Se arma aparte y se
+        publica junto con su día de inicio, así que otro hilo nunca ve una
+        tabla a medio armar ni de otro día.
+        
+        Returns:
+            Tupla (ordinal de hoy, horarios desde hoy)
+        """
+        hoy = date.today().toordinal()
+        inicio, horarios = self._tabla
+        if inicio != hoy:
+            with self._mutex:
+                inicio, horarios = self._tabla
+                if inicio != hoy:
+                    dias = self.config["turnos"].get("anticipacion_maxima_dias", 30)
+                    horarios = tuple(self._calcular_horario(hoy + i) for i in range(dias + 1))
+                    self._tabla = (hoy, horarios)
+        return hoy, horarios
+    
+    def _horario_ordinal(self, ordinal: int) -> Horario:
+        """Obtiene (abierto, apertura, cierre) de una fecha dada por su ordinal."""
+        hoy, horarios = self._asegurar_tabla()
+        posicion = ordinal - hoy
+        if 0 <= posicion < len(horarios):
+            return horarios[posicion]
+        return self._calcular_horario(ordinal)
+    
+    def _calcular_horario(self, ordinal: int) -> Horario:
+        """Calcula el horario de una fecha aplicando las excepciones."""
+        abierto, apertura, cierre = self._horario_dia(date.fromordinal(ordinal).weekday())
+        
+        excepcion = self._excepciones.get(ordinal)
+        if excepcion is None:
+            return abierto, apertura, cierre
+        if not excepcion.get("abre", True):
+            return False, None, None
+        
+        # Horario especial: lo que no se indique se toma del día habitual
+        semana = self.config["horarios"]["semana"]
+        apertura = excepcion.get("apertura") or apertura or semana.get("apertura", "09:00")
+        cierre = excepcion.get("cierre") or (cierre if abierto else None) or semana.get("cierre", "20:00")
+        return True, apertura, cierre
+    
+    def obtener_excepcion(self, fecha_str: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene la excepción configurada para una fecha, si la hay.
+        
+        Args:
+            fecha_str: Fecha en formato YYYY-MM-DD
+            
+        Returns:
+            Diccionario de la excepción (abre, apertura, cierre, motivo) o None
+        """
+        return self._excepciones.get(self._ordinal_fecha(fecha_str))
     
     def esta_abierto(self, fecha_str: str) -> Tuple[bool, Optional[str]]:
         """
@@ -69,14 +194,12 @@ class Calendario:
         Returns:
             Tuple (está_abierto, horario_apertura)
         """
-        try:
-            fecha = datetime.strptime(fecha_str, "%Y-%m-%d")
-        except ValueError:
-            raise ValueError("Formato de fecha inválido. Use YYYY-MM-DD")
-        
-        # Obtener día de la semana
-        dias_semana = ["lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"]
-        dia_nombre = dias_semana[fecha.weekday()]
+        abierto, apertura, _ = self._horario_ordinal(self._ordinal_fecha(fecha_str))
+        return abierto, apertura
+    
+    def _abierto_dia(self, dia: int) -> Tuple[bool, Optional[str]]:
+        """Verifica si el salón abre un día de la semana (0 = lunes)."""
+        dia_nombre = self.DIAS_SEMANA[dia]
         
         # Verificar si es domingo
         if dia_nombre == "domingo":
@@ -110,13 +233,11 @@ class Calendario:
         Returns:
             Hora de cierre o None si está cerrado
         """
-        try:
-            fecha = datetime.strptime(fecha_str, "%Y-%m-%d")
-        except ValueError:
-            raise ValueError("Formato de fecha inválido. Use YYYY-MM-DD")
-        
-        dias_semana = ["lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"]
-        dia_nombre = dias_semana[fecha.weekday()]
+        return self._horario_ordinal(self._ordinal_fecha(fecha_str))[2]
+    
+    def _cierre_dia(self, dia: int) -> Optional[str]:
+        """Obtiene la hora de cierre de un día de la semana (0 = lunes)."""
+        dia_nombre = self.DIAS_SEMANA[dia]
         
         horarios = self.config["horarios"]
         
@@ -139,15 +260,45 @@ class Calendario:
         Returns:
             Lista de horarios disponibles (HH:MM)
         """
-        # Verificar si está abierto
-        abierto, apertura = self.esta_abierto(fecha_str)
-        if not abierto:
-            return []
+        return list(self.obtener_plantilla(fecha_str, duracion_minutos)[1])
+    
+    def obtener_plantilla(self, fecha_str: str, duracion_minutos: int = 60) -> Plantilla:
+        """
+        Obtiene la plantilla precalculada de horarios para una fecha.
         
-        cierre = self.obtener_horario_cierre(fecha_str)
-        if not cierre:
-            return []
+        Args:
+            fecha_str: Fecha en formato YYYY-MM-DD
+            duracion_minutos: Duración del servicio en minutos
+            
+        Returns:
+            Tuple (minutos de inicio, horarios HH:MM, conjunto de horarios)
+        """
+        return self._plantilla_horario(
+            self._horario_ordinal(self._ordinal_fecha(fecha_str)), duracion_minutos
+        )
+    
+    def _plantilla_horario(self, horario: Horario, duracion_minutos: int) -> Plantilla:
+        """Obtiene la plantilla de un horario (abierto, apertura, cierre)."""
+        abierto, apertura, cierre = horario
+        if not abierto or not cierre:
+            return (), (), frozenset()
+        return self._plantilla(apertura, cierre, duracion_minutos)
+    
+    def _horario_dia(self, dia: int) -> Horario:
+        """Obtiene (abierto, apertura, cierre) habitual de un día de la semana, en caché."""
+        horario = self._horarios_dia.get(dia)
+        if horario is None:
+            abierto, apertura = self._abierto_dia(dia)
+            horario = (abierto, apertura, self._cierre_dia(dia))
+            self._horarios_dia[dia] = horario
+        return horario
+    
+    def _compilar_plantilla(self, apertura: str, cierre: str, duracion_minutos: int) -> Plantilla:
+        """
+        Genera los horarios posibles entre apertura y cierre para una duración.
         
+        Se llama a través de self._plantilla, que guarda el resultado.
+        """
         # Convertir horarios a minutos
         apertura_min = self._hora_a_minutos(apertura)
         cierre_min = self._hora_a_minutos(cierre)
@@ -162,7 +313,7 @@ class Calendario:
         intervalo = self.config["turnos"]["intervalo_entre_turnos"]
         
         # Generar horarios
-        horarios = []
+        minutos = []
         hora_actual = apertura_min
         
         while hora_actual + duracion_minutos <= cierre_min:
@@ -172,13 +323,11 @@ class Calendario:
                     hora_actual += intervalo
                     continue
             
-            # Convertir a formato HH:MM
-            horario_str = self._minutos_a_hora(hora_actual)
-            horarios.append(horario_str)
-            
+            minutos.append(hora_actual)
             hora_actual += intervalo
         
-        return horarios
+        horarios = tuple(self._minutos_a_hora(minuto) for minuto in minutos)
+        return tuple(minutos), horarios, frozenset(horarios)
     
     def validar_horario(self, fecha_str: str, hora_str: str, duracion_minutos: int) -> Tuple[bool, str]:
         """
@@ -218,15 +367,12 @@ class Calendario:
             return False, f"Error en formato de fecha/hora: {e}"
         
         # Verificar si está abierto
-        abierto, apertura = self.esta_abierto(fecha_str)
-        if not abierto:
+        horario = self._horario_ordinal(fecha_turno.toordinal())
+        if not horario[0]:
             return False, "El salón está cerrado ese día"
         
-        # Obtener horarios disponibles
-        horarios_disponibles = self.obtener_horarios_disponibles(fecha_str, duracion_minutos)
-        
-        # Verificar que la hora esté en los horarios disponibles
-        if hora_str not in horarios_disponibles:
+        # Verificar que la hora esté en la plantilla de horarios del día
+        if hora_str not in self._plantilla_horario(horario, duracion_minutos)[2]:
             return False, "Horario no disponible"
         
         return True, "Horario válido"
@@ -258,13 +404,13 @@ class Calendario:
             Lista de diccionarios con fecha y disponibilidad
         """
         fechas = []
-        hoy = date.today()
+        hoy = self._asegurar_tabla()[0]
         
         for i in range(dias_ahead):
-            fecha = hoy + timedelta(days=i)
+            fecha = date.fromordinal(hoy + i)
             fecha_str = fecha.strftime("%Y-%m-%d")
             
-            abierto, _ = self.esta_abierto(fecha_str)
+            abierto = self._horario_ordinal(hoy + i)[0]
             
             fechas.append({
                 "fecha": fecha_str,
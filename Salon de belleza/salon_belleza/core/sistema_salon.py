@@ -2,29 +2,76 @@
 """
 Sistema principal de gestión del salón de belleza.
 """
-from typing import List, Dict, Any, Optional, Tuple
-from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Callable
+from contextlib import contextmanager
+from datetime import datetime, timedelta, date
+from itertools import islice
 from ..models.turno import Turno
 from ..models.servicio import Servicio
+from ..models.reserva import ReservaMultiple
 from ..persistence.turno_repository import TurnoRepository
 from ..persistence.json_storage import JSONStorage
+from ..persistence.catalogo_servicios import CatalogoServicios
+from ..persistence.bloqueos_horario import BloqueosHorario
+from ..persistence.bloqueo_archivo import VersionCambiada, RegistroModificado
+from ..persistence.indice_intervalos import inicios_libres
+from ..persistence.indices_secundarios import IndicesSecundarios
 from .calendario import Calendario
+from .asignador import AsignadorTurnos
+from .transaccion import TransaccionTurnos
+from .bloqueo_lectura_escritura import BloqueoLecturaEscritura, con_lectura, con_escritura
 
 class SistemaSalon:
-    """Sistema principal de gestión del salón."""
+    """
+    Sistema principal de gestión del salón.
     
-    def __init__(self, data_dir: str = "data"):
+    Varios procesos (recepcionistas) pueden usar los mismos datos: las
+    validaciones se hacen sin bloquear y la escritura es condicional a que
+    la versión de los datos no haya cambiado desde que se validó. Si cambió,
+    se vuelve a validar y se reintenta.
+    
+    Una misma instancia puede usarse desde varios hilos (por ejemplo la
+    compartida entre sesiones de Streamlit): las consultas toman un bloqueo
+    de lectura y pueden correr en paralelo; las operaciones que modifican
+    turnos o bloqueos toman el de escritura y corren de a una.
+    """
+    
+    # Intentos de validar y escribir antes de rendirse por cambios ajenos
+    REINTENTOS_ESCRITURA = 5
+    
+    def __init__(self, data_dir: str = "data",
+                 catalogo_servicios: Optional[CatalogoServicios] = None):
         """
         Inicializa el sistema del salón.
         
         Args:
             data_dir: Directorio donde están los archivos de datos
+            catalogo_servicios: (Opcional) Catálogo de servicios a usar. Por
+                defecto se crea uno sobre `<data_dir>/servicios.json`
         """
         self.data_dir = data_dir
         
-        # Inicializar componentes
+        # Inicializar componentes (el catálogo de servicios es compartido)
         self.calendario = Calendario(f"{data_dir}/config.json")
-        self.turno_repository = TurnoRepository(data_dir)
+        self.catalogo_servicios = catalogo_servicios or CatalogoServicios(f"{data_dir}/servicios.json")
+        self.turno_repository = TurnoRepository(
+            data_dir, almacenamiento=self.calendario.config.get("almacenamiento"),
+            catalogo_servicios=self.catalogo_servicios
+        )
+        
+        # Bloqueos temporales de horarios mientras se completa una reserva
+        self.bloqueos = BloqueosHorario(
+            f"{data_dir}/bloqueos.json",
+            duracion_segundos=self.calendario.config["turnos"].get(
+                "bloqueo_segundos", BloqueosHorario.DURACION_POR_DEFECTO
+            )
+        )
+        
+        # Transacción abierta con transaccion(), si la hay
+        self._transaccion: Optional[TransaccionTurnos] = None
+        
+        # Consultas en paralelo, modificaciones de a una (entre hilos)
+        self._bloqueo_rw = BloqueoLecturaEscritura()
         
         # Cargar servicios y profesionales
         self._cargar_servicios()
@@ -33,22 +80,26 @@ class SistemaSalon:
         print("✅ Sistema de salón inicializado")
     
     def _cargar_servicios(self):
-        """Carga los servicios desde el archivo JSON."""
-        servicios_storage = JSONStorage(f"{self.data_dir}/servicios.json")
-        servicios_data = servicios_storage.obtener_todos()
-        
-        self.servicios = []
-        for data in servicios_data:
-            try:
-                servicio = Servicio.from_dict(data)
-                self.servicios.append(servicio)
-            except Exception as e:
-                print(f"⚠️  Error cargando servicio {data.get('id')}: {e}")
+        """Recarga el catálogo de servicios desde el archivo JSON."""
+        self.catalogo_servicios.recargar()
+    
+    @property
+    def servicios(self) -> List[Servicio]:
+        """Servicios del catálogo (se actualiza si cambia servicios.json)."""
+        return self.catalogo_servicios.obtener_todos()
     
     def _cargar_profesionales(self):
         """Carga los profesionales desde el archivo JSON."""
         profesionales_storage = JSONStorage(f"{self.data_dir}/profesionales.json")
         self.profesionales = profesionales_storage.obtener_todos()
+        
+        # Registro por ID e índice servicio -> profesionales que lo realizan
+        self._profesionales_por_id: Dict[Any, Dict[str, Any]] = {}
+        self._profesionales_por_servicio: Dict[Any, List[Dict[str, Any]]] = {}
+        for profesional in self.profesionales:
+            self._profesionales_por_id.setdefault(profesional.get("id"), profesional)
+            for servicio_id in dict.fromkeys(profesional.get("especialidades", [])):
+                self._profesionales_por_servicio.setdefault(servicio_id, []).append(profesional)
     
     def obtener_servicios(self) -> List[Servicio]:
         """
@@ -69,10 +120,7 @@ class SistemaSalon:
         Returns:
             Servicio o None si no existe
         """
-        for servicio in self.servicios:
-            if servicio.id == servicio_id:
-                return servicio
-        return None
+        return self.catalogo_servicios.obtener(servicio_id)
     
     def obtener_profesionales(self, activos: bool = True) -> List[Dict[str, Any]]:
         """
@@ -98,14 +146,322 @@ class SistemaSalon:
         Returns:
             Profesional o None si no existe
         """
-        for profesional in self.profesionales:
-            if profesional.get("id") == profesional_id:
-                return profesional
-        return None
+        return self._profesionales_por_id.get(profesional_id)
+    
+    def obtener_profesionales_para_servicio(self, servicio_id: int,
+                                            activos: bool = True) -> List[Dict[str, Any]]:
+        """
+        Obtiene los profesionales especializados en un servicio.
+        
+        Args:
+            servicio_id: ID del servicio
+            activos: Si True, solo devuelve profesionales activos
+            
+        Returns:
+            Lista de profesionales
+        """
+        profesionales = self._profesionales_por_servicio.get(servicio_id, [])
+        if activos:
+            return [p for p in profesionales if p.get("activo", True)]
+        return list(profesionales)
+    
+    def _crear_asignador(self) -> AsignadorTurnos:
+        """Crea un asignador con los profesionales activos y el catálogo actual."""
+        return AsignadorTurnos(self.obtener_profesionales(activos=True), self.obtener_servicio_por_id)
+    
+    def _asignar_profesional(self, fecha: str, hora: str, servicio: Servicio,
+                             excluir_bloqueo: Optional[Any] = None) -> Tuple[Optional[int], Optional[str]]:
+        """
+        Elige profesional y recurso libres para un turno nuevo.
+        
+        Returns:
+            Tuple (profesional_id, recurso), o (None, None) si no hay nadie libre
+        """
+        nuevo = Turno.desde_almacenamiento({
+            "cliente_nombre": "", "fecha": fecha, "hora": hora, "servicio_id": servicio.id
+        }, servicio.duracion_minutos)
+        fijos = self._ocupantes_fecha(fecha, excluir_bloqueo)
+        asignacion = self._crear_asignador().asignar([nuevo], fijos, exacto=False)[None]
+        return asignacion if asignacion else (None, None)
+    
+    @contextmanager
+    def transaccion(self) -> Iterator[TransaccionTurnos]:
+        """
+        Agrupa la creación de varios turnos en una sola escritura.
+        
+        Dentro del bloque, crear_turno y crear_reserva_multiple validan contra
+        los turnos guardados más los pendientes de la transacción (así se
+        detectan conflictos entre ellos) y no escriben nada. Al salir se
+        guardan todos juntos, después de revalidarlos contra lo guardado por
+        si otro proceso escribió en el medio; si alguno falló, se llamó a
+        cancelar() o hubo una excepción, no se guarda ninguno.
+        
+        El bloque completo tiene el bloqueo de escritura: los demás hilos
+        esperan a que termine.
+        
+        Ejemplo:
+            with sistema.transaccion() as transaccion:
+                sistema.crear_turno("Ana", "2025-01-10", "10:00", 1)
+                sistema.crear_turno("Ana", "2025-01-17", "10:00", 1)
+            if not transaccion.confirmada:
+                print(transaccion.mensaje)
+                
+        Returns:
+            La TransaccionTurnos; `confirmada` y `mensaje` indican el resultado
+        """
+        with self._bloqueo_rw.escritura():
+            if self._transaccion is not None:
+                raise ValueError("Ya hay una transacción en curso")
+            
+            transaccion = TransaccionTurnos()
+            self._transaccion = transaccion
+            try:
+                yield transaccion
+                
+                if transaccion.errores:
+                    transaccion.mensaje = f"Transacción deshecha: {transaccion.errores[0]}"
+                    return
+                
+                if transaccion.turnos:
+                    exito, mensaje, _ = self._reintentar(lambda: self._confirmar_transaccion(transaccion))
+                    if not exito:
+                        transaccion.mensaje = f"Transacción deshecha: {mensaje}"
+                        return
+                for bloqueo_id in transaccion.bloqueos:
+                    self.bloqueos.liberar(bloqueo_id)
+                transaccion.confirmada = True
+                transaccion.mensaje = f"Se guardaron {len(transaccion.turnos)} turnos"
+            except Exception as e:
+                transaccion.mensaje = f"Transacción deshecha: {str(e)}"
+                raise
+            finally:
+                self._transaccion = None
     
+    def _confirmar_transaccion(self, transaccion: TransaccionTurnos) -> Tuple[bool, str, Any]:
+        """
+        Vuelve a validar los turnos pendientes contra lo guardado y los escribe.
+        
+        Otro proceso pudo escribir desde que se validó cada turno; la versión
+        se lee antes de revalidar y la escritura es condicional a ella.
+        """
+        fechas = {turno.fecha for turno in transaccion.turnos}
+        version = self.turno_repository.obtener_version(fechas)
+        
+        max_turnos = self.calendario.config["turnos"]["max_turnos_dia"]
+        for fecha in fechas:
+            if self.turno_repository.contar_turnos_por_fecha(fecha) + transaccion.contar_fecha(fecha) > max_turnos:
+                return False, f"No hay disponibilidad para el {fecha} (límite de {max_turnos} turnos)", None
+        
+        for turno in transaccion.turnos:
+            if (turno.profesional_id or turno.recurso) and self.turno_repository.existe_conflicto_horario(
+                turno.fecha, turno.hora, turno.duracion_minutos,
+                profesional_id=turno.profesional_id, recurso=turno.recurso
+            ):
+                return False, f"El horario {turno.fecha} {turno.hora} ya fue tomado", None
+        
+        self.turno_repository.crear_turnos(transaccion.turnos, version_esperada=version)
+        return True, "", None
+    
+    def _reintentar(self, operacion: Callable[[], Tuple[bool, str, Any]],
+                    vacio: Any = None) -> Tuple[bool, str, Any]:
+        """
+        Ejecuta una operación que valida y escribe de forma condicional.
+        
+        Si la escritura lanza VersionCambiada (otro proceso escribió después
+        de la validación), se repite la operación completa.
+        
+        Args:
+            operacion: Función sin argumentos que devuelve (éxito, mensaje, resultado)
+            vacio: Resultado a devolver si se agotan los intentos
+        """
+        for _ in range(self.REINTENTOS_ESCRITURA):
+            try:
+                return operacion()
+            except VersionCambiada:
+                continue
+        return False, "Los datos cambiaron demasiadas veces mientras se guardaban, intente de nuevo", vacio
+    
+    def _registrar_resultado(self, resultado: Tuple[bool, str, Any]) -> Tuple[bool, str, Any]:
+        """Si hay una transacción abierta, la marca para deshacer cuando algo falla."""
+        if self._transaccion is not None and not resultado[0]:
+            self._transaccion.registrar_error(resultado[1])
+        return resultado
+    
+    def _turnos_fecha(self, fecha: str) -> List[Turno]:
+        """Turnos guardados de una fecha más los pendientes de la transacción."""
+        turnos = self.turno_repository.obtener_turnos_por_fecha(fecha)
+        if self._transaccion is not None:
+            turnos.extend(self._transaccion.turnos_fecha(fecha))
+        return turnos
+    
+    def _contar_turnos_fecha(self, fecha: str) -> int:
+        """Cuenta los turnos de una fecha, incluidos los pendientes de la transacción."""
+        cantidad = self.turno_repository.contar_turnos_por_fecha(fecha)
+        if self._transaccion is not None:
+            cantidad += self._transaccion.contar_fecha(fecha)
+        return cantidad
+    
+    def _ocupantes_fecha(self, fecha: str, excluir_bloqueo: Optional[Any] = None) -> List[Turno]:
+        """
+        Turnos que ocupan profesional o recurso en una fecha, para el asignador.
+        
+        Incluye los pendientes de la transacción y los bloqueos vigentes
+        (como turnos sin cliente), salvo el bloqueo indicado.
+        """
+        ocupantes = [
+            turno for turno in self._turnos_fecha(fecha)
+            if turno.profesional_id or turno.recurso
+        ]
+        for bloqueo in self.bloqueos.activos(fecha):
+            if excluir_bloqueo is not None and str(bloqueo["id"]) == str(excluir_bloqueo):
+                continue
+            ocupantes.append(Turno.desde_almacenamiento({
+                "id": f"bloqueo-{bloqueo['id']}", "cliente_nombre": "", "fecha": fecha,
+                "hora": bloqueo["hora"], "servicio_id": bloqueo.get("servicio_id"),
+                "profesional_id": bloqueo.get("profesional_id"), "recurso": bloqueo.get("recurso")
+            }, bloqueo["duracion_minutos"]))
+        return ocupantes
+    
+    def _ocupacion(self, fecha: str) -> Dict[str, Dict[Any, int]]:
+        """Mapas de ocupación de una fecha con los bloqueos vigentes sumados."""
+        ocupacion = self.turno_repository.obtener_ocupacion(fecha)
+        for tipo, mapas in self.bloqueos.ocupacion(fecha).items():
+            for clave, bits in mapas.items():
+                ocupacion[tipo][clave] = ocupacion[tipo].get(clave, 0) | bits
+        return ocupacion
+    
+    def _hay_conflicto(self, fecha: str, hora: str, duracion_minutos: int,
+                       profesional_id: Optional[int] = None, recurso: Optional[str] = None,
+                       excluir_bloqueo: Optional[Any] = None) -> bool:
+        """Verifica conflictos contra lo guardado, los bloqueos y lo pendiente de la transacción."""
+        if self.turno_repository.existe_conflicto_horario(
+            fecha, hora, duracion_minutos, profesional_id=profesional_id, recurso=recurso
+        ):
+            return True
+        
+        hora_inicio = datetime.strptime(hora, "%H:%M")
+        inicio = hora_inicio.hour * 60 + hora_inicio.minute
+        fin = inicio + duracion_minutos
+        if self.bloqueos.hay_conflicto(
+            fecha, inicio, fin, profesional_id=profesional_id, recurso=recurso, excluir=excluir_bloqueo
+        ):
+            return True
+        if self._transaccion is None:
+            return False
+        return self._transaccion.hay_conflicto(
+            fecha, inicio, fin, profesional_id=profesional_id, recurso=recurso
+        )
+    
+    def _verificar_profesional(self, fecha: str, hora: str, servicio: Servicio, profesional_id: int,
+                               excluir_bloqueo: Optional[Any] = None) -> Tuple[bool, str, Optional[str]]:
+        """
+        Verifica que un profesional pueda atender el turno y elige su recurso.
+        
+        Returns:
+            Tuple (disponible, mensaje de error, recurso)
+        """
+        profesional = self.obtener_profesional_por_id(profesional_id)
+        if not profesional:
+            return False, f"Profesional con ID {profesional_id} no existe", None
+        
+        # Verificar si el profesional puede hacer este servicio
+        if servicio.id not in profesional.get("especialidades", []):
+            return False, f"El profesional no está especializado en este servicio", None
+        
+        # Verificar conflicto horario
+        conflicto = self._hay_conflicto(
+            fecha, hora, servicio.duracion_minutos, profesional_id=profesional_id,
+            excluir_bloqueo=excluir_bloqueo
+        )
+        
+        if conflicto:
+            return False, "El profesional ya tiene un turno en ese horario", None
+        
+        # Determinar recurso: el primero libre, empezando por el preferido
+        recurso = next((
+            opcion for opcion in AsignadorTurnos.recursos_para(servicio, profesional)
+            if not self._hay_conflicto(
+                fecha, hora, servicio.duracion_minutos, recurso=opcion, excluir_bloqueo=excluir_bloqueo
+            )
+        ), None)
+        
+        if recurso is None:
+            return False, "No hay recursos libres en ese horario", None
+        return True, "", recurso
+    
+    @con_escritura
+    def bloquear_horario(self, fecha: str, hora: str, servicio_id: int,
+                         profesional_id: Optional[int] = None,
+                         segundos: Optional[int] = None) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
+        """
+        Reserva un horario por unos segundos mientras se completan los datos del turno.
+        
+        Mientras el bloqueo está vigente, el profesional y el recurso no
+        aparecen libres en la disponibilidad ni pueden usarse en otro turno.
+        Se pasa su ID a crear_turno (bloqueo_id) para usarlo.
+        
+        Args:
+            fecha: Fecha del turno (YYYY-MM-DD)
+            hora: Hora del turno (HH:MM)
+            servicio_id: ID del servicio
+            profesional_id: (Opcional) Profesional. Si no se indica se elige
+                uno libre como en la asignación automática
+            segundos: (Opcional) Duración del bloqueo (por defecto bloqueo_segundos
+                de la configuración)
+                
+        Returns:
+            Tuple (éxito, mensaje, bloqueo)
+        """
+        return self._reintentar(lambda: self._bloquear_horario(
+            fecha, hora, servicio_id, profesional_id, segundos
+        ))
+    
+    def _bloquear_horario(self, fecha: str, hora: str, servicio_id: int,
+                          profesional_id: Optional[int],
+                          segundos: Optional[int]) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
+        """Crea un bloqueo de horario (ver bloquear_horario)."""
+        try:
+            version = self.bloqueos.obtener_version()
+            servicio = self.obtener_servicio_por_id(servicio_id)
+            if not servicio:
+                return False, f"Servicio con ID {servicio_id} no existe", None
+            
+            valido, mensaje = self.calendario.validar_horario(fecha, hora, servicio.duracion_minutos)
+            if not valido:
+                return False, mensaje, None
+            hora = datetime.strptime(hora, "%H:%M").strftime("%H:%M")
+            
+            if profesional_id:
+                disponible, mensaje, recurso = self._verificar_profesional(fecha, hora, servicio, profesional_id)
+                if not disponible:
+                    return False, mensaje, None
+            else:
+                profesional_id, recurso = self._asignar_profesional(fecha, hora, servicio)
+                if profesional_id is None:
+                    return False, "No hay profesionales libres en ese horario", None
+            
+            bloqueo = self.bloqueos.crear(
+                fecha, hora, servicio.duracion_minutos, servicio_id=servicio.id,
+                profesional_id=profesional_id, recurso=recurso, segundos=segundos,
+                version_esperada=version
+            )
+            return True, f"Horario reservado por {segundos or self.bloqueos.duracion_segundos} segundos", bloqueo
+        except VersionCambiada:
+            raise
+        except Exception as e:
+            return False, f"Error al bloquear horario: {str(e)}", None
+    
+    @con_escritura
+    def liberar_bloqueo(self, bloqueo_id: Any) -> bool:
+        """Libera un bloqueo de horario antes de que venza."""
+        return self.bloqueos.liberar(bloqueo_id)
+    
+    @con_escritura
     def crear_turno(self, cliente_nombre: str, fecha: str, hora: str, servicio_id: int,
                    telefono: str = "", email: str = "", 
-                   profesional_id: Optional[int] = None) -> Tuple[bool, str, Optional[Turno]]:
+                   profesional_id: Optional[int] = None,
+                   asignar_automaticamente: bool = False,
+                   bloqueo_id: Optional[Any] = None) -> Tuple[bool, str, Optional[Turno]]:
         """
         Crea un nuevo turno.
         
@@ -117,11 +473,30 @@ class SistemaSalon:
             telefono: Teléfono del cliente
             email: Email del cliente
             profesional_id: ID del profesional (opcional)
+            asignar_automaticamente: Si no se indica profesional, elegir el
+                especializado menos cargado que esté libre (y su recurso)
+            bloqueo_id: (Opcional) Bloqueo obtenido con bloquear_horario. No
+                cuenta como conflicto, aporta el profesional si no se indicó
+                y se libera al crear el turno
             
         Returns:
-            Tuple (éxito, mensaje, turno_creado)
+            Tuple (éxito, mensaje, turno_creado). Dentro de una transacción el
+            turno queda pendiente (sin ID) hasta que se cierre
         """
+        return self._registrar_resultado(self._reintentar(lambda: self._crear_turno(
+            cliente_nombre, fecha, hora, servicio_id, telefono, email,
+            profesional_id, asignar_automaticamente, bloqueo_id
+        )))
+    
+    def _crear_turno(self, cliente_nombre: str, fecha: str, hora: str, servicio_id: int,
+                     telefono: str, email: str, profesional_id: Optional[int],
+                     asignar_automaticamente: bool,
+                     bloqueo_id: Optional[Any]) -> Tuple[bool, str, Optional[Turno]]:
+        """Crea un turno (ver crear_turno)."""
         try:
+            # Versión con la que se valida; si cambia antes de guardar se reintenta
+            version = self.turno_repository.obtener_version([fecha])
+            
             # Obtener servicio
             servicio = self.obtener_servicio_por_id(servicio_id)
             if not servicio:
@@ -135,38 +510,36 @@ class SistemaSalon:
             if not valido:
                 return False, mensaje, None
             
+            # Un bloqueo vigente solo se usa (y se libera) si es de este mismo
+            # horario y servicio; en ese caso define el profesional si no se indicó otro
+            bloqueo = self.bloqueos.obtener(bloqueo_id) if bloqueo_id is not None else None
+            if bloqueo and (bloqueo["fecha"], bloqueo["hora"], str(bloqueo.get("servicio_id"))) != (
+                fecha, datetime.strptime(hora, "%H:%M").strftime("%H:%M"), str(servicio.id)
+            ):
+                bloqueo = None
+            if bloqueo is None:
+                bloqueo_id = None
+            elif not profesional_id:
+                profesional_id = bloqueo.get("profesional_id")
+            
             # Verificar conflictos de horario si hay profesional
             if profesional_id:
-                profesional = self.obtener_profesional_por_id(profesional_id)
-                if not profesional:
-                    return False, f"Profesional con ID {profesional_id} no existe", None
-                
-                # Verificar si el profesional puede hacer este servicio
-                if servicio.id not in profesional.get("especialidades", []):
-                    return False, f"El profesional no está especializado en este servicio", None
-                
-                # Determinar recurso
-                recurso = None
-                if servicio.requiere_camilla:
-                    recurso = "camilla"
-                else:
-                    recurso = profesional.get("preferencia_recurso", "mesa_1")
-                
-                # Verificar conflicto horario
-                conflicto = self.turno_repository.existe_conflicto_horario(
-                    fecha, hora, servicio.duracion_minutos,
-                    profesional_id=profesional_id, recurso=recurso
+                disponible, mensaje, recurso = self._verificar_profesional(
+                    fecha, hora, servicio, profesional_id, excluir_bloqueo=bloqueo_id
+                )
+                if not disponible:
+                    return False, mensaje, None
+            elif asignar_automaticamente:
+                profesional_id, recurso = self._asignar_profesional(
+                    fecha, hora, servicio, excluir_bloqueo=bloqueo_id
                 )
-                
-                if conflicto:
-                    return False, "El profesional ya tiene un turno en ese horario", None
             else:
                 recurso = None
             
             # Verificar límite de turnos por día
-            turnos_fecha = self.turno_repository.obtener_turnos_por_fecha(fecha)
+            turnos_fecha = self._contar_turnos_fecha(fecha)
             max_turnos = self.calendario.config["turnos"]["max_turnos_dia"]
-            if len(turnos_fecha) >= max_turnos:
+            if turnos_fecha >= max_turnos:
                 return False, f"No hay disponibilidad para esa fecha (límite de {max_turnos} turnos)", None
             
             # Crear turno
@@ -181,71 +554,279 @@ class SistemaSalon:
                 recurso=recurso
             )
             
-            # Guardar turno
-            turno_creado = self.turno_repository.crear_turno(turno)
+            # Guardar turno (o dejarlo pendiente en la transacción)
+            if self._transaccion is not None:
+                turno.duracion_minutos = servicio.duracion_minutos
+                self._transaccion.agregar(turno)
+                if bloqueo:
+                    self._transaccion.bloqueos.append(bloqueo_id)
+                return True, "Turno agregado a la transacción", turno
+            
+            turno_creado = self.turno_repository.crear_turno(turno, version_esperada=version)
+            if bloqueo:
+                self.bloqueos.liberar(bloqueo_id)
             
             return True, "Turno creado exitosamente", turno_creado
             
+        except VersionCambiada:
+            raise
         except Exception as e:
             return False, f"Error al crear turno: {str(e)}", None
     
+    @con_escritura
+    def crear_reserva_multiple(self, cliente_nombre: str, fecha: str, servicio_ids: List[int],
+                               telefono: str = "", email: str = "", hora: Optional[str] = None,
+                               paralelo: bool = True) -> Tuple[bool, str, Optional[ReservaMultiple]]:
+        """
+        Agenda varios servicios para un cliente en un mismo día.
+        
+        Busca un bloque sin huecos (con servicios simultáneos si `paralelo`
+        y hay profesionales distintos libres) y lo guarda con una sola
+        escritura: se crean todos los turnos o ninguno.
+        
+        Args:
+            cliente_nombre: Nombre del cliente
+            fecha: Fecha de la reserva (YYYY-MM-DD)
+            servicio_ids: IDs de los servicios (pueden repetirse)
+            telefono: Teléfono del cliente
+            email: Email del cliente
+            hora: (Opcional) Hora de inicio obligatoria (HH:MM). Por defecto
+                se busca la más temprana posible
+            paralelo: Permitir servicios simultáneos con distintos profesionales
+            
+        Returns:
+            Tuple (éxito, mensaje, reserva). Dentro de una transacción los
+            turnos quedan pendientes hasta que se cierre
+        """
+        return self._registrar_resultado(self._reintentar(lambda: self._crear_reserva_multiple(
+            cliente_nombre, fecha, servicio_ids, telefono, email, hora, paralelo
+        )))
+    
+    def _crear_reserva_multiple(self, cliente_nombre: str, fecha: str, servicio_ids: List[int],
+                                telefono: str, email: str, hora: Optional[str],
+                                paralelo: bool) -> Tuple[bool, str, Optional[ReservaMultiple]]:
+        """Crea una reserva múltiple (ver crear_reserva_multiple)."""
+        try:
+            version = self.turno_repository.obtener_version([fecha])
+            
+            if not servicio_ids:
+                return False, "Debe indicar al menos un servicio", None
+            
+            servicios = []
+            for servicio_id in servicio_ids:
+                servicio = self.obtener_servicio_por_id(servicio_id)
+                if not servicio:
+                    return False, f"Servicio con ID {servicio_id} no existe", None
+                servicios.append(servicio)
+            
+            abierto, mensaje = self.calendario.esta_abierto(fecha)
+            if not abierto:
+                return False, mensaje, None
+            
+            comienzo = None
+            if hora:
+                try:
+                    inicio = datetime.strptime(hora, "%H:%M")
+                except ValueError:
+                    return False, "Formato de hora inválido. Use HH:MM", None
+                comienzo = inicio.hour * 60 + inicio.minute
+            
+            # Verificar límite de turnos por día
+            max_turnos = self.calendario.config["turnos"]["max_turnos_dia"]
+            if self._contar_turnos_fecha(fecha) + len(servicios) > max_turnos:
+                return False, f"No hay disponibilidad para esa fecha (límite de {max_turnos} turnos)", None
+            
+            # Horarios válidos por duración (incluye las reglas de anticipación)
+            inicios_validos = {}
+            for duracion in {servicio.duracion_minutos for servicio in servicios}:
+                minutos, horarios, _ = self.calendario.obtener_plantilla(fecha, duracion)
+                inicios_validos[duracion] = frozenset(
+                    minuto for minuto, horario in zip(minutos, horarios)
+                    if self.calendario.validar_horario(fecha, horario, duracion)[0]
+                )
+            
+            turnos_dia = self._turnos_fecha(fecha)
+            cliente = IndicesSecundarios.normalizar_cliente(cliente_nombre)
+            plan = self._crear_asignador().planificar_reserva(
+                servicios, inicios_validos,
+                fijos=self._ocupantes_fecha(fecha),
+                turnos_cliente=[
+                    turno for turno in turnos_dia
+                    if IndicesSecundarios.normalizar_cliente(turno.cliente_nombre) == cliente
+                ],
+                paralelo=paralelo,
+                comienzo=comienzo
+            )
+            if plan is None:
+                return False, "No hay horarios para ubicar todos los servicios ese día", None
+            
+            reserva = ReservaMultiple(cliente_nombre, fecha, telefono=telefono, email=email)
+            for servicio, (minuto, (profesional_id, recurso)) in zip(servicios, plan):
+                reserva.agregar_turno(Turno(
+                    cliente_nombre=cliente_nombre,
+                    fecha=fecha,
+                    hora=f"{minuto // 60:02d}:{minuto % 60:02d}",
+                    servicio_id=servicio.id,
+                    telefono=telefono,
+                    email=email,
+                    profesional_id=profesional_id,
+                    recurso=recurso
+                ))
+            reserva.ordenar_turnos_por_hora()
+            
+            # Guardar todos los turnos juntos (o dejarlos en la transacción)
+            if self._transaccion is not None:
+                for turno in reserva.turnos:
+                    turno.duracion_minutos = self.obtener_servicio_por_id(turno.servicio_id).duracion_minutos
+                    self._transaccion.agregar(turno)
+            else:
+                self.turno_repository.crear_turnos(reserva.turnos, version_esperada=version)
+                reserva.id = reserva.turnos[0].id
+            
+            fin = max(minuto + servicio.duracion_minutos for servicio, (minuto, _) in zip(servicios, plan))
+            return True, (f"Reserva creada: {len(reserva.turnos)} servicios de "
+                          f"{reserva.turnos[0].hora} a {fin // 60:02d}:{fin % 60:02d}"), reserva
+        
+        except VersionCambiada:
+            raise
+        except Exception as e:
+            return False, f"Error al crear reserva: {str(e)}", None
+    
+    @con_lectura
     def obtener_turnos(self, fecha: Optional[str] = None, 
-                      profesional_id: Optional[int] = None) -> List[Turno]:
+                      profesional_id: Optional[int] = None,
+                      estado: Optional[str] = None,
+                      limite: Optional[int] = None,
+                      despues: Optional[Tuple[str, str, str]] = None) -> List[Turno]:
         """
         Obtiene turnos con filtros opcionales.
         
+        Los filtros indicados se combinan (por ejemplo profesional y fecha).
+        Con `limite` se obtiene una sola página, ordenada por fecha, hora e
+        ID; la siguiente se pide con despues=ultimo_turno.clave_orden.
+        
         Args:
             fecha: Filtrar por fecha (YYYY-MM-DD)
             profesional_id: Filtrar por profesional
-            
+            estado: Filtrar por estado
+            limite: (Opcional) Cantidad máxima de turnos a devolver
+            despues: (Opcional) Cursor: clave_orden del último turno de la
+                página anterior
+                
         Returns:
             Lista de turnos
         """
-        if fecha:
-            return self.turno_repository.obtener_turnos_por_fecha(fecha)
-        elif profesional_id:
-            return self.turno_repository.obtener_turnos_por_profesional(profesional_id)
-        else:
-            return self.turno_repository.obtener_todos_turnos()
+        return self.turno_repository.obtener_turnos_filtrados(
+            fecha=fecha, profesional_id=profesional_id, estado=estado,
+            limite=limite, despues=despues
+        )
     
-    def cancelar_turno(self, turno_id: str) -> Tuple[bool, str]:
+    @con_lectura
+    def contar_turnos(self, fecha: Optional[str] = None,
+                      profesional_id: Optional[int] = None,
+                      estado: Optional[str] = None) -> int:
+        """
+        Cuenta los turnos que cumplen los filtros (para paginar sin cargarlos).
+        
+        Args:
+            fecha: Filtrar por fecha (YYYY-MM-DD)
+            profesional_id: Filtrar por profesional
+            estado: Filtrar por estado
+            
+        Returns:
+            Número de turnos
+        """
+        return self.turno_repository.contar_turnos(
+            fecha=fecha, profesional_id=profesional_id, estado=estado
+        )
+    
+    @con_lectura
+    def obtener_turnos_rango(self, desde: str, hasta: str,
+                             profesional_id: Optional[int] = None,
+                             estado: Optional[str] = None) -> List[Turno]:
+        """
+        Obtiene los turnos entre dos fechas en una sola consulta.
+        
+        Args:
+            desde: Fecha inicial (YYYY-MM-DD)
+            hasta: Fecha final (YYYY-MM-DD), inclusive
+            profesional_id: Filtrar por profesional
+            estado: Filtrar por estado
+            
+        Returns:
+            Lista de turnos ordenados por fecha y hora
+        """
+        return self.turno_repository.obtener_turnos_rango(
+            desde, hasta, profesional_id=profesional_id, estado=estado
+        )
+    
+    @con_escritura
+    def cancelar_turno(self, turno_id: str, version: Optional[int] = None) -> Tuple[bool, str]:
         """
         Cancela un turno.
         
         Args:
             turno_id: ID del turno a cancelar
+            version: (Opcional) Versión del turno que vio el usuario; si otro lo
+                modificó después, no se cancela
             
         Returns:
             Tuple (éxito, mensaje)
         """
         try:
-            exito = self.turno_repository.cambiar_estado_turno(turno_id, "cancelado")
+            exito = self.turno_repository.cambiar_estado_turno(turno_id, "cancelado", version)
             if exito:
                 return True, "Turno cancelado exitosamente"
             else:
                 return False, "No se encontró el turno"
+        except RegistroModificado:
+            return False, "Otro usuario modificó el turno mientras tanto; revise su estado actual"
         except Exception as e:
             return False, f"Error al cancelar turno: {str(e)}"
     
-    def confirmar_turno(self, turno_id: str) -> Tuple[bool, str]:
+    @con_escritura
+    def confirmar_turno(self, turno_id: str, version: Optional[int] = None) -> Tuple[bool, str]:
         """
         Confirma un turno.
         
         Args:
             turno_id: ID del turno a confirmar
+            version: (Opcional) Versión del turno que vio el usuario; si otro lo
+                modificó después, no se confirma
             
         Returns:
             Tuple (éxito, mensaje)
         """
         try:
-            exito = self.turno_repository.cambiar_estado_turno(turno_id, "confirmado")
+            exito = self.turno_repository.cambiar_estado_turno(turno_id, "confirmado", version)
             if exito:
                 return True, "Turno confirmado exitosamente"
             else:
                 return False, "No se encontró el turno"
+        except RegistroModificado:
+            return False, "Otro usuario modificó el turno mientras tanto; revise su estado actual"
         except Exception as e:
             return False, f"Error al confirmar turno: {str(e)}"
     
+    @con_escritura
+    def eliminar_turno(self, turno_id: str) -> Tuple[bool, str]:
+        """
+        Elimina un turno.
+        
+        Args:
+            turno_id: ID del turno a eliminar
+            
+        Returns:
+            Tuple (éxito, mensaje)
+        """
+        try:
+            if self.turno_repository.eliminar_turno(turno_id):
+                return True, "Turno eliminado"
+            return False, "No se encontró el turno"
+        except Exception as e:
+            return False, f"Error al eliminar turno: {str(e)}"
+    
+    @con_lectura
     def obtener_disponibilidad(self, fecha: str, servicio_id: int) -> Dict[str, Any]:
         """
         Obtiene disponibilidad para una fecha y servicio.
@@ -271,77 +852,233 @@ class SistemaSalon:
                 "profesionales_disponibles": []
             }
         
-        # Obtener horarios disponibles
-        horarios = self.calendario.obtener_horarios_disponibles(fecha, servicio.duracion_minutos)
+        # Horarios posibles y su minuto de inicio (plantilla precalculada del calendario)
+        minutos, plantilla, _ = self.calendario.obtener_plantilla(fecha, servicio.duracion_minutos)
+        horarios = list(plantilla)
+        horarios_minutos = list(zip(horarios, minutos))
         
-        # Filtrar profesionales disponibles para cada horario
+        # Un solo cálculo de ventanas libres por profesional sobre su mapa de ocupación
+        ocupacion = self._ocupacion(fecha)["profesional"]
         profesionales_disponibles = []
+        horarios_por_profesional = {}
         
-        for profesional in self.obtener_profesionales(activos=True):
-            if servicio.id in profesional.get("especialidades", []):
-                # Verificar disponibilidad del profesional para algún horario
-                for horario in horarios:
-                    conflicto = self.turno_repository.existe_conflicto_horario(
-                        fecha, horario, servicio.duracion_minutos,
-                        profesional_id=profesional["id"]
-                    )
-                    
-                    if not conflicto:
-                        profesionales_disponibles.append({
-                            "id": profesional["id"],
-                            "nombre": profesional["nombre"],
-                            "especialidades": profesional.get("especialidades", []),
-                            "color_calendario": profesional.get("color_calendario", "#000000")
-                        })
-                        break
+        for profesional in self.obtener_profesionales_para_servicio(servicio.id):
+            libres = inicios_libres(
+                ocupacion.get(profesional["id"], 0), servicio.duracion_minutos
+            )
+            horarios_libres = [
+                horario for horario, minuto in horarios_minutos
+                if (libres >> minuto) & 1
+            ]
+            
+            if horarios_libres:
+                horarios_por_profesional[profesional["id"]] = horarios_libres
+                profesionales_disponibles.append({
+                    "id": profesional["id"],
+                    "nombre": profesional["nombre"],
+                    "especialidades": profesional.get("especialidades", []),
+                    "color_calendario": profesional.get("color_calendario", "#000000")
+                })
         
         return {
             "fecha": fecha,
             "abierto": True,
             "horarios_disponibles": horarios,
             "profesionales_disponibles": profesionales_disponibles,
+            "horarios_por_profesional": horarios_por_profesional,
             "servicio": servicio.nombre,
             "duracion_minutos": servicio.duracion_minutos
         }
     
-    def obtener_estadisticas(self) -> Dict[str, Any]:
+    def buscar_proximos_huecos(self, servicio_id: int, desde: Optional[str] = None, n: Optional[int] = 10,
+                               profesional_id: Optional[int] = None,
+                               ventana_horaria: Optional[Tuple[str, str]] = None) -> Iterator[Dict[str, Any]]:
         """
-        Obtiene estadísticas del sistema.
+        Busca los próximos horarios libres para un servicio, avanzando día por día.
         
-        Returns:
-            Diccionario con estadísticas
-        """
-        todos_turnos = self.turno_repository.obtener_todos_turnos()
+        Es un generador: cada día se evalúa recién cuando se necesita y la
+        búsqueda termina al encontrar `n` horarios, así que solo se consultan
+        los días necesarios. No pasa del horizonte de reservas
+        (anticipacion_maxima_dias). Cada día se calcula con el bloqueo de
+        lectura, que se suelta antes de entregar sus horarios.
         
-        # Contar por estado
-        estados = {"pendiente": 0, "confirmado": 0, "completado": 0, "cancelado": 0}
+        Un horario cuenta si algún profesional especializado (o el indicado)
+        tiene libre su agenda y alguno de sus recursos posibles. Si el
+        servicio no tiene profesionales especializados se devuelven los
+        horarios del salón sin profesional.
         
-        for turno in todos_turnos:
-            estados[turno.estado] = estados.get(turno.estado, 0) + 1
+        Args:
+            servicio_id: ID del servicio
+            desde: (Opcional) Fecha inicial (YYYY-MM-DD). Por defecto hoy
+            n: Cantidad máxima de horarios a devolver (None = sin límite)
+            profesional_id: (Opcional) Buscar solo para este profesional
+            ventana_horaria: (Opcional) Tupla ("HH:MM", "HH:MM"); el turno debe
+                empezar y terminar dentro de esa franja
+                
+        Returns:
+            Iterador de diccionarios {"fecha", "hora", "profesionales"}, donde
+            "profesionales" es la lista de IDs libres en ese horario
+        """
+        servicio = self.obtener_servicio_por_id(servicio_id)
+        if not servicio:
+            raise ValueError(f"Servicio con ID {servicio_id} no existe")
         
-        # Contar por servicio
-        servicios_count = {}
-        for turno in todos_turnos:
-            servicio_id = turno.servicio_id
-            servicios_count[servicio_id] = servicios_count.get(servicio_id, 0) + 1
+        if profesional_id:
+            profesional = self.obtener_profesional_por_id(profesional_id)
+            if not profesional:
+                raise ValueError(f"Profesional con ID {profesional_id} no existe")
+            if servicio.id not in profesional.get("especialidades", []):
+                raise ValueError("El profesional no está especializado en este servicio")
+            profesionales = [profesional]
+        else:
+            profesionales = self.obtener_profesionales_para_servicio(servicio.id)
         
-        # Obtener fechas de turnos futuros
-        hoy = datetime.now().date()
-        turnos_futuros = []
+        ventana = None
+        if ventana_horaria:
+            try:
+                inicio, fin = (datetime.strptime(hora, "%H:%M") for hora in ventana_horaria)
+            except ValueError:
+                raise ValueError("Formato de hora inválido. Use HH:MM")
+            ventana = (inicio.hour * 60 + inicio.minute, fin.hour * 60 + fin.minute)
         
-        for turno in todos_turnos:
+        hoy = date.today()
+        inicio_busqueda = hoy
+        if desde:
             try:
-                fecha_turno = datetime.strptime(turno.fecha, "%Y-%m-%d").date()
-                if fecha_turno >= hoy:
-                    turnos_futuros.append(turno)
+                inicio_busqueda = max(hoy, datetime.strptime(desde, "%Y-%m-%d").date())
             except ValueError:
+                raise ValueError("Formato de fecha inválido. Use YYYY-MM-DD")
+        
+        huecos = self._iterar_huecos(servicio, profesionales, inicio_busqueda, hoy, ventana)
+        return huecos if n is None else islice(huecos, n)
+    
+    def _iterar_huecos(self, servicio: Servicio, profesionales: List[Dict[str, Any]],
+                       inicio_busqueda: date, hoy: date,
+                       ventana: Optional[Tuple[int, int]]) -> Iterator[Dict[str, Any]]:
+        """Genera los horarios libres día por día (ver buscar_proximos_huecos)."""
+        max_turnos = self.calendario.config["turnos"]["max_turnos_dia"]
+        dias = self.calendario.config["turnos"]["anticipacion_maxima_dias"]
+        ultimo = hoy + timedelta(days=dias)
+        
+        for desplazamiento in range((ultimo - inicio_busqueda).days + 1):
+            dia = inicio_busqueda + timedelta(days=desplazamiento)
+            with self._bloqueo_rw.lectura():
+                huecos = self._huecos_dia(servicio, profesionales, dia, hoy, ventana, max_turnos)
+            yield from huecos
+    
+    def _huecos_dia(self, servicio: Servicio, profesionales: List[Dict[str, Any]], dia: date,
+                    hoy: date, ventana: Optional[Tuple[int, int]],
+                    max_turnos: int) -> List[Dict[str, Any]]:
+        """Calcula los horarios libres de un día (ver buscar_proximos_huecos)."""
+        duracion = servicio.duracion_minutos
+        fecha = dia.strftime("%Y-%m-%d")
+        
+        minutos, horarios, _ = self.calendario.obtener_plantilla(fecha, duracion)
+        if not minutos:
+            return []
+        if self.turno_repository.contar_turnos_por_fecha(fecha) >= max_turnos:
+            return []
+        
+        # Ventanas libres de cada profesional combinadas con las de su recurso
+        ocupacion = self._ocupacion(fecha)
+        libres_por_profesional = []
+        for profesional in profesionales:
+            libres = inicios_libres(ocupacion["profesional"].get(profesional["id"], 0), duracion)
+            libres_recurso = 0
+            for recurso in AsignadorTurnos.recursos_para(servicio, profesional):
+                libres_recurso |= inicios_libres(ocupacion["recurso"].get(recurso, 0), duracion)
+            libres_por_profesional.append((profesional["id"], libres & libres_recurso))
+        
+        huecos = []
+        for minuto, hora in zip(minutos, horarios):
+            if ventana and not (ventana[0] <= minuto and minuto + duracion <= ventana[1]):
+                continue
+            
+            libres_ids = [pid for pid, libres in libres_por_profesional if (libres >> minuto) & 1]
+            if profesionales and not libres_ids:
                 continue
+            
+            # Hoy se aplican además las reglas de anticipación del calendario
+            if dia == hoy:
+                if not self.calendario.validar_horario(fecha, hora, duracion)[0]:
+                    continue
+            
+            huecos.append({"fecha": fecha, "hora": hora, "profesionales": libres_ids})
+        return huecos
+    
+    @con_escritura
+    def reoptimizar_asignaciones(self, fecha: str,
+                                 exacto: Optional[bool] = None) -> Tuple[bool, str, Dict[Any, Any]]:
+        """
+        Asigna profesional y recurso a los turnos de una fecha que no tienen profesional.
+        
+        Los turnos que ya tienen profesional no se mueven. El resto se
+        reparte buscando ubicar la mayor cantidad y equilibrar la carga.
+        
+        Args:
+            fecha: Fecha en formato YYYY-MM-DD
+            exacto: (Opcional) Forzar (True) o evitar (False) la búsqueda exacta;
+                por defecto se usa solo en días con pocos turnos sin asignar
+                
+        Returns:
+            Tuple (éxito, mensaje, {ID del turno: (profesional_id, recurso) o None})
+        """
+        return self._reintentar(lambda: self._reoptimizar_asignaciones(fecha, exacto), vacio={})
+    
+    def _reoptimizar_asignaciones(self, fecha: str,
+                                  exacto: Optional[bool]) -> Tuple[bool, str, Dict[Any, Any]]:
+        """Reasigna los turnos sin profesional de una fecha (ver reoptimizar_asignaciones)."""
+        try:
+            version = self.turno_repository.obtener_version([fecha])
+            turnos = [
+                turno for turno in self.turno_repository.obtener_turnos_por_fecha(fecha)
+                if turno.estado != "cancelado"
+            ]
+            pendientes = [turno for turno in turnos if not turno.profesional_id]
+            if not pendientes:
+                return True, "No hay turnos sin profesional", {}
+            
+            # Los mismos ocupantes que al crear un turno, bloqueos vigentes incluidos
+            ids_pendientes = {str(turno.id) for turno in pendientes}
+            fijos = [
+                turno for turno in self._ocupantes_fecha(fecha)
+                if str(turno.id) not in ids_pendientes and turno.estado != "cancelado"
+            ]
+            asignaciones = self._crear_asignador().asignar(pendientes, fijos, exacto=exacto)
+            
+            asignados = []
+            for turno in pendientes:
+                asignacion = asignaciones.get(turno.id)
+                if asignacion:
+                    turno.profesional_id, turno.recurso = asignacion
+                    asignados.append(turno)
+            # Una sola escritura: si algo falla no queda ninguno reasignado
+            if asignados:
+                self.turno_repository.actualizar_turnos(asignados, version_esperada=version)
+            
+            return True, f"Se asignaron {len(asignados)} de {len(pendientes)} turnos", asignaciones
+        except VersionCambiada:
+            raise
+        except Exception as e:
+            return False, f"Error al reoptimizar asignaciones: {str(e)}", {}
+    
+    @con_lectura
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        """
+        Obtiene estadísticas del sistema.
+        
+        Returns:
+            Diccionario con estadísticas
+        """
+        # Contadores mantenidos por el repositorio, no se recorren los turnos
+        contadores = self.turno_repository.obtener_estadisticas()
         
         return {
-            "total_turnos": len(todos_turnos),
-            "turnos_futuros": len(turnos_futuros),
-            "estados": estados,
-            "servicios": servicios_count,
+            "total_turnos": contadores["total"],
+            "turnos_futuros": contadores["futuros"],
+            "estados": contadores["estados"],
+            "servicios": contadores["servicios"],
+            "turnos_por_profesional": contadores["profesionales"],
             "profesionales_activos": len(self.obtener_profesionales(activos=True)),
             "servicios_disponibles": len(self.servicios)
         }
@@ -0,0 +1,69 @@
+# salon_belleza/core/transaccion.py
+"""
+Transacción de turnos: se validan en memoria y se guardan juntos.
+"""
+from typing import List, Any, Optional
+from ..models.turno import Turno
+
+class TransaccionTurnos:
+    """
+    Turnos creados dentro de `SistemaSalon.transaccion()` que aún no se guardaron.
+    
+    Mientras la transacción está abierta, los turnos nuevos se validan
+    contra lo guardado más lo pendiente (así se detectan conflictos entre
+    ellos) y se acumulan aquí. Al cerrar se guardan con una sola escritura;
+    si alguno falló no se guarda ninguno.
+    """
+    
+    def __init__(self):
+        """Inicializa una transacción vacía."""
+        self.turnos: List[Turno] = []
+        self.errores: List[str] = []
+        self.bloqueos: List[Any] = []
+        self.confirmada = False
+        self.mensaje = ""
+    
+    def agregar(self, turno: Turno):
+        """Agrega un turno ya validado (con duracion_minutos asignada)."""
+        self.turnos.append(turno)
+    
+    def registrar_error(self, mensaje: str):
+        """Marca la transacción para deshacerla al cerrar."""
+        self.errores.append(mensaje)
+    
+    def cancelar(self, motivo: str = "Cancelada por el usuario"):
+        """Descarta la transacción: al cerrar no se guarda nada."""
+        self.registrar_error(motivo)
+    
+    def turnos_fecha(self, fecha: str) -> List[Turno]:
+        """Obtiene los turnos pendientes de una fecha."""
+        return [turno for turno in self.turnos if turno.fecha == fecha]
+    
+    def contar_fecha(self, fecha: str) -> int:
+        """Cuenta los turnos pendientes de una fecha."""
+        return sum(1 for turno in self.turnos if turno.fecha == fecha)
+    
+    def hay_conflicto(self, fecha: str, inicio: int, fin: int,
+                      profesional_id: Optional[Any] = None, recurso: Optional[str] = None) -> bool:
+        """
+        Indica si algún turno pendiente ocupa al profesional o al recurso en [inicio, fin).
+        
+        Args:
+            fecha: Fecha en formato YYYY-MM-DD
+            inicio: Minuto de inicio
+            fin: Minuto de fin (excluido)
+            profesional_id: (Opcional) Profesional a verificar
+            recurso: (Opcional) Recurso a verificar
+        """
+        for turno in self.turnos_fecha(fecha):
+            if turno.estado == "cancelado":
+                continue
+            if turno.inicio_minutos >= fin or turno.fin_minutos <= inicio:
+                continue
+            if profesional_id and turno.profesional_id == profesional_id:
+                return True
+            if recurso and turno.recurso == recurso:
+                return True
+        return False
+
+print("✅ Clase 'TransaccionTurnos' definida")
\ No newline at end of file
@@ -2,7 +2,7 @@
 """
 Modelo para reservas múltiples (varios servicios en un día).
 """
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import List, Dict, Any, Optional
 from .turno import Turno
 
@@ -46,14 +46,10 @@ class ReservaMultiple:
             turno_siguiente = self.turnos[i + 1]
             
             # Calcular fin del turno actual
-            hora_actual = datetime.strptime(turno_actual.hora, "%H:%M")
             duracion_actual = turno_actual.duracion_real or 60
-            fin_actual = hora_actual + timedelta(minutes=duracion_actual)
+            fin_actual = turno_actual.inicio_minutos + duracion_actual
             
-            # Calcular inicio del siguiente turno
-            hora_siguiente = datetime.strptime(turno_siguiente.hora, "%H:%M")
-            
-            if hora_siguiente < fin_actual:
+            if turno_siguiente.inicio_minutos < fin_actual:
                 return True  # Hay superposición
         
         return False
@@ -2,11 +2,46 @@
 """
 Modelo de Turno - representa una cita/reserva.
 """
-from datetime import datetime
-from typing import Optional, Dict, Any
+from datetime import datetime, date
+from typing import Optional, Dict, Any, Tuple
+
+def hora_a_minutos(hora: str) -> int:
+    """
+    Convierte HH:MM (o H:MM, que también acepta la validación) a minutos desde medianoche.
+    
+    Es más rápido que strptime y lo usan todos los que indexan turnos por hora.
+    
+    Raises:
+        ValueError: Si la hora no tiene ese formato
+    """
+    partes = hora.split(":")
+    if len(partes) != 2 or not all(parte.isdigit() for parte in partes):
+        raise ValueError(f"Formato de hora inválido: {hora}")
+    horas, minutos = int(partes[0]), int(partes[1])
+    if horas > 23 or minutos > 59:
+        raise ValueError(f"Formato de hora inválido: {hora}")
+    return horas * 60 + minutos
 
 class Turno:
-    """Turno individual para un servicio."""
+    """
+    Turno individual para un servicio.
+    
+    Usa __slots__ para ocupar menos memoria cuando se cargan muchos turnos.
+    El ordinal de la fecha y los minutos de inicio y fin se calculan la
+    primera vez que se piden y se recalculan si cambia la fecha o la hora.
+    
+    `version` cuenta las actualizaciones guardadas: el repositorio solo
+    acepta una actualización si el turno sigue en la versión con la que se
+    leyó, así dos personas que lo modifican a la vez no se pisan.
+    """
+    
+    __slots__ = (
+        "id", "cliente_nombre", "telefono", "email",
+        "_fecha", "_hora", "servicio_id", "profesional_id", "recurso",
+        "estado", "timestamp_registro", "version",
+        "precio_final", "notas_internas", "estado_pago", "duracion_real",
+        "duracion_minutos", "_fecha_ordinal", "_inicio_minutos"
+    )
     
     def __init__(self, 
                  cliente_nombre: str,
@@ -36,6 +71,7 @@ class Turno:
         # Estado
         self.estado = "pendiente"  # pendiente, confirmado, completado, cancelado
         self.timestamp_registro: Optional[str] = None
+        self.version = 0
         
         # Datos internos (completados por el personal)
         self.precio_final: Optional[float] = None
@@ -43,9 +79,55 @@ class Turno:
         self.estado_pago = "pendiente"  # pendiente, pagado, parcial
         self.duracion_real: Optional[int] = None
         
+        # Duración prevista según el servicio (no se guarda, la asigna el repositorio)
+        self.duracion_minutos: Optional[int] = None
+        
         # Validación básica
         self._validar()
     
+    @property
+    def fecha(self) -> str:
+        return self._fecha
+    
+    @fecha.setter
+    def fecha(self, valor: str):
+        self._fecha = valor
+        self._fecha_ordinal = None
+    
+    @property
+    def hora(self) -> str:
+        return self._hora
+    
+    @hora.setter
+    def hora(self, valor: str):
+        self._hora = valor
+        self._inicio_minutos = None
+    
+    @property
+    def fecha_ordinal(self) -> int:
+        """Ordinal de la fecha (date.toordinal), calculado una sola vez."""
+        if self._fecha_ordinal is None:
+            fecha = self._fecha
+            self._fecha_ordinal = date(int(fecha[:4]), int(fecha[5:7]), int(fecha[8:10])).toordinal()
+        return self._fecha_ordinal
+    
+    @property
+    def inicio_minutos(self) -> int:
+        """Minutos desde medianoche de la hora de inicio."""
+        if self._inicio_minutos is None:
+            self._inicio_minutos = hora_a_minutos(self._hora)
+        return self._inicio_minutos
+    
+    @property
+    def fin_minutos(self) -> int:
+        """Minutos desde medianoche de la hora de fin (60 minutos si no se conoce la duración)."""
+        return self.inicio_minutos + (self.duracion_minutos or 60)
+    
+    @property
+    def clave_orden(self) -> Tuple[str, str, str]:
+        """(fecha, hora, ID): orden de las páginas de turnos y cursor para pedir la siguiente."""
+        return (self._fecha, self._hora, str(self.id))
+    
     def _validar(self):
         """Valida los datos básicos."""
         if not self.cliente_nombre.strip():
@@ -77,6 +159,7 @@ class Turno:
             "recurso": self.recurso,
             "estado": self.estado,
             "timestamp_registro": self.timestamp_registro or datetime.now().isoformat(),
+            "version": self.version,
             "precio_final": self.precio_final,
             "notas_internas": self.notas_internas,
             "estado_pago": self.estado_pago,
@@ -101,6 +184,7 @@ class Turno:
         turno.id = data.get("id")
         turno.estado = data.get("estado", "pendiente")
         turno.timestamp_registro = data.get("timestamp_registro")
+        turno.version = data.get("version") or 0
         turno.precio_final = data.get("precio_final")
         turno.notas_internas = data.get("notas_internas", "")
         turno.estado_pago = data.get("estado_pago", "pendiente")
@@ -108,6 +192,45 @@ class Turno:
         
         return turno
     
+    @classmethod
+    def desde_almacenamiento(cls, data: Dict[str, Any],
+                             duracion_minutos: Optional[int] = None) -> 'Turno':
+        """
+        Crea un Turno desde un registro ya guardado, sin volver a validarlo.
+        
+        Los registros se validan al crearse, así que al cargarlos en bloque
+        no hace falta pasar de nuevo por strptime. Para datos que vienen de
+        afuera usar from_dict.
+        
+        Args:
+            data: Diccionario tal como está en el almacenamiento
+            duracion_minutos: (Opcional) Duración del servicio en minutos
+            
+        Returns:
+            Turno con los datos del registro
+        """
+        turno = cls.__new__(cls)
+        turno.id = data.get("id")
+        turno.cliente_nombre = data["cliente_nombre"]
+        turno.telefono = data.get("telefono", "")
+        turno.email = data.get("email", "")
+        turno._fecha = data["fecha"]
+        turno._hora = data["hora"]
+        turno._fecha_ordinal = None
+        turno._inicio_minutos = None
+        turno.servicio_id = data["servicio_id"]
+        turno.profesional_id = data.get("profesional_id")
+        turno.recurso = data.get("recurso")
+        turno.estado = data.get("estado", "pendiente")
+        turno.timestamp_registro = data.get("timestamp_registro")
+        turno.version = data.get("version") or 0
+        turno.precio_final = data.get("precio_final")
+        turno.notas_internas = data.get("notas_internas", "")
+        turno.estado_pago = data.get("estado_pago", "pendiente")
+        turno.duracion_real = data.get("duracion_real")
+        turno.duracion_minutos = duracion_minutos
+        return turno
+    
     def __str__(self) -> str:
         """Representación legible."""
         return f"Turno: {self.cliente_nombre} - {self.fecha} {self.hora}"
@@ -3,9 +3,15 @@
 Módulo de persistencia de datos (JSON).
 """
 
+from .bloqueo_archivo import BloqueoArchivo, VersionCambiada, RegistroModificado
 from .json_storage import JSONStorage
+from .journal_storage import JournalStorage
+from .sqlite_storage import SQLiteStorage
+from .sharded_storage import ShardedJSONStorage
+from .catalogo_servicios import CatalogoServicios
+from .bloqueos_horario import BloqueosHorario
 from .turno_repository import TurnoRepository
 
-__all__ = ['JSONStorage', 'TurnoRepository']
+__all__ = ['BloqueoArchivo', 'VersionCambiada', 'RegistroModificado', 'JSONStorage', 'JournalStorage', 'SQLiteStorage', 'ShardedJSONStorage', 'CatalogoServicios', 'BloqueosHorario', 'TurnoRepository']
 
-print("✅ Módulo 'persistence' cargado con clases: JSONStorage, TurnoRepository")
\ No newline at end of file
+print("✅ Módulo 'persistence' cargado con clases: BloqueoArchivo, JSONStorage, JournalStorage, SQLiteStorage, ShardedJSONStorage, CatalogoServicios, BloqueosHorario, TurnoRepository")
\ No newline at end of file
@@ -0,0 +1,191 @@
+# salon_belleza/persistence/bloqueo_archivo.py
+"""
+Bloqueo entre procesos y versión de un archivo de datos.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se protege dentro del mismo proceso
+    fcntl = None
+
+class VersionCambiada(Exception):
+    """La versión del almacenamiento no es la esperada: otro proceso escribió antes."""
+    
+    def __init__(self, esperada: int, actual: int):
+        super().__init__(f"La versión de los datos cambió (esperada {esperada}, actual {actual})")
+        self.esperada = esperada
+        self.actual = actual
+
+class RegistroModificado(ValueError):
+    """El registro tiene otra versión que la leída: alguien lo actualizó en el medio."""
+    
+    def __init__(self, item_id: Any, esperada: int, actual: int):
+        super().__init__(
+            f"El registro {item_id} fue modificado por otro usuario "
+            f"(versión esperada {esperada}, actual {actual})"
+        )
+        self.item_id = item_id
+        self.esperada = esperada
+        self.actual = actual
+
+def versionar_cambio(item: Dict[str, Any], nuevos_datos: Dict[str, Any],
+                     version_registro: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Verifica la versión de un registro y agrega la siguiente a los datos nuevos.
+    
+    Debe llamarse con el bloqueo de escritura tomado. Los registros que
+    tienen campo "version" (los turnos) lo avanzan en cada actualización;
+    los demás solo si se pide verificarla.
+    
+    Args:
+        item: Registro tal como está guardado
+        nuevos_datos: Campos a actualizar
+        version_registro: (Opcional) Versión con la que se leyó el registro
+        
+    Returns:
+        Los datos a guardar, con la versión nueva si corresponde
+        
+    Raises:
+        RegistroModificado: Si la versión del registro no es version_registro
+    """
+    actual = item.get("version") or 0
+    if version_registro is not None and actual != version_registro:
+        raise RegistroModificado(item.get("id"), version_registro, actual)
+    if version_registro is None and "version" not in item:
+        return nuevos_datos
+    return {**nuevos_datos, "version": actual + 1}
+
+class BloqueoArchivo:
+    """
+    Bloqueo consultivo (fcntl.flock) sobre un archivo `.lock` que además
+    guarda la versión de los datos.
+    
+    Las escrituras toman el bloqueo exclusivo y avanzan la versión; leer la
+    versión usa el bloqueo compartido, así que nunca se ve a medio escribir.
+    La última versión leída queda en caché junto con la firma del archivo
+    (mtime, tamaño, inode) y se reutiliza mientras la firma no cambie.
+    Es reentrante dentro de un mismo hilo (un nivel interno no cambia el
+    modo del externo, así que no se debe pedir el exclusivo dentro del
+    compartido) y también excluye a los otros hilos del proceso. El archivo
+    se crea recién cuando se usa.
+    """
+    
+    # El mtime puede tener la resolución del reloj del kernel: dos escrituras
+    # en el mismo tic dejan la misma firma. Por eso solo se guarda en caché
+    # una firma más vieja que este margen (una escritura posterior ya no
+    # puede repetir su mtime).
+    MARGEN_FIRMA_NS = 20_000_000
+    
+    def __init__(self, ruta: Path):
+        """
+        Inicializa el bloqueo.
+        
+        Args:
+            ruta: Ruta del archivo de bloqueo (por ejemplo `turnos.json.lock`)
+        """
+        self.ruta = Path(ruta)
+        self._hilos = threading.RLock()
+        self._fd: Optional[int] = None
+        self._nivel = 0
+        
+        # (firma del archivo, versión) de la última lectura
+        self._cache_version: Optional[Tuple[Tuple[int, int, int], int]] = None
+    
+    def _descriptor(self) -> int:
+        """Abre (una sola vez) el archivo de bloqueo."""
+        if self._fd is None:
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.ruta, os.O_RDWR | os.O_CREAT, 0o644)
+        return self._fd
+    
+    @contextmanager
+    def _tomar(self, modo: Optional[int]) -> Iterator[int]:
+        """Toma el bloqueo del hilo y, si es el primer nivel, el del archivo."""
+        with self._hilos:
+            fd = self._descriptor()
+            primero = self._nivel == 0
+            if primero and fcntl is not None:
+                fcntl.flock(fd, modo)
+            self._nivel += 1
+            try:
+                yield fd
+            finally:
+                self._nivel -= 1
+                if primero and fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+    
+    @contextmanager
+    def exclusivo(self) -> Iterator[None]:
+        """Bloqueo exclusivo para escribir."""
+        with self._tomar(fcntl.LOCK_EX if fcntl else None):
+            yield
+    
+    @contextmanager
+    def compartido(self) -> Iterator[None]:
+        """Bloqueo compartido para leer sin ver una escritura a medias."""
+        with self._tomar(fcntl.LOCK_SH if fcntl else None):
+            yield
+    
+    def _firma(self, fd: int) -> Tuple[int, int, int]:
+        """Obtiene (mtime_ns, tamaño, inode) del archivo de bloqueo."""
+        st = os.fstat(fd)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    
+    def leer_version(self) -> int:
+        """
+        Obtiene la versión actual (0 si nunca se escribió).
+        
+        Si el archivo no cambió desde la última lectura se devuelve la
+        versión en caché sin tomar el bloqueo. Con el bloqueo tomado (al
+        verificar antes de escribir) se lee siempre del archivo.
+        """
+        cache = self._cache_version
+        if cache is not None and self._nivel == 0 and self._firma(self._fd) == cache[0]:
+            return cache[1]
+        
+        with self._tomar(fcntl.LOCK_SH if fcntl else None) as fd:
+            contenido = os.pread(fd, 32, 0)
+            firma = self._firma(fd)
+        try:
+            version = int(contenido or 0)
+        except ValueError:
+            version = 0
+        reciente = time.time_ns() - firma[0] < self.MARGEN_FIRMA_NS
+        self._cache_version = None if reciente else (firma, version)
+        return version
+    
+    def avanzar_version(self) -> int:
+        """
+        Incrementa la versión. Debe llamarse con el bloqueo exclusivo tomado.
+        
+        Returns:
+            La versión nueva
+        """
+        with self._tomar(fcntl.LOCK_EX if fcntl else None) as fd:
+            version = self.leer_version() + 1
+            contenido = str(version).encode()
+            os.pwrite(fd, contenido, 0)
+            os.ftruncate(fd, len(contenido))
+            self._cache_version = None
+        return version
+    
+    def verificar_version(self, esperada: Optional[int]):
+        """
+        Lanza VersionCambiada si la versión actual no es la esperada.
+        
+        Args:
+            esperada: Versión leída antes de validar; None no verifica nada
+        """
+        if esperada is None:
+            return
+        actual = self.leer_version()
+        if actual != esperada:
+            raise VersionCambiada(esperada, actual)
+
+print("✅ Clase 'BloqueoArchivo' definida")
\ No newline at end of file
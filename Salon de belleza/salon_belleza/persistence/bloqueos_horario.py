@@ -0,0 +1,282 @@
+# salon_belleza/persistence/bloqueos_horario.py
+"""
+Bloqueos temporales de horarios mientras se completa una reserva.
+"""
+import heapq
+import threading
+import time
+from typing import List, Dict, Any, Optional, Callable, Tuple, Set
+from .json_storage import JSONStorage
+from ..models.turno import hora_a_minutos
+
+class BloqueosHorario:
+    """
+    Reserva por unos segundos la ventana (fecha, hora, profesional/recurso)
+    que alguien está por agendar, para que nadie más la tome en el medio.
+    
+    Los bloqueos se guardan en un archivo JSON (así los ven otros procesos)
+    y vencen solos. En memoria se mantiene un min-heap de (vencimiento, ID):
+    descartar los vencidos es sacar del tope del heap, O(log n) por bloqueo,
+    sin recorrer los activos. Renovar o liberar no toca el heap; la entrada
+    vieja se ignora cuando llega al tope. El estado en memoria se modifica
+    de a un hilo por vez.
+    """
+    
+    DURACION_POR_DEFECTO = 300
+    
+    def __init__(self, file_path: str = "data/bloqueos.json",
+                 duracion_segundos: int = DURACION_POR_DEFECTO,
+                 reloj: Callable[[], float] = time.time):
+        """
+        Inicializa los bloqueos.
+        
+        Args:
+            file_path: Ruta al archivo JSON de bloqueos
+            duracion_segundos: Duración de un bloqueo si no se indica otra
+            reloj: (Opcional) Función que devuelve la hora actual en segundos
+        """
+        self.storage = JSONStorage(file_path)
+        self.duracion_segundos = duracion_segundos
+        self.reloj = reloj
+        
+        self._revision: Optional[int] = None
+        self._activos: Dict[str, Dict[str, Any]] = {}
+        self._por_fecha: Dict[str, Set[str]] = {}
+        self._vencimientos: List[Tuple[float, str]] = []
+        self._vencidos: List[Any] = []
+        self._mutex = threading.RLock()
+    
+    def _agregar(self, data: Dict[str, Any]):
+        """Registra un bloqueo en memoria."""
+        clave = str(data["id"])
+        self._activos[clave] = data
+        self._por_fecha.setdefault(data["fecha"], set()).add(clave)
+        heapq.heappush(self._vencimientos, (data["vence"], clave))
+    
+    def _quitar(self, clave: str) -> Optional[Dict[str, Any]]:
+        """Quita un bloqueo de memoria (su entrada del heap queda obsoleta)."""
+        data = self._activos.pop(clave, None)
+        if data is not None:
+            ids = self._por_fecha.get(data["fecha"])
+            if ids is not None:
+                ids.discard(clave)
+                if not ids:
+                    del self._por_fecha[data["fecha"]]
+        return data
+    
+    def _sincronizar(self):
+        """Reconstruye los bloqueos si el archivo cambió y descarta los vencidos."""
+        revision = self.storage.obtener_revision()
+        if revision != self._revision:
+            self._activos = {}
+            self._por_fecha = {}
+            self._vencimientos = []
+            for data in self.storage.obtener_todos():
+                clave = str(data.get("id"))
+                self._activos[clave] = data
+                self._por_fecha.setdefault(data.get("fecha"), set()).add(clave)
+                self._vencimientos.append((data.get("vence", 0), clave))
+            heapq.heapify(self._vencimientos)
+            self._revision = revision
+        
+        self._purgar()
+    
+    def _purgar(self):
+        """Saca del heap los bloqueos vencidos."""
+        ahora = self.reloj()
+        while self._vencimientos and self._vencimientos[0][0] <= ahora:
+            vence, clave = heapq.heappop(self._vencimientos)
+            data = self._activos.get(clave)
+            # Entradas de bloqueos renovados o liberados
+            if data is None or data["vence"] != vence:
+                continue
+            self._quitar(clave)
+            self._vencidos.append(data["id"])
+    
+    def _escribir(self, operacion: Callable[[Optional[int]], Any],
+                  version_esperada: Optional[int] = None) -> Any:
+        """
+        Ejecuta una escritura en el archivo junto con la limpieza de vencidos.
+        
+        Si en el medio escribió otro proceso, los bloqueos se releen. Con
+        version_esperada cada escritura es condicional; las propias de la
+        limpieza se descuentan antes de la operación.
+        """
+        for item_id in self._vencidos:
+            revision_previa = self.storage.revision
+            escribio = self.storage.eliminar(item_id, version_esperada)
+            self._seguir_revision(revision_previa, escribio)
+            if escribio and version_esperada is not None:
+                version_esperada += 1
+        self._vencidos = []
+        
+        revision_previa = self.storage.revision
+        resultado = operacion(version_esperada)
+        self._seguir_revision(revision_previa, bool(resultado))
+        return resultado
+    
+    def _seguir_revision(self, revision_previa: int, escribio: bool):
+        """Adopta la revisión nueva si solo cambió por nuestra propia escritura."""
+        revision = self.storage.obtener_revision()
+        if self._revision == revision_previa and revision == revision_previa + int(escribio):
+            self._revision = revision
+        else:
+            self._revision = None
+    
+    def obtener_version(self) -> int:
+        """Obtiene la versión del archivo de bloqueos (ver JSONStorage.obtener_version)."""
+        return self.storage.obtener_version()
+    
+    def activos(self, fecha: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Obtiene los bloqueos vigentes.
+        
+        Args:
+            fecha: (Opcional) Solo los de esa fecha (YYYY-MM-DD)
+        """
+        with self._mutex:
+            self._sincronizar()
+            if fecha is None:
+                return list(self._activos.values())
+            return [self._activos[clave] for clave in self._por_fecha.get(fecha, ())]
+    
+    def obtener(self, bloqueo_id: Any) -> Optional[Dict[str, Any]]:
+        """Obtiene un bloqueo vigente por ID o None si no existe o venció."""
+        with self._mutex:
+            self._sincronizar()
+            return self._activos.get(str(bloqueo_id))
+    
+    @staticmethod
+    def _intervalo(data: Dict[str, Any]) -> Tuple[int, int]:
+        """Obtiene [inicio, fin) en minutos de un bloqueo."""
+        inicio = hora_a_minutos(data["hora"])
+        return inicio, inicio + data["duracion_minutos"]
+    
+    def hay_conflicto(self, fecha: str, inicio: int, fin: int,
+                      profesional_id: Optional[Any] = None, recurso: Optional[str] = None,
+                      excluir: Optional[Any] = None) -> bool:
+        """
+        Indica si un bloqueo vigente ocupa al profesional o al recurso en [inicio, fin).
+        
+        Args:
+            fecha: Fecha en formato YYYY-MM-DD
+            inicio: Minuto de inicio
+            fin: Minuto de fin (excluido)
+            profesional_id: (Opcional) Profesional a verificar
+            recurso: (Opcional) Recurso a verificar
+            excluir: (Opcional) ID de un bloqueo a ignorar (el propio)
+        """
+        for data in self.activos(fecha):
+            if excluir is not None and str(data["id"]) == str(excluir):
+                continue
+            inicio_bloqueo, fin_bloqueo = self._intervalo(data)
+            if inicio_bloqueo >= fin or fin_bloqueo <= inicio:
+                continue
+            if profesional_id and data.get("profesional_id") == profesional_id:
+                return True
+            if recurso and data.get("recurso") == recurso:
+                return True
+        return False
+    
+    def ocupacion(self, fecha: str, excluir: Optional[Any] = None) -> Dict[str, Dict[Any, int]]:
+        """
+        Obtiene los mapas de ocupación por minuto de los bloqueos de una fecha.
+        
+        Returns:
+            {"profesional": {id: mapa_bits}, "recurso": {nombre: mapa_bits}},
+            con el mismo formato que TurnoRepository.obtener_ocupacion
+        """
+        ocupacion = {"profesional": {}, "recurso": {}}
+        for data in self.activos(fecha):
+            if excluir is not None and str(data["id"]) == str(excluir):
+                continue
+            inicio, fin = self._intervalo(data)
+            bits = ((1 << (fin - inicio)) - 1) << inicio
+            for tipo, valor in (("profesional", data.get("profesional_id")),
+                                ("recurso", data.get("recurso"))):
+                if valor:
+                    ocupacion[tipo][valor] = ocupacion[tipo].get(valor, 0) | bits
+        return ocupacion
+    
+    def crear(self, fecha: str, hora: str, duracion_minutos: int, servicio_id: Any = None,
+              profesional_id: Optional[Any] = None, recurso: Optional[str] = None,
+              segundos: Optional[int] = None,
+              version_esperada: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Crea un bloqueo.
+        
+        Args:
+            fecha: Fecha en formato YYYY-MM-DD
+            hora: Hora de inicio (HH:MM)
+            duracion_minutos: Duración de la ventana bloqueada
+            servicio_id: (Opcional) Servicio que se está reservando
+            profesional_id: (Opcional) Profesional bloqueado
+            recurso: (Opcional) Recurso bloqueado
+            segundos: (Opcional) Duración del bloqueo; por defecto duracion_segundos
+            version_esperada: (Opcional) Versión leída con obtener_version antes
+                de verificar conflictos
+            
+        Returns:
+            El bloqueo creado, con "id" y "vence" (segundos desde epoch)
+            
+        Raises:
+            VersionCambiada: Si otro proceso modificó los bloqueos desde version_esperada
+        """
+        with self._mutex:
+            self._sincronizar()
+            data = {
+                "fecha": fecha,
+                "hora": hora,
+                "duracion_minutos": duracion_minutos,
+                "servicio_id": servicio_id,
+                "profesional_id": profesional_id,
+                "recurso": recurso,
+                "vence": self.reloj() + (segundos or self.duracion_segundos)
+            }
+            resultado = self._escribir(lambda version: self.storage.agregar(data, version), version_esperada)
+            if self._revision is not None:
+                self._agregar(resultado)
+            return resultado
+    
+    def renovar(self, bloqueo_id: Any, segundos: Optional[int] = None) -> bool:
+        """
+        Extiende un bloqueo vigente.
+        
+        Returns:
+            True si el bloqueo existía y se renovó
+        """
+        with self._mutex:
+            self._sincronizar()
+            clave = str(bloqueo_id)
+            if clave not in self._activos:
+                return False
+            
+            vence = self.reloj() + (segundos or self.duracion_segundos)
+            if not self._escribir(lambda version: self.storage.actualizar(bloqueo_id, {"vence": vence})):
+                return False
+            if self._revision is not None:
+                data = self._quitar(clave)
+                if data is not None:
+                    data["vence"] = vence
+                    self._agregar(data)
+            return True
+    
+    def liberar(self, bloqueo_id: Any) -> bool:
+        """
+        Libera un bloqueo antes de que venza.
+        
+        Returns:
+            True si el bloqueo existía
+        """
+        with self._mutex:
+            self._sincronizar()
+            clave = str(bloqueo_id)
+            if clave not in self._activos:
+                return False
+            
+            self._escribir(lambda version: self.storage.eliminar(bloqueo_id))
+            if self._revision is not None:
+                self._quitar(clave)
+            return True
+
+print("✅ Clase 'BloqueosHorario' definida")
\ No newline at end of file
@@ -0,0 +1,111 @@
+# salon_belleza/persistence/catalogo_servicios.py
+"""
+Catálogo de servicios en memoria compartido entre componentes.
+"""
+import threading
+from typing import List, Dict, Any, Optional
+from ..models.servicio import Servicio
+from .json_storage import JSONStorage
+
+class CatalogoServicios:
+    """
+    Mantiene los servicios indexados por ID.
+    
+    Se reconstruye solo cuando cambia servicios.json (según la revisión del
+    almacenamiento), así que consultar un servicio o su duración es una
+    búsqueda en un diccionario. SistemaSalon y TurnoRepository comparten la
+    misma instancia; para pruebas puede pasarse un catálogo propio.
+    """
+    
+    DURACION_POR_DEFECTO = 60
+    
+    def __init__(self, file_path: str = "data/servicios.json",
+                 storage: Optional[JSONStorage] = None):
+        """
+        Inicializa el catálogo.
+        
+        Args:
+            file_path: Ruta al archivo JSON de servicios
+            storage: (Opcional) Almacenamiento a usar en lugar de file_path
+        """
+        self.storage = storage or JSONStorage(file_path)
+        self._revision: Optional[int] = None
+        self._mutex = threading.Lock()
+        
+        self._servicios: List[Servicio] = []
+        self._por_id: Dict[Any, Servicio] = {}
+        self._datos_por_id: Dict[str, Dict[str, Any]] = {}
+        self._duraciones: Dict[str, int] = {}
+    
+    def _sincronizar(self):
+        """Reconstruye el catálogo si el archivo de servicios cambió."""
+        revision = self.storage.obtener_revision()
+        if revision == self._revision:
+            return
+        
+        with self._mutex:
+            if revision == self._revision:
+                return
+            
+            datos = self.storage.obtener_todos()
+            servicios = []
+            for data in datos:
+                try:
+                    servicios.append(Servicio.from_dict(data))
+                except Exception as e:
+                    print(f"⚠️  Error cargando servicio {data.get('id')}: {e}")
+            
+            # Los registros inválidos no generan Servicio, pero siguen contando
+            # como existentes (igual que al buscarlos directamente en el archivo)
+            por_id = {}
+            for servicio in servicios:
+                por_id.setdefault(servicio.id, servicio)
+            datos_por_id = {}
+            for data in datos:
+                datos_por_id.setdefault(str(data.get("id")), data)
+            
+            # Se publica todo junto y la revisión al final: otro hilo nunca ve
+            # diccionarios a medio llenar
+            self._servicios = servicios
+            self._por_id = por_id
+            self._datos_por_id = datos_por_id
+            self._duraciones = {
+                clave: data.get("duracion_minutos", self.DURACION_POR_DEFECTO)
+                for clave, data in datos_por_id.items()
+            }
+            self._revision = revision
+    
+    def recargar(self):
+        """Fuerza la reconstrucción del catálogo."""
+        self._revision = None
+        self._sincronizar()
+    
+    def obtener_revision(self) -> int:
+        """Obtiene la revisión del almacenamiento de servicios."""
+        return self.storage.obtener_revision()
+    
+    def obtener_todos(self) -> List[Servicio]:
+        """Obtiene todos los servicios válidos."""
+        self._sincronizar()
+        return self._servicios
+    
+    def obtener(self, servicio_id: Any) -> Optional[Servicio]:
+        """Obtiene un servicio por ID o None si no existe."""
+        self._sincronizar()
+        return self._por_id.get(servicio_id)
+    
+    def existe(self, servicio_id: Any) -> bool:
+        """Indica si hay un registro de servicio con ese ID."""
+        self._sincronizar()
+        return str(servicio_id) in self._datos_por_id
+    
+    def duraciones(self) -> Dict[str, int]:
+        """Obtiene {ID de servicio (str): duración en minutos}."""
+        self._sincronizar()
+        return self._duraciones
+    
+    def duracion(self, servicio_id: Any) -> int:
+        """Obtiene la duración de un servicio (60 minutos si no existe)."""
+        return self.duraciones().get(str(servicio_id), self.DURACION_POR_DEFECTO)
+
+print("✅ Clase 'CatalogoServicios' definida")
\ No newline at end of file
@@ -0,0 +1,97 @@
+# salon_belleza/persistence/estadisticas_turnos.py
+"""
+Contadores de turnos que se actualizan con cada escritura.
+"""
+from bisect import bisect_left, insort
+from typing import List, Dict, Any, Iterable
+from .indices_secundarios import IndicesSecundarios
+
+class EstadisticasTurnos:
+    """
+    Cuenta turnos por estado, servicio, profesional y fecha.
+    
+    Los contadores se ajustan al agregar o quitar un turno, así que obtener
+    las estadísticas no requiere recorrer los turnos. Para los turnos futuros
+    se mantiene una lista ordenada de fechas y basta una búsqueda binaria.
+    """
+    
+    ESTADOS = ("pendiente", "confirmado", "completado", "cancelado")
+    
+    def __init__(self, turnos: Iterable[Dict[str, Any]] = ()):
+        """
+        Inicializa los contadores.
+        
+        Args:
+            turnos: (Opcional) Turnos (como diccionarios) con los que empezar
+        """
+        self.total = 0
+        self.por_estado: Dict[str, int] = {}
+        self.por_servicio: Dict[Any, int] = {}
+        self.por_profesional: Dict[Any, int] = {}
+        self.por_fecha: Dict[str, int] = {}
+        self._fechas: List[str] = []
+        
+        for data in turnos:
+            self.agregar(data)
+    
+    @staticmethod
+    def _sumar(contador: Dict[Any, int], clave: Any, delta: int):
+        """Suma delta a un contador y elimina la clave si queda en cero."""
+        valor = contador.get(clave, 0) + delta
+        if valor:
+            contador[clave] = valor
+        else:
+            contador.pop(clave, None)
+    
+    def _aplicar(self, data: Dict[str, Any], delta: int):
+        """Suma o resta un turno de todos los contadores."""
+        self.total += delta
+        self._sumar(self.por_estado, data.get("estado"), delta)
+        self._sumar(self.por_servicio, data.get("servicio_id"), delta)
+        self._sumar(self.por_profesional, data.get("profesional_id"), delta)
+        
+        fecha = data.get("fecha")
+        self._sumar(self.por_fecha, fecha, delta)
+        if IndicesSecundarios.clave_tiempo(fecha) is not None:
+            if delta > 0:
+                insort(self._fechas, fecha)
+            else:
+                pos = bisect_left(self._fechas, fecha)
+                if pos < len(self._fechas) and self._fechas[pos] == fecha:
+                    del self._fechas[pos]
+    
+    def agregar(self, data: Dict[str, Any]):
+        """Cuenta un turno nuevo."""
+        self._aplicar(data, 1)
+    
+    def quitar(self, data: Dict[str, Any]):
+        """Descuenta un turno (con los valores que tenía al contarse)."""
+        self._aplicar(data, -1)
+    
+    def contar_futuros(self, hoy: str) -> int:
+        """Cuenta los turnos con fecha mayor o igual a `hoy` (YYYY-MM-DD)."""
+        return len(self._fechas) - bisect_left(self._fechas, hoy)
+    
+    def resumen(self, hoy: str) -> Dict[str, Any]:
+        """
+        Obtiene un resumen de los contadores.
+        
+        Args:
+            hoy: Fecha de referencia para los turnos futuros (YYYY-MM-DD)
+            
+        Returns:
+            Diccionario con total, futuros, estados, servicios, profesionales y fechas
+        """
+        estados = {estado: 0 for estado in self.ESTADOS}
+        estados.update(self.por_estado)
+        
+        return {
+            "total": self.total,
+            "futuros": self.contar_futuros(hoy),
+            "estados": estados,
+            "servicios": dict(self.por_servicio),
+            "profesionales": dict(self.por_profesional),
+            "fechas": dict(self.por_fecha)
+        }
+
+print("✅ Clase 'EstadisticasTurnos' definida")
\ No newline at end of file
@@ -0,0 +1,162 @@
+# salon_belleza/persistence/indice_intervalos.py
+"""
+Índice de intervalos en minutos para detectar superposiciones de horario.
+"""
+from bisect import bisect_left, bisect_right
+from typing import List, Tuple, Any, Dict, Optional
+
+class IndiceIntervalos:
+    """
+    Conjunto ordenado de intervalos [inicio, fin) en minutos desde medianoche.
+    
+    Los intervalos se guardan ordenados por inicio. Como además se conoce la
+    duración máxima almacenada, una consulta de superposición solo necesita
+    revisar los intervalos que empiezan dentro de la ventana
+    (inicio - duracion_maxima, fin), que se localiza con búsqueda binaria.
+    """
+    
+    def __init__(self):
+        """Inicializa un índice vacío."""
+        self._intervalos: List[Tuple[int, int, Any]] = []
+        self._inicios: List[int] = []
+        self._duraciones: Dict[int, int] = {}
+        self._duracion_maxima = 0
+        
+        # Mapa de ocupación en caché; se descarta cuando cambian los intervalos
+        self._mapa = None
+    
+    def __len__(self) -> int:
+        return len(self._intervalos)
+    
+    def agregar(self, inicio: int, fin: int, clave: Any = None):
+        """
+        Agrega un intervalo.
+        
+        Args:
+            inicio: Minuto de inicio
+            fin: Minuto de fin (excluido)
+            clave: Identificador asociado (por ejemplo el ID del turno)
+        """
+        intervalo = (inicio, fin, clave)
+        pos = bisect_right(self._inicios, inicio)
+        self._inicios.insert(pos, inicio)
+        self._intervalos.insert(pos, intervalo)
+        self._mapa = None
+        
+        duracion = fin - inicio
+        self._duraciones[duracion] = self._duraciones.get(duracion, 0) + 1
+        if duracion > self._duracion_maxima:
+            self._duracion_maxima = duracion
+    
+    def quitar(self, inicio: int, fin: int, clave: Any = None) -> bool:
+        """
+        Quita un intervalo previamente agregado.
+        
+        Returns:
+            True si se encontró y se quitó
+        """
+        pos = bisect_left(self._inicios, inicio)
+        while pos < len(self._inicios) and self._inicios[pos] == inicio:
+            if self._intervalos[pos] == (inicio, fin, clave):
+                del self._inicios[pos]
+                del self._intervalos[pos]
+                self._mapa = None
+                
+                duracion = fin - inicio
+                restantes = self._duraciones[duracion] - 1
+                if restantes:
+                    self._duraciones[duracion] = restantes
+                else:
+                    del self._duraciones[duracion]
+                    if duracion == self._duracion_maxima:
+                        self._duracion_maxima = max(self._duraciones, default=0)
+                return True
+            pos += 1
+        return False
+    
+    def superpuestos(self, inicio: int, fin: int) -> List[Tuple[int, int, Any]]:
+        """
+        Obtiene los intervalos que se superponen con [inicio, fin).
+        
+        Args:
+            inicio: Minuto de inicio
+            fin: Minuto de fin (excluido)
+            
+        Returns:
+            Lista de tuplas (inicio, fin, clave)
+        """
+        desde = bisect_right(self._inicios, inicio - self._duracion_maxima)
+        hasta = bisect_left(self._inicios, fin)
+        return [
+            intervalo for intervalo in self._intervalos[desde:hasta]
+            if intervalo[1] > inicio
+        ]
+    
+    def hay_superposicion(self, inicio: int, fin: int, excluir: Optional[Any] = None) -> bool:
+        """
+        Indica si algún intervalo se superpone con [inicio, fin).
+        
+        Args:
+            inicio: Minuto de inicio
+            fin: Minuto de fin (excluido)
+            excluir: (Opcional) Clave a ignorar, útil al mover un turno existente
+            
+        Returns:
+            True si hay superposición
+        """
+        desde = bisect_right(self._inicios, inicio - self._duracion_maxima)
+        hasta = bisect_left(self._inicios, fin)
+        for i in range(desde, hasta):
+            _, fin_existente, clave = self._intervalos[i]
+            if fin_existente > inicio and (excluir is None or clave != excluir):
+                return True
+        return False
+    
+    def mapa_ocupacion(self) -> int:
+        """
+        Obtiene un mapa de bits de ocupación con resolución de un minuto.
+        
+        El bit i está encendido si el minuto i del día está ocupado por algún
+        intervalo. El resultado se guarda hasta la próxima modificación.
+        """
+        if self._mapa is None:
+            mapa = 0
+            for inicio, fin, _ in self._intervalos:
+                if fin > inicio:
+                    mapa |= ((1 << (fin - inicio)) - 1) << inicio
+            self._mapa = mapa
+        return self._mapa
+    
+    def intervalos(self) -> List[Tuple[int, int, Any]]:
+        """Obtiene todos los intervalos ordenados por inicio."""
+        return list(self._intervalos)
+
+def inicios_libres(ocupacion: int, duracion_minutos: int, minutos_dia: int = 24 * 60) -> int:
+    """
+    Calcula en qué minutos puede empezar un bloque libre de cierta duración.
+    
+    Trabaja sobre el mapa de bits completo con desplazamientos sucesivos
+    (cada paso duplica la longitud verificada), así que el costo es
+    O(log duracion) operaciones sobre enteros en lugar de recorrer minuto
+    a minuto.
+    
+    Args:
+        ocupacion: Mapa de bits de minutos ocupados
+        duracion_minutos: Duración del bloque buscado
+        minutos_dia: Cantidad de minutos representados
+        
+    Returns:
+        Mapa de bits donde el bit i indica que [i, i + duracion) está libre
+    """
+    ancho = minutos_dia + duracion_minutos
+    libres = ~ocupacion & ((1 << ancho) - 1)
+    
+    cubiertos = 1
+    while cubiertos < duracion_minutos:
+        paso = min(cubiertos, duracion_minutos - cubiertos)
+        libres &= libres >> paso
+        cubiertos += paso
+    
+    return libres & ((1 << minutos_dia) - 1)
+
+print("✅ Clase 'IndiceIntervalos' definida")
\ No newline at end of file
@@ -0,0 +1,236 @@
+# salon_belleza/persistence/indices_secundarios.py
+"""
+Índices secundarios en memoria para filtrar turnos sin recorrer todos.
+"""
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+from typing import List, Dict, Any, Set, Tuple, Optional
+from ..models.turno import hora_a_minutos
+
+class IndicesSecundarios:
+    """
+    Mantiene {campo: {valor: conjunto de IDs}} para los campos de consulta
+    habituales de los turnos.
+    
+    Un filtro combinado (por ejemplo profesional + fecha) intersecta los
+    conjuntos empezando por el más chico, así que solo se tocan los
+    registros que cumplen. Los resultados se devuelven en el orden en que
+    los registros fueron agregados, igual que en el archivo.
+    
+    Además se mantiene una lista ordenada por (fecha, hora) codificada como
+    entero (ordinal de la fecha * 1440 + minutos), para responder rangos de
+    fechas y páginas con búsqueda binaria.
+    """
+    
+    CAMPOS = ("fecha", "profesional_id", "estado", "cliente")
+    
+    def __init__(self):
+        """Inicializa índices vacíos."""
+        self._registros: Dict[str, Dict[str, Any]] = {}
+        self._orden: Dict[str, int] = {}
+        self._secuencia = 0
+        self._indices: Dict[str, Dict[Any, Set[str]]] = {campo: {} for campo in self.CAMPOS}
+        
+        # Orden cronológico: lista ordenada de (clave_tiempo, id)
+        self._cronologico: List[Tuple[int, str]] = []
+        self._tiempos: Dict[str, int] = {}
+    
+    def __len__(self) -> int:
+        return len(self._registros)
+    
+    @staticmethod
+    def normalizar_cliente(nombre: Any) -> str:
+        """Normaliza el nombre del cliente (minúsculas, espacios simples)."""
+        return " ".join(str(nombre or "").lower().split())
+    
+    @staticmethod
+    def clave_tiempo(fecha: str, hora: str = "00:00") -> Optional[int]:
+        """
+        Codifica fecha (YYYY-MM-DD) y hora (HH:MM o H:MM) como un entero ordenable.
+        
+        Returns:
+            ordinal_fecha * 1440 + minutos, o None si el formato es inválido
+        """
+        try:
+            ordinal = date(int(fecha[:4]), int(fecha[5:7]), int(fecha[8:10])).toordinal()
+            return ordinal * 1440 + hora_a_minutos(hora)
+        except (AttributeError, TypeError, ValueError):
+            return None
+    
+    def _valor(self, campo: str, data: Dict[str, Any]) -> Any:
+        """Obtiene el valor indexado de un campo."""
+        if campo == "cliente":
+            return self.normalizar_cliente(data.get("cliente_nombre"))
+        return data.get(campo)
+    
+    def agregar(self, data: Dict[str, Any]):
+        """
+        Agrega un registro o reemplaza el que tenga el mismo ID.
+        
+        Al reemplazar se conserva su posición en el orden original.
+        """
+        clave = str(data.get("id"))
+        if clave in self._registros:
+            orden = self._orden[clave]
+            self.quitar(clave)
+        else:
+            self._secuencia += 1
+            orden = self._secuencia
+        
+        self._registros[clave] = data
+        self._orden[clave] = orden
+        for campo in self.CAMPOS:
+            self._indices[campo].setdefault(self._valor(campo, data), set()).add(clave)
+        
+        tiempo = self.clave_tiempo(data.get("fecha"), data.get("hora"))
+        if tiempo is not None:
+            insort(self._cronologico, (tiempo, clave))
+            self._tiempos[clave] = tiempo
+    
+    def quitar(self, item_id: Any) -> bool:
+        """Quita un registro por ID."""
+        clave = str(item_id)
+        data = self._registros.pop(clave, None)
+        if data is None:
+            return False
+        
+        del self._orden[clave]
+        for campo in self.CAMPOS:
+            valor = self._valor(campo, data)
+            ids = self._indices[campo].get(valor)
+            if ids is not None:
+                ids.discard(clave)
+                if not ids:
+                    del self._indices[campo][valor]
+        
+        tiempo = self._tiempos.pop(clave, None)
+        if tiempo is not None:
+            pos = bisect_left(self._cronologico, (tiempo, clave))
+            if pos < len(self._cronologico) and self._cronologico[pos] == (tiempo, clave):
+                del self._cronologico[pos]
+        return True
+    
+    def _normalizar_filtros(self, filtros: Dict[str, Any]) -> List[Tuple[str, Any]]:
+        """Valida los campos y normaliza el valor de cliente."""
+        normalizados = []
+        for campo, valor in filtros.items():
+            if campo not in self._indices:
+                raise ValueError(f"Campo no indexado: {campo}")
+            if campo == "cliente":
+                valor = self.normalizar_cliente(valor)
+            normalizados.append((campo, valor))
+        return normalizados
+    
+    def ids(self, filtros: Dict[str, Any]) -> Set[str]:
+        """Obtiene los IDs que cumplen todos los filtros."""
+        conjuntos = [
+            self._indices[campo].get(valor, set())
+            for campo, valor in self._normalizar_filtros(filtros)
+        ]
+        if not conjuntos:
+            return set(self._registros)
+        
+        conjuntos.sort(key=len)
+        if not conjuntos[0]:
+            return set()
+        return conjuntos[0].intersection(*conjuntos[1:])
+    
+    def buscar(self, filtros: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Obtiene los registros que cumplen todos los filtros.
+        
+        Args:
+            filtros: {campo: valor} con campos de CAMPOS
+            
+        Returns:
+            Registros en orden de inserción
+        """
+        ids = self.ids(filtros)
+        return [self._registros[clave] for clave in sorted(ids, key=self._orden.__getitem__)]
+    
+    def rango(self, desde: int, hasta: int, filtros: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Obtiene los registros con clave de tiempo en [desde, hasta].
+        
+        Args:
+            desde: Clave de tiempo inicial (ver clave_tiempo)
+            hasta: Clave de tiempo final, inclusive
+            filtros: (Opcional) Filtros adicionales {campo: valor}
+            
+        Returns:
+            Registros ordenados por fecha y hora
+        """
+        inicio = bisect_left(self._cronologico, (desde, ""))
+        fin = bisect_left(self._cronologico, (hasta + 1, ""))
+        claves = [clave for _, clave in self._cronologico[inicio:fin]]
+        
+        if filtros:
+            permitidos = self.ids(filtros)
+            claves = [clave for clave in claves if clave in permitidos]
+        
+        return [self._registros[clave] for clave in claves]
+    
+    def pagina(self, limite: int, despues: Optional[Tuple[int, str]] = None,
+               filtros: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Obtiene hasta `limite` registros en orden (fecha, hora, ID) a partir de un cursor.
+        
+        El cursor es la posición del último registro de la página anterior,
+        así que una página cuesta lo mismo sin importar cuántas la preceden
+        y no se corre si en el medio se agregan o quitan registros.
+        
+        Con filtros se elige lo más barato: recorrer el orden cronológico
+        desde el cursor o tomar los primeros del conjunto de IDs que cumplen
+        (cuando es más chico), así un filtro selectivo no recorre todo el
+        historial.
+        
+        Args:
+            limite: Cantidad máxima de registros
+            despues: (Opcional) (clave_tiempo, ID) del último registro ya devuelto
+            filtros: (Opcional) Filtros adicionales {campo: valor}; el de fecha
+                limita la búsqueda a ese día
+                
+        Returns:
+            Registros ordenados por fecha, hora e ID (ninguno si la fecha
+            del filtro o el cursor son inválidos)
+        """
+        filtros = dict(filtros or {})
+        if despues is not None and despues[0] is None:
+            return []
+        inicio, fin = 0, len(self._cronologico)
+        
+        fecha = filtros.get("fecha")
+        if fecha is not None:
+            dia = self.clave_tiempo(fecha)
+            if dia is None:
+                return []
+            inicio = bisect_left(self._cronologico, (dia, ""))
+            fin = bisect_left(self._cronologico, (dia + 1440, ""))
+        if despues is not None:
+            inicio = max(inicio, bisect_right(self._cronologico, despues))
+        
+        permitidos = self.ids(filtros) if any(campo != "fecha" for campo in filtros) else None
+        if permitidos is not None and len(permitidos) < fin - inicio:
+            candidatos = (
+                (self._tiempos[clave], clave) for clave in permitidos
+                if clave in self._tiempos and (despues is None or (self._tiempos[clave], clave) > despues)
+            )
+            return [self._registros[clave] for _, clave in heapq.nsmallest(limite, candidatos)]
+        
+        registros = []
+        for pos in range(inicio, fin):
+            if len(registros) >= limite:
+                break
+            clave = self._cronologico[pos][1]
+            if permitidos is None or clave in permitidos:
+                registros.append(self._registros[clave])
+        return registros
+    
+    def contar(self, filtros: Dict[str, Any]) -> int:
+        """Cuenta los registros que cumplen todos los filtros."""
+        if not filtros:
+            return len(self._registros)
+        return len(self.ids(filtros))
+
+print("✅ Clase 'IndicesSecundarios' definida")
\ No newline at end of file
@@ -0,0 +1,166 @@
+# salon_belleza/persistence/journal_storage.py
+"""
+Almacenamiento JSON con registro de cambios (journal) de solo anexado.
+"""
+import json
+import os
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+from .json_storage import JSONStorage
+
+class JournalStorage(JSONStorage):
+    """
+    Variante de JSONStorage que no reescribe el archivo en cada cambio.
+    
+    El archivo JSON principal funciona como instantánea y cada modificación se
+    agrega como una línea JSON al archivo de journal (`<nombre>.log.jsonl`).
+    Al cargar se lee la instantánea y se reproducen las líneas del journal.
+    Cuando el journal supera `limite_bytes` se compacta: se escribe una
+    instantánea nueva y el journal se vacía.
+    
+    Reproducir una línea dos veces da el mismo resultado, así que un corte
+    entre la escritura de la instantánea y el vaciado del journal no
+    duplica registros. La relectura toma el bloqueo compartido para no
+    mezclar una instantánea vieja con un journal ya vaciado.
+    """
+    
+    LIMITE_POR_DEFECTO = 1024 * 1024  # 1 MB
+    
+    def __init__(self, file_path: str, limite_bytes: int = LIMITE_POR_DEFECTO):
+        """
+        Inicializa el almacenamiento con journal.
+        
+        Args:
+            file_path: Ruta al archivo JSON de instantánea
+            limite_bytes: Tamaño del journal a partir del cual se compacta
+        """
+        ruta = Path(file_path)
+        self.limite_bytes = limite_bytes
+        self.journal_path = ruta.with_name(ruta.stem + ".log.jsonl")
+        super().__init__(file_path)
+    
+    def _firma_archivo(self) -> Optional[Tuple[Any, ...]]:
+        """Combina la firma de la instantánea con la del journal."""
+        firma = super()._firma_archivo()
+        if firma is None:
+            return firma
+        
+        try:
+            st = os.stat(self.journal_path)
+            return firma + (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            return firma
+    
+    def _tamano_journal(self) -> int:
+        """Obtiene el tamaño actual del journal en bytes."""
+        try:
+            return os.path.getsize(self.journal_path)
+        except FileNotFoundError:
+            return 0
+    
+    def _cargar(self) -> List[Dict[str, Any]]:
+        """Carga la instantánea y reproduce el journal, solo si cambiaron."""
+        firma = self._firma_archivo()
+        if firma is not None and firma == self._firma:
+            return self._datos
+        
+        with self._mutex, self._bloqueo.compartido():
+            firma = self._firma_archivo()
+            if firma is not None and firma == self._firma:
+                return self._datos
+            
+            try:
+                with open(self.file_path, 'r', encoding='utf-8') as f:
+                    datos = json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                datos = []
+            
+            self._datos = datos
+            self._reindexar()
+            
+            if self.journal_path.exists():
+                with open(self.journal_path, 'r', encoding='utf-8') as f:
+                    for linea in f:
+                        try:
+                            cambio = json.loads(linea)
+                        except json.JSONDecodeError:
+                            # Línea incompleta por un corte durante la escritura
+                            continue
+                        self._reproducir(cambio)
+            
+            self.revision += 1
+            self._firma = firma
+            return self._datos
+    
+    def _reproducir(self, cambio: Dict[str, Any]):
+        """Aplica en memoria una línea del journal."""
+        op = cambio.get("op")
+        
+        if op in ("agregar", "agregar_varios"):
+            items = [cambio["item"]] if op == "agregar" else cambio["items"]
+            for item in items:
+                pos = self._indice_ids.get(self._normalizar_id(item.get("id")))
+                if pos is None:
+                    self._indice_ids[self._normalizar_id(item.get("id"))] = len(self._datos)
+                    self._datos.append(item)
+                    self._registrar_id(item.get("id"))
+                else:
+                    self._datos[pos] = item
+        
+        elif op in ("actualizar", "actualizar_varios"):
+            actualizaciones = [cambio] if op == "actualizar" else cambio["cambios"]
+            for actualizacion in actualizaciones:
+                pos = self._indice_ids.get(self._normalizar_id(actualizacion["id"]))
+                if pos is not None:
+                    for key, value in actualizacion.get("datos", {}).items():
+                        if key != "id":
+                            self._datos[pos][key] = value
+        
+        elif op == "eliminar":
+            clave = self._normalizar_id(cambio["id"])
+            if clave in self._indice_ids:
+                self._datos = [
+                    item for item in self._datos
+                    if self._normalizar_id(item.get("id")) != clave
+                ]
+                self._reindexar()
+    
+    def _persistir_cambio(self, data: List[Dict[str, Any]], cambio: Dict[str, Any]):
+        """Agrega el cambio al journal (una línea) y compacta si hace falta."""
+        linea = json.dumps(cambio, ensure_ascii=False) + "\n"
+        try:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(linea)
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception:
+            self._firma = None
+            raise
+        
+        if data is not self._datos:
+            self._datos = data
+            self._reindexar()
+        self._firma = self._firma_archivo()
+        self.revision += 1
+        
+        if self._tamano_journal() > self.limite_bytes:
+            self.compactar()
+    
+    def compactar(self):
+        """
+        Escribe una instantánea con el estado actual y vacía el journal.
+        
+        No cambia la revisión ni la versión: el contenido sigue siendo el mismo.
+        """
+        with self.bloqueo_exclusivo():
+            data = self._cargar()
+            revision = self.revision
+            self._guardar(data)
+            
+            with open(self.journal_path, 'w', encoding='utf-8'):
+                pass
+            
+            self._firma = self._firma_archivo()
+            self.revision = revision
+
+print("✅ Clase 'JournalStorage' definida")
\ No newline at end of file
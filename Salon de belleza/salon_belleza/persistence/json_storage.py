@@ -4,112 +4,325 @@ Clase base para almacenamiento en JSON.
 """
 import json
 import os
-from typing import List, Dict, Any, Optional
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Iterable
 from pathlib import Path
+from .bloqueo_archivo import BloqueoArchivo, versionar_cambio
 
 class JSONStorage:
-    """Maneja lectura/escritura segura de archivos JSON."""
+    """
+    Maneja lectura/escritura segura de archivos JSON.
     
-    def __init__(self, file_path: str):
+    Los datos se mantienen en memoria después de la primera lectura y las
+    escrituras actualizan esa copia directamente. El archivo solo se vuelve
+    a leer cuando su firma (mtime, tamaño, inode) cambia, es decir, cuando
+    otro proceso lo modificó.
+    
+    Junto a la caché se mantiene un índice {id normalizado: posición} y el
+    último ID asignado, de modo que las búsquedas por ID y la generación de
+    IDs nuevos no recorren todos los registros.
+    
+    Cada escritura se hace con el bloqueo exclusivo de `<archivo>.lock`:
+    primero se relee el archivo (por si otro proceso lo cambió), se aplica
+    el cambio, se reemplaza el archivo de forma atómica y se avanza la
+    versión guardada en el bloqueo. Con `version_esperada` la escritura es
+    un compare-and-swap: si la versión ya no es la leída antes de validar,
+    se lanza VersionCambiada y no se escribe nada.
+    
+    Entre hilos, las lecturas con la caché al día no bloquean; la relectura
+    y las escrituras se hacen de a una, y la firma se actualiza al final,
+    así que nadie toma por válida una caché a medio reconstruir.
+    
+    Nota: los diccionarios devueltos son los mismos que guarda la caché,
+    no deben modificarse fuera de este almacenamiento.
+    """
+    
+    def __init__(self, file_path: str, bloqueo: Optional[BloqueoArchivo] = None):
         """
         Inicializa el almacenamiento.
         
         Args:
             file_path: Ruta al archivo JSON
+            bloqueo: (Opcional) Bloqueo ya creado para `<file_path>.lock`, si
+                quien lo crea lo usa también para leer la versión
         """
         self.file_path = Path(file_path)
         
+        # Caché en memoria y firma del archivo con la que se cargó
+        self._datos: List[Dict[str, Any]] = []
+        self._firma: Optional[Tuple[int, int, int]] = None
+        
+        # Índice por ID y último ID asignado (nunca retrocede)
+        self._indice_ids: Dict[str, int] = {}
+        self._ultimo_id = 0
+        
+        # Se incrementa cada vez que cambia el contenido en memoria
+        self.revision = 0
+        
+        # Serializa relecturas y escrituras entre hilos
+        self._mutex = threading.RLock()
+        
+        # Bloqueo entre procesos y versión de los datos en disco
+        self._bloqueo = bloqueo or BloqueoArchivo(self.file_path.with_name(self.file_path.name + ".lock"))
+        
         # Crear directorio si no existe
         self.file_path.parent.mkdir(parents=True, exist_ok=True)
         
         # Crear archivo si no existe
         if not self.file_path.exists():
-            self._guardar([])
+            with self._bloqueo.exclusivo():
+                if not self.file_path.exists():
+                    self._guardar([])
     
-    def _cargar(self) -> List[Dict[str, Any]]:
-        """Carga todos los datos del archivo."""
+    def _firma_archivo(self) -> Optional[Tuple[int, int, int]]:
+        """Obtiene (mtime_ns, tamaño, inode) del archivo o None si no existe."""
         try:
-            with open(self.file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            # Si el archivo está corrupto o no existe, devolver lista vacía
-            return []
+            st = os.stat(self.file_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    
+    @staticmethod
+    def _normalizar_id(item_id: Any) -> str:
+        """Normaliza un ID para usarlo como clave del índice."""
+        return str(item_id)
+    
+    def _reindexar(self):
+        """Reconstruye el índice por ID y el contador a partir de la caché."""
+        indice = {}
+        for pos, item in enumerate(self._datos):
+            indice.setdefault(self._normalizar_id(item.get("id")), pos)
+            self._registrar_id(item.get("id"))
+        self._indice_ids = indice
+    
+    def _registrar_id(self, item_id: Any):
+        """Avanza el contador si el ID numérico es mayor al último asignado."""
+        try:
+            self._ultimo_id = max(self._ultimo_id, int(item_id))
+        except (ValueError, TypeError):
+            pass
+    
+    def _cargar(self) -> List[Dict[str, Any]]:
+        """Devuelve los datos en caché, releyendo el archivo solo si cambió."""
+        firma = self._firma_archivo()
+        if firma is not None and firma == self._firma:
+            return self._datos
+        
+        with self._mutex:
+            # Otro hilo pudo releerlo mientras se esperaba
+            firma = self._firma_archivo()
+            if firma is not None and firma == self._firma:
+                return self._datos
+            
+            try:
+                with open(self.file_path, 'r', encoding='utf-8') as f:
+                    datos = json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                # Si el archivo está corrupto o no existe, devolver lista vacía
+                datos = []
+            
+            self._datos = datos
+            self._reindexar()
+            self.revision += 1
+            self._firma = firma
+            return datos
     
     def _guardar(self, data: List[Dict[str, Any]]):
-        """Guarda datos en el archivo."""
-        with open(self.file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        """Guarda datos en el archivo (de forma atómica) y actualiza la caché."""
+        temporal = self.file_path.with_name(self.file_path.name + ".tmp")
+        try:
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporal, self.file_path)
+        except Exception:
+            # Forzar relectura: no sabemos qué quedó en disco
+            self._firma = None
+            raise
+        
+        if data is not self._datos:
+            self._datos = data
+            self._reindexar()
+        self._firma = self._firma_archivo()
+        self.revision += 1
+    
+    def _persistir_cambio(self, data: List[Dict[str, Any]], cambio: Dict[str, Any]):
+        """
+        Persiste una modificación ya aplicada sobre los datos.
+        
+        Por defecto reescribe el archivo completo; las subclases pueden
+        registrar solo el cambio.
+        
+        Args:
+            data: Lista completa de registros después del cambio
+            cambio: Descripción de la operación ({"op": ..., ...})
+        """
+        self._guardar(data)
+    
+    @contextmanager
+    def _escritura(self, version_esperada: Optional[int] = None) -> Iterator[None]:
+        """
+        Envuelve una modificación con el bloqueo exclusivo del archivo.
+        
+        Relee los datos bajo el bloqueo, verifica la versión esperada y, si
+        la modificación cambió algo, avanza la versión al terminar.
+        
+        Raises:
+            VersionCambiada: Si la versión no es version_esperada
+        """
+        with self.bloqueo_exclusivo():
+            self._cargar()
+            self._bloqueo.verificar_version(version_esperada)
+            revision = self.revision
+            yield
+            if self.revision != revision:
+                self._bloqueo.avanzar_version()
+    
+    def obtener_version(self, fechas: Iterable[str] = ()) -> int:
+        """
+        Obtiene la versión de los datos en disco.
+        
+        A diferencia de la revisión (que es local al proceso), la versión es
+        la misma para todos los procesos y avanza con cada escritura: sirve
+        como valor esperado para las escrituras condicionales.
+        
+        Args:
+            fechas: Se ignora; la versión abarca todo el archivo
+        """
+        return self._bloqueo.leer_version()
+    
+    @contextmanager
+    def bloqueo_exclusivo(self) -> Iterator[None]:
+        """Toma el bloqueo de escritura (entre hilos y entre procesos); es reentrante."""
+        with self._mutex, self._bloqueo.exclusivo():
+            yield
+    
+    def obtener_revision(self) -> int:
+        """
+        Obtiene la revisión actual de los datos.
+        
+        Cambia cada vez que se escribe o se detecta una modificación externa,
+        por lo que sirve para invalidar estructuras derivadas.
+        """
+        self._cargar()
+        return self.revision
     
     def obtener_todos(self) -> List[Dict[str, Any]]:
         """Obtiene todos los registros."""
-        return self._cargar()
+        return list(self._cargar())
     
-    def agregar(self, item: Dict[str, Any]) -> Dict[str, Any]:
+    def agregar(self, item: Dict[str, Any], version_esperada: Optional[int] = None) -> Dict[str, Any]:
         """Agrega un nuevo registro."""
-        data = self._cargar()
-        
-        # Generar ID si no tiene
-        if "id" not in item or not item["id"]:
-            # Encontrar máximo ID
-            max_id = 0
-            for d in data:
-                try:
-                    item_id = int(d.get("id", 0))
-                    max_id = max(max_id, item_id)
-                except (ValueError, TypeError):
-                    pass
+        with self._escritura(version_esperada):
+            data = self._cargar()
             
-            item["id"] = max_id + 1
-        
-        data.append(item)
-        self._guardar(data)
+            # Generar ID si no tiene
+            if "id" not in item or not item["id"]:
+                item["id"] = self._ultimo_id + 1
+            
+            self._registrar_id(item["id"])
+            self._indice_ids.setdefault(self._normalizar_id(item["id"]), len(data))
+            data.append(item)
+            self._persistir_cambio(data, {"op": "agregar", "item": item})
         return item
     
+    def agregar_varios(self, items: List[Dict[str, Any]],
+                       version_esperada: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Agrega varios registros con una sola escritura."""
+        with self._escritura(version_esperada):
+            data = self._cargar()
+            
+            for item in items:
+                if "id" not in item or not item["id"]:
+                    item["id"] = self._ultimo_id + 1
+                
+                self._registrar_id(item["id"])
+                self._indice_ids.setdefault(self._normalizar_id(item["id"]), len(data))
+                data.append(item)
+            
+            self._persistir_cambio(data, {"op": "agregar_varios", "items": items})
+        return items
+    
     def buscar_por_id(self, item_id: Any) -> Optional[Dict[str, Any]]:
         """Busca un registro por ID."""
         data = self._cargar()
         
-        for item in data:
-            if str(item.get("id")) == str(item_id):
-                return item
+        pos = self._indice_ids.get(self._normalizar_id(item_id))
+        if pos is None:
+            return None
         
-        return None
+        return data[pos]
     
-    def actualizar(self, item_id: Any, nuevos_datos: Dict[str, Any]) -> bool:
-        """Actualiza un registro."""
-        data = self._cargar()
-        encontrado = False
+    def actualizar(self, item_id: Any, nuevos_datos: Dict[str, Any],
+                   version_esperada: Optional[int] = None,
+                   version_registro: Optional[int] = None) -> bool:
+        """Actualiza un registro (ver versionar_cambio para version_registro)."""
+        with self._escritura(version_esperada):
+            data = self._cargar()
+            
+            pos = self._indice_ids.get(self._normalizar_id(item_id))
+            if pos is None:
+                return False
+            
+            # Actualizar campos (excepto ID)
+            item = data[pos]
+            nuevos_datos = versionar_cambio(item, nuevos_datos, version_registro)
+            for key, value in nuevos_datos.items():
+                if key != "id":  # No cambiar el ID
+                    item[key] = value
+            
+            self._persistir_cambio(data, {"op": "actualizar", "id": item_id, "datos": nuevos_datos})
+        return True
+    
+    def actualizar_varios(self, cambios: List[Tuple[Any, Dict[str, Any], Optional[int]]],
+                          version_esperada: Optional[int] = None) -> List[bool]:
+        """
+        Actualiza varios registros con una sola escritura: se guardan todos o ninguno.
         
-        for i, item in enumerate(data):
-            if str(item.get("id")) == str(item_id):
-                # Actualizar campos (excepto ID)
+        Args:
+            cambios: Tuplas (ID, nuevos datos, version_registro) como en actualizar
+            version_esperada: (Opcional) Versión esperada de los datos
+            
+        Returns:
+            Por cada cambio, True si se actualizó o False si no se encontró el ID
+        """
+        with self._escritura(version_esperada):
+            data = self._cargar()
+            
+            # Verificar todas las versiones antes de modificar nada
+            posiciones = [self._indice_ids.get(self._normalizar_id(item_id)) for item_id, _, _ in cambios]
+            aplicados = [
+                (pos, item_id, versionar_cambio(data[pos], nuevos_datos, version_registro))
+                for pos, (item_id, nuevos_datos, version_registro) in zip(posiciones, cambios)
+                if pos is not None
+            ]
+            
+            for pos, _, nuevos_datos in aplicados:
                 for key, value in nuevos_datos.items():
                     if key != "id":  # No cambiar el ID
-                        item[key] = value
-                encontrado = True
-                break
-        
-        if encontrado:
-            self._guardar(data)
-        
-        return encontrado
+                        data[pos][key] = value
+            
+            if aplicados:
+                self._persistir_cambio(data, {"op": "actualizar_varios", "cambios": [
+                    {"id": item_id, "datos": nuevos_datos} for _, item_id, nuevos_datos in aplicados
+                ]})
+        return [pos is not None for pos in posiciones]
     
-    def eliminar(self, item_id: Any) -> bool:
+    def eliminar(self, item_id: Any, version_esperada: Optional[int] = None) -> bool:
         """Elimina un registro por ID."""
-        data = self._cargar()
-        nueva_data = []
-        eliminado = False
-        
-        for item in data:
-            if str(item.get("id")) == str(item_id):
-                eliminado = True
-            else:
-                nueva_data.append(item)
-        
-        if eliminado:
-            self._guardar(nueva_data)
-        
-        return eliminado
+        with self._escritura(version_esperada):
+            data = self._cargar()
+            clave = self._normalizar_id(item_id)
+            
+            if clave not in self._indice_ids:
+                return False
+            
+            # Las posiciones posteriores cambian, así que el índice se reconstruye
+            nueva_data = [item for item in data if self._normalizar_id(item.get("id")) != clave]
+            self._persistir_cambio(nueva_data, {"op": "eliminar", "id": item_id})
+        return True
     
     def contar(self) -> int:
         """Cuenta el número de registros."""
@@ -125,5 +338,28 @@ class JSONStorage:
                 resultados.append(item)
         
         return resultados
+    
+    def buscar_por_campos(self, filtros: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Busca registros que cumplan todos los filtros (campo == valor)."""
+        data = self._cargar()
+        filtros = list(filtros.items())
+        
+        return [
+            item for item in data
+            if all(item.get(campo) == valor for campo, valor in filtros)
+        ]
+    
+    def buscar_por_rango_fechas(self, desde: str, hasta: str, campo: str = "fecha") -> List[Dict[str, Any]]:
+        """Busca registros con fecha (YYYY-MM-DD) entre desde y hasta, inclusive."""
+        data = self._cargar()
+        
+        return [
+            item for item in data
+            if isinstance(item.get(campo), str) and desde <= item[campo] <= hasta
+        ]
+    
+    def contar_por_campo(self, campo: str, valor: Any) -> int:
+        """Cuenta registros con campo == valor."""
+        return len(self.buscar_por_campo(campo, valor))
 
 print("✅ Clase 'JSONStorage' definida")
\ No newline at end of file
@@ -0,0 +1,532 @@
+# salon_belleza/persistence/sharded_storage.py
+"""
+Almacenamiento JSON particionado por mes.
+"""
+import json
+import os
+import threading
+from contextlib import ExitStack
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+from .json_storage import JSONStorage
+from .bloqueo_archivo import BloqueoArchivo, VersionCambiada, versionar_cambio
+
+class ShardedJSONStorage:
+    """
+    Guarda los registros en un archivo JSON por mes (`<directorio>/AAAA-MM.json`).
+    
+    Cada mes es un JSONStorage que se abre recién cuando se necesita y queda
+    en caché. Las consultas por fecha o por rango de fechas solo abren los
+    meses involucrados, y los meses pasados no se reescriben salvo que se
+    modifique uno de sus registros.
+    
+    Para ubicar un registro por ID se mantiene un directorio de solo anexado
+    (`_ids.jsonl`) con líneas {"id": ..., "mes": ...}; la última línea de
+    cada ID es la válida y "mes": null indica que fue eliminado. Las
+    lecturas ignoran los registros de un mes que no es el del directorio,
+    así que al mover un registro de mes el directorio decide cuál copia vale.
+    
+    Cada mes tiene su propio bloqueo y su propia versión, así que dos
+    procesos que escriben meses distintos no se esperan. Solo la reserva de
+    IDs nuevos pasa por el bloqueo del directorio, y dura lo que tarda en
+    anexar las líneas.
+    """
+    
+    # Las consultas por fecha ya se dirigen a un solo mes; indexar todo en
+    # memoria obligaría a abrir todos los meses
+    resuelve_filtros = True
+    
+    def __init__(self, directorio: str, campo_fecha: str = "fecha"):
+        """
+        Inicializa el almacenamiento particionado.
+        
+        Args:
+            directorio: Directorio donde se guardan los archivos mensuales
+            campo_fecha: Campo con la fecha (YYYY-MM-DD) usada para particionar
+        """
+        self.directorio = Path(directorio)
+        self.campo_fecha = campo_fecha
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        
+        self._meses: Dict[str, JSONStorage] = {}
+        
+        # Bloqueo (y versión) de cada mes; se crean sin abrir el mes y el
+        # JSONStorage del mes usa el mismo
+        self._bloqueos: Dict[str, BloqueoArchivo] = {}
+        
+        # Directorio de IDs: {id normalizado: mes}
+        self._ids_path = self.directorio / "_ids.jsonl"
+        self._bloqueo_ids = BloqueoArchivo(self.directorio / "_ids.lock")
+        self._mutex = threading.RLock()
+        self._ids: Dict[str, str] = {}
+        self._ultimo_id = 0
+        self._firma_ids: Optional[Tuple[int, int, int]] = None
+        
+        self.revision = 0
+        self._firma_vista = None
+    
+    # ------------------------------------------------------------------
+    # Particiones
+    # ------------------------------------------------------------------
+    
+    def _mes_de(self, item: Dict[str, Any]) -> str:
+        """Obtiene la clave de partición (AAAA-MM) de un registro."""
+        fecha = item.get(self.campo_fecha) or ""
+        return fecha[:7] if len(fecha) >= 7 else "sin_fecha"
+    
+    def _shard(self, mes: str) -> JSONStorage:
+        """Obtiene (abriéndolo si hace falta) el almacenamiento de un mes."""
+        shard = self._meses.get(mes)
+        if shard is None:
+            with self._mutex:
+                shard = self._meses.get(mes)
+                if shard is None:
+                    shard = JSONStorage(str(self.directorio / f"{mes}.json"), self._bloqueo_mes(mes))
+                    self._meses[mes] = shard
+        return shard
+    
+    def _bloqueo_mes(self, mes: str) -> BloqueoArchivo:
+        """Obtiene el bloqueo de un mes sin abrir (ni cargar) su archivo."""
+        bloqueo = self._bloqueos.get(mes)
+        if bloqueo is None:
+            with self._mutex:
+                bloqueo = self._bloqueos.setdefault(
+                    mes, BloqueoArchivo(self.directorio / f"{mes}.json.lock")
+                )
+        return bloqueo
+    
+    def _existe_mes(self, mes: str) -> bool:
+        """Indica si hay archivo para un mes, sin crearlo."""
+        return mes in self._meses or (self.directorio / f"{mes}.json").exists()
+    
+    def _vigentes(self, mes: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Descarta los registros que el directorio de IDs ubica en otro mes."""
+        ids = self._cargar_ids()
+        return [item for item in items if ids.get(str(item.get("id"))) == mes]
+    
+    def meses_disponibles(self) -> List[str]:
+        """Lista los meses que tienen archivo, ordenados."""
+        return sorted(
+            p.stem for p in self.directorio.glob("*.json")
+            if not p.stem.startswith("_")
+        )
+    
+    @staticmethod
+    def _meses_entre(desde: str, hasta: str) -> List[str]:
+        """Lista los meses AAAA-MM comprendidos entre dos fechas (inclusive)."""
+        anio, mes = int(desde[:4]), int(desde[5:7])
+        anio_fin, mes_fin = int(hasta[:4]), int(hasta[5:7])
+        meses = []
+        while (anio, mes) <= (anio_fin, mes_fin):
+            meses.append(f"{anio:04d}-{mes:02d}")
+            mes += 1
+            if mes > 12:
+                anio, mes = anio + 1, 1
+        return meses
+    
+    # ------------------------------------------------------------------
+    # Directorio de IDs
+    # ------------------------------------------------------------------
+    
+    def _cargar_ids(self) -> Dict[str, str]:
+        """Carga el directorio de IDs si el archivo cambió."""
+        try:
+            st = os.stat(self._ids_path)
+            firma = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            firma = None
+        
+        if firma == self._firma_ids:
+            return self._ids
+        
+        with self._mutex:
+            if firma == self._firma_ids:
+                return self._ids
+            
+            self._ids = {}
+            if firma is not None:
+                with open(self._ids_path, 'r', encoding='utf-8') as f:
+                    for linea in f:
+                        try:
+                            entrada = json.loads(linea)
+                        except json.JSONDecodeError:
+                            continue
+                        self._aplicar_id(entrada.get("id"), entrada.get("mes"))
+            self._firma_ids = firma
+            return self._ids
+    
+    def _aplicar_id(self, item_id: Any, mes: Optional[str]):
+        """Aplica una entrada del directorio en memoria."""
+        clave = str(item_id)
+        if mes is None:
+            self._ids.pop(clave, None)
+        else:
+            self._ids[clave] = mes
+        try:
+            self._ultimo_id = max(self._ultimo_id, int(item_id))
+        except (ValueError, TypeError):
+            pass
+    
+    def _registrar_ids(self, entradas: List[Tuple[Any, Optional[str]]]):
+        """Agrega entradas al directorio de IDs."""
+        with self._mutex, self._bloqueo_ids.exclusivo():
+            self._cargar_ids()
+            self._anexar_ids(entradas)
+    
+    def _anexar_ids(self, entradas: List[Tuple[Any, Optional[str]]]):
+        """Escribe entradas en el directorio (con su bloqueo ya tomado)."""
+        with open(self._ids_path, 'a', encoding='utf-8') as f:
+            for item_id, mes in entradas:
+                f.write(json.dumps({"id": item_id, "mes": mes}, ensure_ascii=False) + "\n")
+                self._aplicar_id(item_id, mes)
+        
+        st = os.stat(self._ids_path)
+        self._firma_ids = (st.st_mtime_ns, st.st_size, st.st_ino)
+    
+    def _reservar_ids(self, items: List[Dict[str, Any]]):
+        """
+        Asigna IDs únicos entre todos los meses y los anota en el directorio.
+        
+        Se anotan antes de escribir los meses para que otro proceso no
+        pueda asignar los mismos.
+        """
+        with self._mutex, self._bloqueo_ids.exclusivo():
+            self._cargar_ids()
+            for item in items:
+                if "id" not in item or not item["id"]:
+                    item["id"] = self._ultimo_id + 1
+                try:
+                    self._ultimo_id = max(self._ultimo_id, int(item["id"]))
+                except (ValueError, TypeError):
+                    pass
+            self._anexar_ids([(item["id"], self._mes_de(item)) for item in items])
+    
+    # ------------------------------------------------------------------
+    # Revisión
+    # ------------------------------------------------------------------
+    
+    def _firma_actual(self) -> Tuple[Any, ...]:
+        """
+        Combina las firmas de archivo de los meses abiertos y el directorio de IDs.
+        
+        Solo mira (mtime, tamaño, inode): no carga ningún mes.
+        """
+        self._cargar_ids()
+        return (self._firma_ids,) + tuple(
+            (mes, shard._firma_archivo()) for mes, shard in sorted(self._meses.items())
+        )
+    
+    def _marcar_escritura(self):
+        """Registra una escritura propia."""
+        self.revision += 1
+        self._firma_vista = self._firma_actual()
+    
+    def obtener_revision(self) -> int:
+        """
+        Obtiene la revisión actual de los datos.
+        
+        Avanza con cada escritura propia o cuando cambió algún mes abierto
+        o el directorio de IDs.
+        """
+        firma = self._firma_actual()
+        if firma != self._firma_vista:
+            self._firma_vista = firma
+            self.revision += 1
+        return self.revision
+    
+    def _version_meses(self, meses: Iterable[str]) -> int:
+        """
+        Suma las versiones de unos meses (0 los que no tienen archivo).
+        
+        Se leen de los archivos de bloqueo, sin abrir ni cargar los meses.
+        """
+        return sum(
+            self._bloqueo_mes(mes).leer_version() for mes in set(meses) if self._existe_mes(mes)
+        )
+    
+    def obtener_version(self, fechas: Iterable[str] = ()) -> int:
+        """
+        Obtiene la versión de los datos en disco.
+        
+        Args:
+            fechas: (Opcional) Fechas YYYY-MM-DD: devuelve la suma de las
+                versiones de sus meses, que es lo que verifican las escrituras
+                condicionales sobre esos meses. Sin fechas suma todos los meses.
+        """
+        meses = [self._mes_de({self.campo_fecha: fecha}) for fecha in fechas]
+        return self._version_meses(meses or self.meses_disponibles())
+    
+    # ------------------------------------------------------------------
+    # Interfaz de almacenamiento
+    # ------------------------------------------------------------------
+    
+    def obtener_todos(self) -> List[Dict[str, Any]]:
+        """Obtiene todos los registros (abre todos los meses)."""
+        resultados = []
+        for mes in self.meses_disponibles():
+            resultados.extend(self._vigentes(mes, self._shard(mes).obtener_todos()))
+        return resultados
+    
+    def agregar(self, item: Dict[str, Any], version_esperada: Optional[int] = None) -> Dict[str, Any]:
+        """Agrega un nuevo registro en el archivo de su mes."""
+        return self.agregar_varios([item], version_esperada)[0]
+    
+    def agregar_varios(self, items: List[Dict[str, Any]],
+                       version_esperada: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Agrega varios registros escribiendo una vez cada mes afectado.
+        
+        Se toman los bloqueos de los meses afectados (en orden, para no
+        trabarse con otro proceso) y version_esperada se compara con la suma
+        de sus versiones, como la devuelve obtener_version(fechas).
+        """
+        por_mes: Dict[str, List[Dict[str, Any]]] = {}
+        for item in items:
+            por_mes.setdefault(self._mes_de(item), []).append(item)
+        
+        with ExitStack() as bloqueos:
+            for mes in sorted(por_mes):
+                bloqueos.enter_context(self._shard(mes).bloqueo_exclusivo())
+            if version_esperada is not None:
+                actual = self._version_meses(por_mes)
+                if actual != version_esperada:
+                    raise VersionCambiada(version_esperada, actual)
+            
+            self._reservar_ids(items)
+            try:
+                for mes, items_mes in por_mes.items():
+                    self._shard(mes).agregar_varios(items_mes)
+            except Exception:
+                # Los IDs reservados quedan como eliminados
+                self._registrar_ids([(item["id"], None) for item in items])
+                raise
+        
+        self._marcar_escritura()
+        return items
+    
+    def buscar_por_id(self, item_id: Any) -> Optional[Dict[str, Any]]:
+        """Busca un registro por ID usando el directorio de IDs."""
+        mes = self._cargar_ids().get(str(item_id))
+        if mes is None:
+            return None
+        return self._shard(mes).buscar_por_id(item_id)
+    
+    def actualizar(self, item_id: Any, nuevos_datos: Dict[str, Any],
+                   version_esperada: Optional[int] = None,
+                   version_registro: Optional[int] = None) -> bool:
+        """
+        Actualiza un registro; si cambia de mes, lo mueve de archivo.
+        
+        version_esperada se verifica contra el mes donde está el registro y
+        version_registro contra el registro (ver versionar_cambio).
+        
+        Para mover un registro se escribe primero en el mes nuevo, después
+        se anota el mes nuevo en el directorio de IDs (desde ese momento las
+        lecturas usan la copia nueva) y al final se borra del mes anterior.
+        Si falla antes de anotarlo, la copia nueva se descarta.
+        """
+        mes = self._cargar_ids().get(str(item_id))
+        if mes is None:
+            return False
+        
+        mes_nuevo = self._mes_de(nuevos_datos) if self.campo_fecha in nuevos_datos else mes
+        if mes_nuevo == mes:
+            actualizado = self._shard(mes).actualizar(
+                item_id, nuevos_datos, version_esperada, version_registro
+            )
+            if actualizado:
+                self._marcar_escritura()
+            return actualizado
+        
+        shard, destino = self._shard(mes), self._shard(mes_nuevo)
+        with ExitStack() as bloqueos:
+            for mes_bloqueo in sorted((mes, mes_nuevo)):
+                bloqueos.enter_context(self._shard(mes_bloqueo).bloqueo_exclusivo())
+            if version_esperada is not None:
+                version = self._version_meses([mes])
+                if version != version_esperada:
+                    raise VersionCambiada(version_esperada, version)
+            
+            actual = shard.buscar_por_id(item_id)
+            if actual is None:
+                return False
+            
+            nuevos_datos = versionar_cambio(actual, nuevos_datos, version_registro)
+            nuevo = dict(actual)
+            for key, value in nuevos_datos.items():
+                if key != "id":
+                    nuevo[key] = value
+            
+            destino.agregar(nuevo)
+            try:
+                self._registrar_ids([(nuevo["id"], mes_nuevo)])
+            except Exception:
+                destino.eliminar(item_id)
+                raise
+            shard.eliminar(item_id)
+        
+        self._marcar_escritura()
+        return True
+    
+    def actualizar_varios(self, cambios: List[Tuple[Any, Dict[str, Any], Optional[int]]],
+                          version_esperada: Optional[int] = None) -> List[bool]:
+        """
+        Actualiza varios registros escribiendo una vez cada mes afectado.
+        
+        Como en agregar_varios, se toman los bloqueos de los meses de los
+        registros y version_esperada se compara con la suma de sus
+        versiones. Todas las versiones de registro se verifican antes de
+        escribir; los registros que cambian de mes se mueven al final.
+        
+        Returns:
+            Por cada cambio, True si se actualizó o False si no se encontró el ID
+        """
+        ids = self._cargar_ids()
+        meses = [ids.get(str(item_id)) for item_id, _, _ in cambios]
+        
+        with ExitStack() as bloqueos:
+            for mes in sorted({mes for mes in meses if mes}):
+                bloqueos.enter_context(self._shard(mes).bloqueo_exclusivo())
+            if version_esperada is not None:
+                actual = self._version_meses(mes for mes in meses if mes)
+                if actual != version_esperada:
+                    raise VersionCambiada(version_esperada, actual)
+            
+            resultados = []
+            por_mes: Dict[str, List[Tuple[Any, Dict[str, Any], Optional[int]]]] = {}
+            movidos = []
+            for mes, (item_id, nuevos_datos, version_registro) in zip(meses, cambios):
+                actual = self._shard(mes).buscar_por_id(item_id) if mes else None
+                resultados.append(actual is not None)
+                if actual is None:
+                    continue
+                
+                datos = versionar_cambio(actual, nuevos_datos, version_registro)
+                if self._mes_de({**actual, **datos}) == mes:
+                    por_mes.setdefault(mes, []).append((item_id, datos, None))
+                else:
+                    movidos.append((item_id, nuevos_datos, version_registro))
+            
+            for mes, cambios_mes in por_mes.items():
+                self._shard(mes).actualizar_varios(cambios_mes)
+            for item_id, nuevos_datos, version_registro in movidos:
+                self.actualizar(item_id, nuevos_datos, version_registro=version_registro)
+        
+        if any(resultados):
+            self._marcar_escritura()
+        return resultados
+    
+    def eliminar(self, item_id: Any, version_esperada: Optional[int] = None) -> bool:
+        """Elimina un registro por ID."""
+        mes = self._cargar_ids().get(str(item_id))
+        if mes is None:
+            return False
+        
+        eliminado = self._shard(mes).eliminar(item_id, version_esperada)
+        if eliminado:
+            self._registrar_ids([(item_id, None)])
+            self._marcar_escritura()
+        return eliminado
+    
+    def contar(self) -> int:
+        """Cuenta el número de registros (sin abrir los meses)."""
+        return len(self._cargar_ids())
+    
+    def buscar_por_campo(self, campo: str, valor: Any) -> List[Dict[str, Any]]:
+        """Busca registros por campo y valor."""
+        return self.buscar_por_campos({campo: valor})
+    
+    def buscar_por_campos(self, filtros: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Busca registros que cumplan todos los filtros (campo == valor).
+        
+        Si se filtra por fecha, solo se consulta el mes correspondiente.
+        """
+        fecha = filtros.get(self.campo_fecha)
+        if isinstance(fecha, str) and len(fecha) >= 7:
+            meses = [fecha[:7]] if self._existe_mes(fecha[:7]) else []
+        else:
+            meses = self.meses_disponibles()
+        
+        resultados = []
+        for mes in meses:
+            resultados.extend(self._vigentes(mes, self._shard(mes).buscar_por_campos(filtros)))
+        return resultados
+    
+    def buscar_por_rango_fechas(self, desde: str, hasta: str) -> List[Dict[str, Any]]:
+        """
+        Obtiene los registros con fecha entre `desde` y `hasta` (inclusive).
+        
+        Solo se abren los meses del rango.
+        """
+        resultados = []
+        for mes in self._meses_entre(desde, hasta):
+            if self._existe_mes(mes):
+                resultados.extend(self._vigentes(
+                    mes, self._shard(mes).buscar_por_rango_fechas(desde, hasta, self.campo_fecha)
+                ))
+        return resultados
+    
+    def _clave_orden(self, item: Dict[str, Any]) -> Tuple[str, str, str]:
+        """Obtiene la clave (fecha, hora, ID) por la que se ordenan las páginas."""
+        return (item.get(self.campo_fecha) or "", item.get("hora") or "", str(item.get("id")))
+    
+    def buscar_pagina(self, filtros: Dict[str, Any], limite: int,
+                      despues: Optional[Tuple[str, str, str]] = None) -> List[Dict[str, Any]]:
+        """
+        Obtiene hasta `limite` registros ordenados por (fecha, hora, ID) a partir de un cursor.
+        
+        Los meses se recorren en orden desde el del cursor y se deja de abrir
+        meses al completar la página, así que cada página lee uno o dos meses
+        sin importar cuántos haya guardados.
+        
+        Args:
+            filtros: Filtros {campo: valor}
+            limite: Cantidad máxima de registros
+            despues: (Opcional) (fecha, hora, ID) del último registro de la
+                página anterior
+        """
+        fecha = filtros.get(self.campo_fecha)
+        if isinstance(fecha, str) and len(fecha) >= 7:
+            meses = [fecha[:7]] if self._existe_mes(fecha[:7]) else []
+        else:
+            meses = [mes for mes in self.meses_disponibles() if mes != "sin_fecha"]
+        if despues is not None:
+            despues = (despues[0], despues[1], str(despues[2]))
+            meses = [mes for mes in meses if mes >= despues[0][:7]]
+        
+        resultados = []
+        for mes in meses:
+            registros = sorted(
+                self._vigentes(mes, self._shard(mes).buscar_por_campos(filtros)), key=self._clave_orden
+            )
+            if despues is not None:
+                registros = [item for item in registros if self._clave_orden(item) > despues]
+            resultados.extend(registros[:limite - len(resultados)])
+            if len(resultados) >= limite:
+                break
+        return resultados
+    
+    def contar_por_campo(self, campo: str, valor: Any) -> int:
+        """Cuenta registros con campo == valor."""
+        return len(self.buscar_por_campo(campo, valor))
+    
+    def contar_por_campos(self, filtros: Dict[str, Any]) -> int:
+        """Cuenta registros que cumplen todos los filtros (sin filtros no abre los meses)."""
+        if not filtros:
+            return self.contar()
+        return len(self.buscar_por_campos(filtros))
+    
+    def importar(self, items: List[Dict[str, Any]]) -> int:
+        """
+        Reparte registros existentes (por ejemplo de turnos.json) en los meses.
+        
+        Returns:
+            Número de registros importados
+        """
+        if not items:
+            return 0
+        self.agregar_varios([dict(item) for item in items])
+        return len(items)
+
+print("✅ Clase 'ShardedJSONStorage' definida")
\ No newline at end of file
@@ -0,0 +1,437 @@
+# salon_belleza/persistence/sqlite_storage.py
+"""
+Almacenamiento en SQLite con la misma interfaz que JSONStorage.
+
+Para migrar los turnos existentes usar `python migrar_sqlite.py`.
+"""
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable, Sequence, Iterator, Tuple
+from .bloqueo_archivo import VersionCambiada, versionar_cambio
+
+class SQLiteStorage:
+    """
+    Maneja registros (diccionarios) en una tabla SQLite.
+    
+    Cada registro se guarda completo como JSON en la columna `datos`. Los
+    campos indicados en `campos_indexados` se copian además a columnas
+    propias para poder filtrar y contar en SQL usando índices.
+    
+    Las escrituras abren la transacción con BEGIN IMMEDIATE (toman el
+    bloqueo de escritura de SQLite antes de leer nada) y avanzan la versión
+    de la tabla en `_versiones`, que es la misma para todas las conexiones.
+    El último ID asignado se guarda en `_secuencias` y nunca retrocede, aunque
+    se elimine el registro con el ID más alto.
+    
+    La conexión se comparte entre hilos: cada consulta (y cada transacción
+    completa) se hace con `_mutex` tomado.
+    """
+    
+    # Los filtros se resuelven en SQL, no hace falta indexar en memoria
+    resuelve_filtros = True
+    
+    def __init__(self, db_path: str, tabla: str,
+                 campos_indexados: Sequence[str] = (),
+                 indices: Iterable[Sequence[str]] = ()):
+        """
+        Inicializa el almacenamiento.
+        
+        Args:
+            db_path: Ruta al archivo de base de datos
+            tabla: Nombre de la tabla
+            campos_indexados: Campos que se copian a columnas propias
+            indices: Combinaciones de campos sobre las que crear índices
+        """
+        self.db_path = Path(db_path)
+        self.tabla = tabla
+        self.campos_indexados = list(campos_indexados)
+        
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._mutex = threading.RLock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        
+        columnas = "".join(f", {campo}" for campo in self.campos_indexados)
+        with self._conn:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {tabla} ("
+                f"seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                f"id TEXT NOT NULL UNIQUE, num_id INTEGER, "
+                f"datos TEXT NOT NULL{columnas})"
+            )
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{tabla}_num_id ON {tabla} (num_id)"
+            )
+            for campos in indices:
+                nombre = "_".join(campos)
+                self._conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{tabla}_{nombre} "
+                    f"ON {tabla} ({', '.join(campos)})"
+                )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS _versiones ("
+                "tabla TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS _secuencias ("
+                "tabla TEXT PRIMARY KEY, ultimo_id INTEGER NOT NULL)"
+            )
+            # Bases creadas antes de `_secuencias`: se parte del mayor ID guardado
+            self._conn.execute(
+                f"INSERT OR IGNORE INTO _secuencias (tabla, ultimo_id) "
+                f"SELECT ?, COALESCE(MAX(num_id), 0) FROM {tabla}",
+                (tabla,)
+            )
+        
+        # Se incrementa con cada escritura propia o ajena (PRAGMA data_version)
+        self.revision = 0
+        self._data_version = self._leer_data_version()
+    
+    def _leer_data_version(self) -> int:
+        """Lee el contador que SQLite incrementa con commits de otras conexiones."""
+        return self._consultar("PRAGMA data_version")[0][0]
+    
+    def _consultar(self, sql: str, parametros: Sequence[Any] = ()) -> List[Tuple[Any, ...]]:
+        """Ejecuta una consulta y lee todas sus filas con la conexión bloqueada."""
+        with self._mutex:
+            return self._conn.execute(sql, parametros).fetchall()
+    
+    @contextmanager
+    def _escritura(self, version_esperada: Optional[int] = None) -> Iterator[None]:
+        """
+        Transacción de escritura con el bloqueo de SQLite tomado desde el inicio.
+        
+        Raises:
+            VersionCambiada: Si la versión de la tabla no es version_esperada
+        """
+        with self._mutex, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            if version_esperada is not None:
+                actual = self.obtener_version()
+                if actual != version_esperada:
+                    raise VersionCambiada(version_esperada, actual)
+            yield
+    
+    def _avanzar_version(self):
+        """Incrementa la versión de la tabla (dentro de la transacción)."""
+        self._conn.execute(
+            "INSERT INTO _versiones (tabla, version) VALUES (?, 1) "
+            "ON CONFLICT(tabla) DO UPDATE SET version = version + 1",
+            (self.tabla,)
+        )
+    
+    def obtener_version(self, fechas: Iterable[str] = ()) -> int:
+        """
+        Obtiene la versión de la tabla, compartida por todas las conexiones.
+        
+        Args:
+            fechas: Se ignora; la versión abarca toda la tabla
+        """
+        filas = self._consultar("SELECT version FROM _versiones WHERE tabla = ?", (self.tabla,))
+        return filas[0][0] if filas else 0
+    
+    @staticmethod
+    def _num_id(item_id: Any) -> Optional[int]:
+        """Convierte el ID a entero si es posible."""
+        try:
+            return int(item_id)
+        except (ValueError, TypeError):
+            return None
+    
+    def _valores_indexados(self, item: Dict[str, Any]) -> List[Any]:
+        """Obtiene los valores de las columnas indexadas de un registro."""
+        return [item.get(campo) for campo in self.campos_indexados]
+    
+    def _condiciones_sql(self, filtros: Dict[str, Any]):
+        """
+        Traduce a SQL los filtros sobre campos indexados.
+        
+        Returns:
+            Tupla (condiciones, parametros, filtros_restantes) con los filtros
+            que deben aplicarse en Python
+        """
+        condiciones = []
+        parametros = []
+        restantes = {}
+        
+        for campo, valor in filtros.items():
+            if campo in self.campos_indexados:
+                if valor is None:
+                    condiciones.append(f"{campo} IS NULL")
+                else:
+                    condiciones.append(f"{campo} = ?")
+                    parametros.append(valor)
+            else:
+                restantes[campo] = valor
+        
+        return condiciones, parametros, restantes
+    
+    def _filtrar_sql(self, filtros: Dict[str, Any], columnas: str):
+        """
+        Ejecuta una consulta aplicando en SQL los filtros sobre campos indexados.
+        
+        Returns:
+            Tupla (filas, filtros_restantes) con los filtros que deben
+            aplicarse en Python
+        """
+        condiciones, parametros, restantes = self._condiciones_sql(filtros)
+        
+        sql = f"SELECT {columnas} FROM {self.tabla}"
+        if condiciones:
+            sql += " WHERE " + " AND ".join(condiciones)
+        if columnas == "datos":
+            sql += " ORDER BY seq"
+        
+        return self._consultar(sql, parametros), restantes
+    
+    def obtener_revision(self) -> int:
+        """
+        Obtiene la revisión actual de los datos.
+        
+        Cambia cada vez que se escribe o que otra conexión confirma cambios.
+        """
+        with self._mutex:
+            data_version = self._leer_data_version()
+            if data_version != self._data_version:
+                self._data_version = data_version
+                self.revision += 1
+            return self.revision
+    
+    def obtener_todos(self) -> List[Dict[str, Any]]:
+        """Obtiene todos los registros."""
+        filas = self._consultar(f"SELECT datos FROM {self.tabla} ORDER BY seq")
+        return [json.loads(fila[0]) for fila in filas]
+    
+    def agregar(self, item: Dict[str, Any], version_esperada: Optional[int] = None) -> Dict[str, Any]:
+        """Agrega un nuevo registro."""
+        return self.agregar_varios([item], version_esperada)[0]
+    
+    def agregar_varios(self, items: List[Dict[str, Any]],
+                       version_esperada: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Agrega varios registros en una sola transacción."""
+        with self._escritura(version_esperada):
+            fila = self._conn.execute(
+                "SELECT ultimo_id FROM _secuencias WHERE tabla = ?", (self.tabla,)
+            ).fetchone()
+            ultimo_id = fila[0]
+            
+            columnas = "".join(f", {campo}" for campo in self.campos_indexados)
+            marcas = ", ?" * len(self.campos_indexados)
+            for item in items:
+                if "id" not in item or not item["id"]:
+                    ultimo_id += 1
+                    item["id"] = ultimo_id
+                else:
+                    ultimo_id = max(ultimo_id, self._num_id(item["id"]) or 0)
+                self._conn.execute(
+                    f"INSERT INTO {self.tabla} (id, num_id, datos{columnas}) VALUES (?, ?, ?{marcas})",
+                    [str(item["id"]), self._num_id(item["id"]),
+                     json.dumps(item, ensure_ascii=False)] + self._valores_indexados(item)
+                )
+            self._conn.execute(
+                "UPDATE _secuencias SET ultimo_id = ? WHERE tabla = ?", (ultimo_id, self.tabla)
+            )
+            self._avanzar_version()
+        
+        self.revision += 1
+        return items
+    
+    def buscar_por_id(self, item_id: Any) -> Optional[Dict[str, Any]]:
+        """Busca un registro por ID."""
+        filas = self._consultar(f"SELECT datos FROM {self.tabla} WHERE id = ?", (str(item_id),))
+        return json.loads(filas[0][0]) if filas else None
+    
+    def actualizar(self, item_id: Any, nuevos_datos: Dict[str, Any],
+                   version_esperada: Optional[int] = None,
+                   version_registro: Optional[int] = None) -> bool:
+        """Actualiza un registro (ver versionar_cambio para version_registro)."""
+        return self.actualizar_varios([(item_id, nuevos_datos, version_registro)], version_esperada)[0]
+    
+    def actualizar_varios(self, cambios: List[Tuple[Any, Dict[str, Any], Optional[int]]],
+                          version_esperada: Optional[int] = None) -> List[bool]:
+        """
+        Actualiza varios registros en una sola transacción: se guardan todos o ninguno.
+        
+        Args:
+            cambios: Tuplas (ID, nuevos datos, version_registro) como en actualizar
+            version_esperada: (Opcional) Versión esperada de la tabla
+            
+        Returns:
+            Por cada cambio, True si se actualizó o False si no se encontró el ID
+        """
+        resultados = []
+        asignaciones = "".join(f", {campo} = ?" for campo in self.campos_indexados)
+        with self._escritura(version_esperada):
+            for item_id, nuevos_datos, version_registro in cambios:
+                fila = self._conn.execute(
+                    f"SELECT datos FROM {self.tabla} WHERE id = ?", (str(item_id),)
+                ).fetchone()
+                resultados.append(fila is not None)
+                if not fila:
+                    continue
+                
+                item = json.loads(fila[0])
+                nuevos_datos = versionar_cambio(item, nuevos_datos, version_registro)
+                for key, value in nuevos_datos.items():
+                    if key != "id":  # No cambiar el ID
+                        item[key] = value
+                
+                self._conn.execute(
+                    f"UPDATE {self.tabla} SET datos = ?{asignaciones} WHERE id = ?",
+                    [json.dumps(item, ensure_ascii=False)] + self._valores_indexados(item) + [str(item_id)]
+                )
+            if any(resultados):
+                self._avanzar_version()
+        
+        if any(resultados):
+            self.revision += 1
+        return resultados
+    
+    def eliminar(self, item_id: Any, version_esperada: Optional[int] = None) -> bool:
+        """Elimina un registro por ID."""
+        with self._escritura(version_esperada):
+            cursor = self._conn.execute(
+                f"DELETE FROM {self.tabla} WHERE id = ?", (str(item_id),)
+            )
+            if cursor.rowcount:
+                self._avanzar_version()
+        if cursor.rowcount:
+            self.revision += 1
+        return cursor.rowcount > 0
+    
+    def contar(self) -> int:
+        """Cuenta el número de registros."""
+        return self._consultar(f"SELECT COUNT(*) FROM {self.tabla}")[0][0]
+    
+    def buscar_por_campo(self, campo: str, valor: Any) -> List[Dict[str, Any]]:
+        """Busca registros por campo y valor."""
+        return self.buscar_por_campos({campo: valor})
+    
+    def buscar_por_campos(self, filtros: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Busca registros que cumplan todos los filtros (campo == valor).
+        
+        Los filtros sobre campos indexados se resuelven en SQL.
+        """
+        filas, restantes = self._filtrar_sql(filtros, "datos")
+        resultados = []
+        for fila in filas:
+            item = json.loads(fila[0])
+            if all(item.get(campo) == valor for campo, valor in restantes.items()):
+                resultados.append(item)
+        return resultados
+    
+    def buscar_por_rango_fechas(self, desde: str, hasta: str, campo: str = "fecha") -> List[Dict[str, Any]]:
+        """Busca registros con fecha (YYYY-MM-DD) entre desde y hasta, inclusive."""
+        if campo not in self.campos_indexados:
+            return [
+                item for item in self.obtener_todos()
+                if isinstance(item.get(campo), str) and desde <= item[campo] <= hasta
+            ]
+        
+        filas = self._consultar(
+            f"SELECT datos FROM {self.tabla} WHERE {campo} BETWEEN ? AND ? ORDER BY seq",
+            (desde, hasta)
+        )
+        return [json.loads(fila[0]) for fila in filas]
+    
+    def buscar_pagina(self, filtros: Dict[str, Any], limite: int,
+                      despues: Optional[Tuple[str, str, str]] = None) -> List[Dict[str, Any]]:
+        """
+        Obtiene hasta `limite` registros ordenados por (fecha, hora, ID) a partir de un cursor.
+        
+        Requiere las columnas fecha y hora. Con el índice sobre (fecha, hora, id)
+        SQLite salta directo al cursor, así que cada página cuesta lo mismo.
+        
+        Args:
+            filtros: Filtros {campo: valor}
+            limite: Cantidad máxima de registros
+            despues: (Opcional) (fecha, hora, ID) del último registro de la
+                página anterior
+        """
+        if "fecha" not in self.campos_indexados or "hora" not in self.campos_indexados:
+            raise ValueError("Para paginar hacen falta las columnas fecha y hora")
+        
+        condiciones, parametros, restantes = self._condiciones_sql(filtros)
+        if despues is not None:
+            condiciones.append("(fecha, hora, id) > (?, ?, ?)")
+            parametros.extend([despues[0], despues[1], str(despues[2])])
+        
+        sql = f"SELECT datos FROM {self.tabla}"
+        if condiciones:
+            sql += " WHERE " + " AND ".join(condiciones)
+        sql += " ORDER BY fecha, hora, id"
+        if not restantes:
+            sql += f" LIMIT {int(limite)}"
+        
+        resultados = []
+        for fila in self._consultar(sql, parametros):
+            item = json.loads(fila[0])
+            if all(item.get(campo) == valor for campo, valor in restantes.items()):
+                resultados.append(item)
+                if len(resultados) >= limite:
+                    break
+        return resultados
+    
+    def contar_por_campo(self, campo: str, valor: Any) -> int:
+        """Cuenta registros con campo == valor."""
+        return self.contar_por_campos({campo: valor})
+    
+    def contar_por_campos(self, filtros: Dict[str, Any]) -> int:
+        """Cuenta registros que cumplen todos los filtros; en SQL si son campos indexados."""
+        if any(campo not in self.campos_indexados for campo in filtros):
+            return len(self.buscar_por_campos(filtros))
+        
+        filas, _ = self._filtrar_sql(filtros, "COUNT(*)")
+        return filas[0][0]
+    
+    def cerrar(self):
+        """Cierra la conexión."""
+        with self._mutex:
+            self._conn.close()
+
+
+# Columnas e índices usados para la tabla de turnos
+CAMPOS_TURNOS = ["fecha", "hora", "profesional_id", "recurso", "estado", "servicio_id"]
+INDICES_TURNOS = [("fecha",), ("profesional_id",), ("estado",), ("fecha", "recurso"),
+                  ("fecha", "hora", "id")]
+
+
+def crear_storage_turnos(db_path: str) -> SQLiteStorage:
+    """Crea un SQLiteStorage configurado para la tabla de turnos."""
+    return SQLiteStorage(db_path, "turnos", CAMPOS_TURNOS, INDICES_TURNOS)
+
+
+def migrar_turnos_json(data_dir: str = "data", db_path: Optional[str] = None) -> int:
+    """
+    Copia los turnos de `turnos.json` a la base SQLite.
+    
+    Solo migra si la tabla está vacía, para que ejecutarlo dos veces no
+    duplique registros.
+    
+    Args:
+        data_dir: Directorio de datos
+        db_path: (Opcional) Ruta de la base. Por defecto `<data_dir>/turnos.db`
+        
+    Returns:
+        Número de turnos migrados
+    """
+    from .json_storage import JSONStorage
+    
+    storage = crear_storage_turnos(db_path or f"{data_dir}/turnos.db")
+    try:
+        if storage.contar() > 0:
+            print("⚠️  La base SQLite ya tiene turnos, no se migra nada")
+            return 0
+        
+        turnos = JSONStorage(f"{data_dir}/turnos.json").obtener_todos()
+        storage.agregar_varios([dict(turno) for turno in turnos])
+        return len(turnos)
+    finally:
+        storage.cerrar()
+
+print("✅ Clase 'SQLiteStorage' definida")
\ No newline at end of file
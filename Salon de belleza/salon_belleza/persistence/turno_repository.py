@@ -2,38 +2,250 @@
 """
 Repositorio específico para manejar turnos.
 """
-from typing import List, Optional, Dict, Any
+import shutil
+import tempfile
+import threading
+from typing import List, Optional, Dict, Any, Tuple, Iterable
 from datetime import datetime
-from ..models.turno import Turno
+from pathlib import Path
+from ..models.turno import Turno, hora_a_minutos
 from .json_storage import JSONStorage
+from .journal_storage import JournalStorage
+from .sharded_storage import ShardedJSONStorage
+from .sqlite_storage import crear_storage_turnos as crear_storage_turnos_sqlite
+from .indice_intervalos import IndiceIntervalos
+from .indices_secundarios import IndicesSecundarios
+from .estadisticas_turnos import EstadisticasTurnos
+from .catalogo_servicios import CatalogoServicios
 
 class TurnoRepository:
     """Repositorio especializado para turnos."""
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", almacenamiento: Optional[Dict[str, Any]] = None,
+                 catalogo_servicios: Optional[CatalogoServicios] = None):
         """
         Inicializa el repositorio de turnos.
         
         Args:
             data_dir: Directorio donde están los archivos JSON
+            almacenamiento: (Opcional) Configuración del almacenamiento de turnos,
+                por ejemplo {"tipo": "journal", "limite_journal_kb": 1024}
+            catalogo_servicios: (Opcional) Catálogo de servicios compartido. Si no
+                se indica se crea uno sobre `<data_dir>/servicios.json`
         """
-        self.turnos_storage = JSONStorage(f"{data_dir}/turnos.json")
-        self.servicios_storage = JSONStorage(f"{data_dir}/servicios.json")
+        self.turnos_storage = self._crear_storage_turnos(data_dir, almacenamiento or {})
+        self.catalogo_servicios = catalogo_servicios or CatalogoServicios(f"{data_dir}/servicios.json")
+        self.servicios_storage = self.catalogo_servicios.storage
         self.profesionales_storage = JSONStorage(f"{data_dir}/profesionales.json")
+        
+        # Índices de intervalos por fecha: {fecha: {"profesional": {...}, "recurso": {...}}}
+        self._indices_fecha: Dict[str, Dict[str, Dict[Any, IndiceIntervalos]]] = {}
+        self._revision_indices: Optional[int] = None
+        # Los intervalos usan la duración de cada servicio: cambiar el catálogo también los invalida
+        self._revision_catalogo: Optional[int] = None
+        
+        # Índices secundarios (fecha, profesional, estado, cliente), se crean al primer uso.
+        # Los almacenamientos que ya filtran por su cuenta (SQLite, mensual) no los usan.
+        self._secundarios: Optional[IndicesSecundarios] = None
+        
+        # Contadores para estadísticas, se crean al primer uso
+        self._estadisticas: Optional[EstadisticasTurnos] = None
+        
+        # Protege la construcción y actualización de los índices entre hilos
+        self._mutex = threading.RLock()
     
-    def crear_turno(self, turno: Turno) -> Turno:
+    @staticmethod
+    def _crear_storage_turnos(data_dir: str, almacenamiento: Dict[str, Any]) -> JSONStorage:
         """
-        Crea un nuevo turno.
+        Crea el almacenamiento de turnos según la configuración.
         
-        Args:
-            turno: Objeto Turno a crear
-            
-        Returns:
-            El turno creado con ID asignado
+        Tipos soportados:
+            json: archivo JSON reescrito completo en cada cambio (por defecto)
+            journal: instantánea JSON + journal de solo anexado
+            sqlite: base SQLite (`archivo_sqlite`, por defecto turnos.db) con
+                índices sobre fecha, profesional, estado y (fecha, recurso)
+            mensual: un archivo por mes en `<data_dir>/turnos/AAAA-MM.json`;
+                la primera vez se reparten los turnos de turnos.json
         """
+        tipo = almacenamiento.get("tipo", "json")
+        ruta = f"{data_dir}/turnos.json"
+        
+        if tipo == "json":
+            return JSONStorage(ruta)
+        if tipo == "journal":
+            limite_kb = almacenamiento.get("limite_journal_kb", 1024)
+            return JournalStorage(ruta, limite_bytes=int(limite_kb * 1024))
+        if tipo == "sqlite":
+            archivo = almacenamiento.get("archivo_sqlite", "turnos.db")
+            return crear_storage_turnos_sqlite(f"{data_dir}/{archivo}")
+        if tipo == "mensual":
+            directorio = Path(f"{data_dir}/turnos")
+            if not directorio.exists() and Path(ruta).exists():
+                # Se importa en un directorio aparte que se renombra al terminar:
+                # si la importación se corta, el próximo arranque la repite
+                temporal = Path(tempfile.mkdtemp(prefix="turnos.importando-", dir=data_dir))
+                try:
+                    importados = ShardedJSONStorage(str(temporal)).importar(JSONStorage(ruta).obtener_todos())
+                    temporal.rename(directorio)
+                    print(f"✅ {importados} turnos repartidos en archivos mensuales")
+                except OSError:
+                    # Otro proceso terminó la importación primero
+                    if not directorio.exists():
+                        raise
+                finally:
+                    shutil.rmtree(temporal, ignore_errors=True)
+            return ShardedJSONStorage(str(directorio))
+        
+        raise ValueError(f"Tipo de almacenamiento desconocido: {tipo}")
+    
+    def _duracion_servicio(self, servicio_id: Any) -> int:
+        """Obtiene la duración de un servicio (60 minutos si no existe)."""
+        return self.catalogo_servicios.duracion(servicio_id)
+    
+    def _invalidar_indices(self, revision: Optional[int]):
+        """Descarta todos los índices en memoria."""
+        self._indices_fecha = {}
+        self._secundarios = None
+        self._estadisticas = None
+        self._revision_indices = revision
+        self._revision_catalogo = self.catalogo_servicios.obtener_revision()
+    
+    def _sincronizar_indices(self):
+        """Descarta los índices si los turnos o los servicios cambiaron fuera de este repositorio."""
+        with self._mutex:
+            revision = self.turnos_storage.obtener_revision()
+            if (revision != self._revision_indices
+                    or self.catalogo_servicios.obtener_revision() != self._revision_catalogo):
+                self._invalidar_indices(revision)
+    
+    def _indices_secundarios(self) -> Optional[IndicesSecundarios]:
+        """
+        Obtiene los índices secundarios, construyéndolos la primera vez.
+        
+        Devuelve None si el almacenamiento resuelve los filtros por su cuenta.
+        """
+        if getattr(self.turnos_storage, "resuelve_filtros", False):
+            return None
+        
+        with self._mutex:
+            self._sincronizar_indices()
+            if self._secundarios is None:
+                secundarios = IndicesSecundarios()
+                for data in self.turnos_storage.obtener_todos():
+                    secundarios.agregar(dict(data))
+                self._secundarios = secundarios
+            return self._secundarios
+    
+    def _buscar(self, filtros: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Obtiene los diccionarios de turnos que cumplen todos los filtros."""
+        secundarios = self._indices_secundarios()
+        if secundarios is not None:
+            return secundarios.buscar(filtros)
+        
+        if "cliente" in filtros:
+            cliente = IndicesSecundarios.normalizar_cliente(filtros["cliente"])
+            filtros = {k: v for k, v in filtros.items() if k != "cliente"}
+            return [
+                data for data in self.turnos_storage.buscar_por_campos(filtros)
+                if IndicesSecundarios.normalizar_cliente(data.get("cliente_nombre")) == cliente
+            ]
+        return self.turnos_storage.buscar_por_campos(filtros)
+    
+    def _indice_fecha(self, fecha: str) -> Dict[str, Dict[Any, IndiceIntervalos]]:
+        """Obtiene (construyéndolos si hace falta) los índices de una fecha."""
+        with self._mutex:
+            self._sincronizar_indices()
+            indices = self._indices_fecha.get(fecha)
+            if indices is None:
+                indices = {"profesional": {}, "recurso": {}}
+                for data in self._buscar({"fecha": fecha}):
+                    self._indexar(indices, data, agregar=True)
+                self._indices_fecha[fecha] = indices
+            return indices
+    
+    def _indexar(self, indices: Dict[str, Dict[Any, IndiceIntervalos]],
+                 data: Dict[str, Any], agregar: bool):
+        """Agrega o quita un turno (como diccionario) de los índices de su fecha."""
+        if data.get("estado") == "cancelado":
+            return
+        
+        try:
+            inicio = hora_a_minutos(data["hora"])
+        except (KeyError, TypeError, ValueError):
+            return
+        fin = inicio + self._duracion_servicio(data.get("servicio_id"))
+        clave = str(data.get("id"))
+        
+        for tipo, valor in (("profesional", data.get("profesional_id")),
+                            ("recurso", data.get("recurso"))):
+            if not valor:
+                continue
+            if agregar:
+                indices[tipo].setdefault(valor, IndiceIntervalos()).agregar(inicio, fin, clave)
+            elif valor in indices[tipo]:
+                indices[tipo][valor].quitar(inicio, fin, clave)
+    
+    def _registrar_cambio(self, revision_previa: int, anterior: Optional[Dict[str, Any]],
+                          nuevo: Optional[Dict[str, Any]]):
+        """Actualiza los índices tras escribir un solo turno."""
+        self._registrar_cambios(revision_previa, [(anterior, nuevo)])
+    
+    def _registrar_cambios(self, revision_previa: int,
+                           cambios: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]):
+        """
+        Actualiza los índices tras una escritura propia.
+        
+        Cada cambio es un par (anterior, nuevo) de la misma escritura. Si la
+        revisión avanzó más de un paso, otro proceso escribió en el medio y
+        los índices se descartan para reconstruirlos bajo demanda.
+        """
+        with self._mutex:
+            revision = self.turnos_storage.obtener_revision()
+            if revision_previa != self._revision_indices or revision != revision_previa + 1:
+                self._invalidar_indices(revision)
+                return
+            
+            for anterior, nuevo in cambios:
+                if self._secundarios is not None:
+                    if nuevo:
+                        self._secundarios.agregar(dict(nuevo))
+                    elif anterior:
+                        self._secundarios.quitar(anterior.get("id"))
+                
+                if self._estadisticas is not None:
+                    if anterior:
+                        self._estadisticas.quitar(anterior)
+                    if nuevo:
+                        self._estadisticas.agregar(nuevo)
+                
+                if anterior and anterior.get("fecha") in self._indices_fecha:
+                    self._indexar(self._indices_fecha[anterior["fecha"]], anterior, agregar=False)
+                if nuevo and nuevo.get("fecha") in self._indices_fecha:
+                    self._indexar(self._indices_fecha[nuevo["fecha"]], nuevo, agregar=True)
+            self._revision_indices = revision
+    
+    def _a_turno(self, data: Dict[str, Any]) -> Turno:
+        """Crea un Turno desde un registro guardado (sin volver a validarlo)."""
+        return Turno.desde_almacenamiento(data, self._duracion_servicio(data.get("servicio_id")))
+    
+    def _a_turnos(self, datos: List[Dict[str, Any]]) -> List[Turno]:
+        """Crea los Turnos de una lista de registros guardados."""
+        duraciones = self.catalogo_servicios.duraciones()
+        por_defecto = CatalogoServicios.DURACION_POR_DEFECTO
+        return [
+            Turno.desde_almacenamiento(data, duraciones.get(str(data.get("servicio_id")), por_defecto))
+            for data in datos
+        ]
+    
+    def _turno_dict(self, turno_id: Any) -> Optional[Dict[str, Any]]:
+        """Obtiene una copia del diccionario almacenado de un turno."""
+        data = self.turnos_storage.buscar_por_id(turno_id)
+        return dict(data) if data else None
+    
+    def _validar_referencias(self, turno: Turno):
+        """Verifica que existan el servicio y (si tiene) el profesional del turno."""
         # Validar que el servicio existe
-        servicio_data = self.servicios_storage.buscar_por_id(turno.servicio_id)
-        if not servicio_data:
+        if not self.catalogo_servicios.existe(turno.servicio_id):
             raise ValueError(f"Servicio con ID {turno.servicio_id} no existe")
         
         # Si hay profesional, validar que existe
@@ -41,18 +253,101 @@ class TurnoRepository:
             profesional_data = self.profesionales_storage.buscar_por_id(turno.profesional_id)
             if not profesional_data:
                 raise ValueError(f"Profesional con ID {turno.profesional_id} no existe")
+    
+    def obtener_version(self, fechas: Iterable[str] = ()) -> int:
+        """
+        Obtiene la versión de los turnos en disco, compartida entre procesos.
+        
+        Se lee antes de validar una escritura y se pasa como version_esperada:
+        si otro proceso escribió en el medio, la escritura lanza
+        VersionCambiada en lugar de pisar su cambio.
+        
+        Args:
+            fechas: (Opcional) Fechas que se van a escribir. El almacenamiento
+                mensual solo versiona sus meses; los demás lo ignoran.
+        """
+        return self.turnos_storage.obtener_version(fechas)
+    
+    def obtener_etag(self) -> str:
+        """
+        Obtiene una etiqueta que cambia cada vez que cambian los turnos o los servicios.
+        
+        No carga datos: lee la versión (escrituras de cualquier proceso) y
+        la revisión (que además detecta archivos editados a mano), así que
+        es barata y sirve como clave de cachés de consultas: mientras no
+        cambie, las consultas devuelven lo mismo.
+        
+        Returns:
+            Etiqueta opaca, por ejemplo "12-3-1"
+        """
+        return (
+            f"{self.turnos_storage.obtener_version()}-{self.turnos_storage.obtener_revision()}"
+            f"-{self.catalogo_servicios.obtener_revision()}"
+        )
+    
+    def crear_turno(self, turno: Turno, version_esperada: Optional[int] = None) -> Turno:
+        """
+        Crea un nuevo turno.
+        
+        Args:
+            turno: Objeto Turno a crear
+            version_esperada: (Opcional) Versión leída con obtener_version([turno.fecha])
+            
+        Returns:
+            El turno creado con ID asignado
+            
+        Raises:
+            VersionCambiada: Si la versión ya no es version_esperada
+        """
+        self._validar_referencias(turno)
         
         # Asignar timestamp de registro
         turno.timestamp_registro = datetime.now().isoformat()
         
         # Convertir a diccionario y guardar
         turno_dict = turno.to_dict()
-        resultado = self.turnos_storage.agregar(turno_dict)
+        self._sincronizar_indices()
+        revision_previa = self.turnos_storage.revision
+        resultado = self.turnos_storage.agregar(turno_dict, version_esperada)
+        self._registrar_cambio(revision_previa, None, resultado)
         
         # Actualizar el ID en el objeto
         turno.id = resultado["id"]
         return turno
     
+    def crear_turnos(self, turnos: List[Turno], version_esperada: Optional[int] = None) -> List[Turno]:
+        """
+        Crea varios turnos con una sola escritura: se guardan todos o ninguno.
+        
+        Args:
+            turnos: Objetos Turno a crear
+            version_esperada: (Opcional) Versión leída con obtener_version(fechas de los turnos)
+            
+        Returns:
+            Los turnos creados con ID asignado
+            
+        Raises:
+            VersionCambiada: Si la versión ya no es version_esperada
+        """
+        # Validar todo antes de escribir
+        for turno in turnos:
+            self._validar_referencias(turno)
+        
+        timestamp = datetime.now().isoformat()
+        for turno in turnos:
+            turno.timestamp_registro = timestamp
+        
+        self._sincronizar_indices()
+        revision_previa = self.turnos_storage.revision
+        resultados = self.turnos_storage.agregar_varios(
+            [turno.to_dict() for turno in turnos], version_esperada
+        )
+        self._registrar_cambios(revision_previa, [(None, resultado) for resultado in resultados])
+        
+        for turno, resultado in zip(turnos, resultados):
+            turno.id = resultado["id"]
+        return turnos
+    
     def obtener_turno(self, turno_id: str) -> Optional[Turno]:
         """
         Obtiene un turno por ID.
@@ -67,7 +362,7 @@ class TurnoRepository:
         if not turno_data:
             return None
         
-        return Turno.from_dict(turno_data)
+        return self._a_turno(turno_data)
     
     def obtener_todos_turnos(self) -> List[Turno]:
         """
@@ -77,7 +372,7 @@ class TurnoRepository:
             Lista de todos los turnos
         """
         turnos_data = self.turnos_storage.obtener_todos()
-        return [Turno.from_dict(data) for data in turnos_data]
+        return self._a_turnos(turnos_data)
     
     def obtener_turnos_por_fecha(self, fecha: str) -> List[Turno]:
         """
@@ -95,8 +390,8 @@ class TurnoRepository:
         except ValueError:
             raise ValueError("Formato de fecha inválido. Use YYYY-MM-DD")
         
-        turnos_data = self.turnos_storage.buscar_por_campo("fecha", fecha)
-        return [Turno.from_dict(data) for data in turnos_data]
+        turnos_data = self._buscar({"fecha": fecha})
+        return self._a_turnos(turnos_data)
     
     def obtener_turnos_por_profesional(self, profesional_id: int, fecha: Optional[str] = None) -> List[Turno]:
         """
@@ -114,12 +409,7 @@ class TurnoRepository:
         if not profesional_data:
             raise ValueError(f"Profesional con ID {profesional_id} no existe")
         
-        todos_turnos = self.obtener_todos_turnos()
-        
-        turnos_profesional = [
-            turno for turno in todos_turnos 
-            if turno.profesional_id == profesional_id
-        ]
+        filtros = {"profesional_id": profesional_id}
         
         if fecha:
             # Validar formato de fecha
@@ -128,27 +418,183 @@ class TurnoRepository:
             except ValueError:
                 raise ValueError("Formato de fecha inválido. Use YYYY-MM-DD")
             
-            turnos_profesional = [
-                turno for turno in turnos_profesional
-                if turno.fecha == fecha
+            filtros["fecha"] = fecha
+        
+        turnos_data = self._buscar(filtros)
+        return self._a_turnos(turnos_data)
+    
+    def _filtros(self, fecha: Optional[str] = None,
+                 profesional_id: Optional[int] = None,
+                 estado: Optional[str] = None,
+                 cliente: Optional[str] = None) -> Dict[str, Any]:
+        """Arma el diccionario de filtros, validando la fecha."""
+        filtros = {}
+        if fecha:
+            try:
+                datetime.strptime(fecha, "%Y-%m-%d")
+            except ValueError:
+                raise ValueError("Formato de fecha inválido. Use YYYY-MM-DD")
+            filtros["fecha"] = fecha
+        if profesional_id:
+            filtros["profesional_id"] = profesional_id
+        if estado:
+            filtros["estado"] = estado
+        if cliente:
+            filtros["cliente"] = cliente
+        return filtros
+    
+    def _pagina(self, filtros: Dict[str, Any], limite: int,
+                despues: Optional[Tuple[str, str, str]]) -> List[Dict[str, Any]]:
+        """Obtiene una página de diccionarios de turnos (ver obtener_turnos_filtrados)."""
+        secundarios = self._indices_secundarios()
+        if secundarios is not None:
+            if despues is not None:
+                despues = (IndicesSecundarios.clave_tiempo(despues[0], despues[1]), str(despues[2]))
+            return secundarios.pagina(limite, despues, filtros)
+        
+        if "cliente" not in filtros:
+            return self.turnos_storage.buscar_pagina(filtros, limite, despues)
+        
+        # El nombre normalizado no es una columna: se piden páginas hasta juntar `limite`
+        cliente = IndicesSecundarios.normalizar_cliente(filtros["cliente"])
+        filtros = {k: v for k, v in filtros.items() if k != "cliente"}
+        resultados = []
+        while len(resultados) < limite:
+            pagina = self.turnos_storage.buscar_pagina(filtros, limite, despues)
+            resultados.extend(
+                data for data in pagina
+                if IndicesSecundarios.normalizar_cliente(data.get("cliente_nombre")) == cliente
+            )
+            if len(pagina) < limite:
+                break
+            ultimo = pagina[-1]
+            despues = (ultimo.get("fecha"), ultimo.get("hora"), str(ultimo.get("id")))
+        return resultados[:limite]
+    
+    def obtener_turnos_filtrados(self, fecha: Optional[str] = None,
+                                 profesional_id: Optional[int] = None,
+                                 estado: Optional[str] = None,
+                                 cliente: Optional[str] = None,
+                                 limite: Optional[int] = None,
+                                 despues: Optional[Tuple[str, str, str]] = None) -> List[Turno]:
+        """
+        Obtiene turnos que cumplen todos los filtros indicados.
+        
+        Sin límite se devuelven todos, en el orden en que se guardaron. Con
+        límite se devuelve una página ordenada por fecha, hora e ID; para
+        pedir la siguiente se pasa como `despues` la clave_orden del último
+        turno recibido (paginación por cursor: no se recorren las páginas
+        anteriores y no se saltean ni repiten turnos si en el medio se
+        agregan o quitan otros).
+        
+        Args:
+            fecha: (Opcional) Fecha en formato YYYY-MM-DD
+            profesional_id: (Opcional) ID del profesional
+            estado: (Opcional) Estado del turno
+            cliente: (Opcional) Nombre del cliente (sin distinguir mayúsculas)
+            limite: (Opcional) Cantidad máxima de turnos de la página
+            despues: (Opcional) Cursor (fecha, hora, ID) del último turno de
+                la página anterior
+                
+        Returns:
+            Lista de turnos que cumplen todos los filtros
+        """
+        filtros = self._filtros(fecha, profesional_id, estado, cliente)
+        
+        if limite is not None:
+            return self._a_turnos(self._pagina(filtros, limite, despues))
+        
+        if not filtros:
+            return self.obtener_todos_turnos()
+        
+        return self._a_turnos(self._buscar(filtros))
+    
+    def contar_turnos(self, fecha: Optional[str] = None,
+                      profesional_id: Optional[int] = None,
+                      estado: Optional[str] = None) -> int:
+        """
+        Cuenta los turnos que cumplen todos los filtros, sin crear objetos Turno.
+        
+        Args:
+            fecha: (Opcional) Fecha en formato YYYY-MM-DD
+            profesional_id: (Opcional) ID del profesional
+            estado: (Opcional) Estado del turno
+            
+        Returns:
+            Número de turnos
+        """
+        filtros = self._filtros(fecha, profesional_id, estado)
+        secundarios = self._indices_secundarios()
+        if secundarios is not None:
+            return secundarios.contar(filtros)
+        return self.turnos_storage.contar_por_campos(filtros)
+    
+    def obtener_turnos_rango(self, desde: str, hasta: str,
+                             profesional_id: Optional[int] = None,
+                             estado: Optional[str] = None) -> List[Turno]:
+        """
+        Obtiene los turnos entre dos fechas (inclusive), ordenados por fecha y hora.
+        
+        Args:
+            desde: Fecha inicial (YYYY-MM-DD)
+            hasta: Fecha final (YYYY-MM-DD), inclusive
+            profesional_id: (Opcional) Filtra por profesional
+            estado: (Opcional) Filtra por estado
+            
+        Returns:
+            Lista de turnos del rango
+        """
+        for fecha in (desde, hasta):
+            try:
+                datetime.strptime(fecha, "%Y-%m-%d")
+            except ValueError:
+                raise ValueError("Formato de fecha inválido. Use YYYY-MM-DD")
+        
+        filtros = {}
+        if profesional_id:
+            filtros["profesional_id"] = profesional_id
+        if estado:
+            filtros["estado"] = estado
+        
+        secundarios = self._indices_secundarios()
+        if secundarios is not None:
+            turnos_data = secundarios.rango(
+                IndicesSecundarios.clave_tiempo(desde),
+                IndicesSecundarios.clave_tiempo(hasta, "23:59"),
+                filtros
+            )
+        else:
+            turnos_data = [
+                data for data in self.turnos_storage.buscar_por_rango_fechas(desde, hasta)
+                if all(data.get(campo) == valor for campo, valor in filtros.items())
             ]
+            turnos_data.sort(key=lambda data: (data.get("fecha", ""), data.get("hora", "")))
         
-        return turnos_profesional
+        return self._a_turnos(turnos_data)
     
-    def actualizar_turno(self, turno_id: str, turno_actualizado: Turno) -> bool:
+    def actualizar_turno(self, turno_id: str, turno_actualizado: Turno,
+                         version_esperada: Optional[int] = None) -> bool:
         """
         Actualiza un turno existente.
         
+        La actualización es condicional: turno_actualizado.version debe ser
+        la que tiene el turno guardado (la que tenía al leerlo). Si se guarda,
+        turno_actualizado queda con la versión nueva.
+        
         Args:
             turno_id: ID del turno a actualizar
             turno_actualizado: Objeto Turno con los nuevos datos
+            version_esperada: (Opcional) Versión leída con obtener_version([fecha])
             
         Returns:
             True si se actualizó, False si no se encontró
+            
+        Raises:
+            VersionCambiada: Si la versión ya no es version_esperada
+            RegistroModificado: Si otro usuario actualizó el turno desde que se leyó
         """
         # Validar que el servicio existe
-        servicio_data = self.servicios_storage.buscar_por_id(turno_actualizado.servicio_id)
-        if not servicio_data:
+        if not self.catalogo_servicios.existe(turno_actualizado.servicio_id):
             raise ValueError(f"Servicio con ID {turno_actualizado.servicio_id} no existe")
         
         # Si hay profesional, validar que existe
@@ -160,9 +606,62 @@ class TurnoRepository:
         # Convertir a diccionario (sin ID ya que no debe cambiar)
         turno_dict = turno_actualizado.to_dict()
         turno_dict.pop("id", None)  # No permitir cambiar el ID
+        turno_dict.pop("version", None)  # La avanza el storage
         
         # Actualizar en el storage
-        return self.turnos_storage.actualizar(turno_id, turno_dict)
+        self._sincronizar_indices()
+        anterior = self._turno_dict(turno_id)
+        revision_previa = self.turnos_storage.revision
+        actualizado = self.turnos_storage.actualizar(
+            turno_id, turno_dict, version_esperada, version_registro=turno_actualizado.version
+        )
+        if actualizado:
+            self._registrar_cambio(revision_previa, anterior, self._turno_dict(turno_id))
+            turno_actualizado.version += 1
+        return actualizado
+    
+    def actualizar_turnos(self, turnos: List[Turno], version_esperada: Optional[int] = None) -> List[bool]:
+        """
+        Actualiza varios turnos con una sola escritura: se guardan todos o ninguno.
+        
+        Cada turno se verifica con su versión, como en actualizar_turno, y
+        los que se guardan quedan con la versión nueva.
+        
+        Args:
+            turnos: Turnos con los nuevos datos (y el ID de cada uno)
+            version_esperada: (Opcional) Versión leída con obtener_version(fechas de los turnos)
+            
+        Returns:
+            Por cada turno, True si se actualizó o False si no se encontró
+            
+        Raises:
+            VersionCambiada: Si la versión ya no es version_esperada
+            RegistroModificado: Si otro usuario actualizó alguno de los turnos
+        """
+        for turno in turnos:
+            self._validar_referencias(turno)
+        
+        cambios = []
+        for turno in turnos:
+            turno_dict = turno.to_dict()
+            turno_dict.pop("id", None)  # No permitir cambiar el ID
+            turno_dict.pop("version", None)  # La avanza el storage
+            cambios.append((turno.id, turno_dict, turno.version))
+        
+        self._sincronizar_indices()
+        anteriores = [self._turno_dict(turno.id) for turno in turnos]
+        revision_previa = self.turnos_storage.revision
+        resultados = self.turnos_storage.actualizar_varios(cambios, version_esperada)
+        if any(resultados):
+            self._registrar_cambios(revision_previa, [
+                (anterior, self._turno_dict(turno.id))
+                for turno, anterior, actualizado in zip(turnos, anteriores, resultados) if actualizado
+            ])
+        
+        for turno, actualizado in zip(turnos, resultados):
+            if actualizado:
+                turno.version += 1
+        return resultados
     
     def eliminar_turno(self, turno_id: str) -> bool:
         """
@@ -174,24 +673,44 @@ class TurnoRepository:
         Returns:
             True si se eliminó, False si no se encontró
         """
-        return self.turnos_storage.eliminar(turno_id)
+        self._sincronizar_indices()
+        anterior = self._turno_dict(turno_id)
+        revision_previa = self.turnos_storage.revision
+        eliminado = self.turnos_storage.eliminar(turno_id)
+        if eliminado:
+            self._registrar_cambio(revision_previa, anterior, None)
+        return eliminado
     
-    def cambiar_estado_turno(self, turno_id: str, nuevo_estado: str) -> bool:
+    def cambiar_estado_turno(self, turno_id: str, nuevo_estado: str,
+                             version: Optional[int] = None) -> bool:
         """
         Cambia el estado de un turno.
         
         Args:
             turno_id: ID del turno
             nuevo_estado: Nuevo estado (pendiente, confirmado, completado, cancelado)
+            version: (Opcional) Versión del turno cuando se leyó; si se indica y
+                el turno cambió desde entonces, no se modifica
             
         Returns:
             True si se actualizó, False si no se encontró
+            
+        Raises:
+            RegistroModificado: Si el turno ya no está en la versión indicada
         """
         estados_validos = ["pendiente", "confirmado", "completado", "cancelado"]
         if nuevo_estado not in estados_validos:
             raise ValueError(f"Estado inválido. Use: {', '.join(estados_validos)}")
         
-        return self.turnos_storage.actualizar(turno_id, {"estado": nuevo_estado})
+        self._sincronizar_indices()
+        anterior = self._turno_dict(turno_id)
+        revision_previa = self.turnos_storage.revision
+        actualizado = self.turnos_storage.actualizar(
+            turno_id, {"estado": nuevo_estado}, version_registro=version
+        )
+        if actualizado:
+            self._registrar_cambio(revision_previa, anterior, self._turno_dict(turno_id))
+        return actualizado
     
     def contar_turnos_por_estado(self, estado: str = "pendiente") -> int:
         """
@@ -203,8 +722,73 @@ class TurnoRepository:
         Returns:
             Número de turnos con ese estado
         """
-        turnos_data = self.turnos_storage.buscar_por_campo("estado", estado)
-        return len(turnos_data)
+        secundarios = self._indices_secundarios()
+        if secundarios is not None:
+            return secundarios.contar({"estado": estado})
+        return self.turnos_storage.contar_por_campo("estado", estado)
+    
+    def contar_turnos_por_fecha(self, fecha: str) -> int:
+        """
+        Cuenta los turnos de una fecha (incluye cancelados).
+        
+        Args:
+            fecha: Fecha en formato YYYY-MM-DD
+            
+        Returns:
+            Número de turnos de esa fecha
+        """
+        secundarios = self._indices_secundarios()
+        if secundarios is not None:
+            return secundarios.contar({"fecha": fecha})
+        return self.turnos_storage.contar_por_campo("fecha", fecha)
+    
+    def obtener_estadisticas(self, hoy: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Obtiene los contadores de turnos sin recorrerlos.
+        
+        Los contadores se construyen la primera vez y luego se ajustan con
+        cada alta, baja o modificación hecha desde este repositorio.
+        
+        Args:
+            hoy: (Opcional) Fecha desde la que se cuentan turnos futuros
+                (YYYY-MM-DD). Por defecto la fecha actual
+                
+        Returns:
+            Diccionario con total, futuros, estados, servicios, profesionales y fechas
+        """
+        with self._mutex:
+            self._sincronizar_indices()
+            if self._estadisticas is None:
+                self._estadisticas = EstadisticasTurnos(
+                    dict(data) for data in self.turnos_storage.obtener_todos()
+                )
+            return self._estadisticas.resumen(hoy or datetime.now().strftime("%Y-%m-%d"))
+    
+    def recalcular_estadisticas(self, hoy: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Calcula las estadísticas recorriendo todos los turnos.
+        
+        No usa ni modifica los contadores incrementales; sirve para
+        verificar que obtener_estadisticas devuelve lo mismo.
+        """
+        estadisticas = EstadisticasTurnos(self.turnos_storage.obtener_todos())
+        return estadisticas.resumen(hoy or datetime.now().strftime("%Y-%m-%d"))
+    
+    def obtener_ocupacion(self, fecha: str) -> Dict[str, Dict[Any, int]]:
+        """
+        Obtiene los mapas de ocupación por minuto de una fecha.
+        
+        Args:
+            fecha: Fecha en formato YYYY-MM-DD
+            
+        Returns:
+            {"profesional": {id: mapa_bits}, "recurso": {nombre: mapa_bits}}
+        """
+        indices = self._indice_fecha(fecha)
+        return {
+            tipo: {clave: indice.mapa_ocupacion() for clave, indice in por_clave.items()}
+            for tipo, por_clave in indices.items()
+        }
     
     def existe_conflicto_horario(self, fecha: str, hora: str, duracion_minutos: int, 
                                 profesional_id: Optional[int] = None, recurso: Optional[str] = None) -> bool:
@@ -221,53 +805,29 @@ class TurnoRepository:
         Returns:
             True si hay conflicto, False si está libre
         """
-        # Obtener todos los turnos de esa fecha
-        turnos_fecha = self.obtener_turnos_por_fecha(fecha)
-        
-        if not turnos_fecha:
-            return False
+        # Validar formatos
+        try:
+            datetime.strptime(fecha, "%Y-%m-%d")
+        except ValueError:
+            raise ValueError("Formato de fecha inválido. Use YYYY-MM-DD")
         
-        # Convertir hora de inicio a minutos desde medianoche
         hora_inicio_obj = datetime.strptime(hora, "%H:%M")
         inicio_minutos = hora_inicio_obj.hour * 60 + hora_inicio_obj.minute
         fin_minutos = inicio_minutos + duracion_minutos
         
-        for turno in turnos_fecha:
-            # Si hay profesional asignado, verificar conflictos del profesional
-            if profesional_id and turno.profesional_id == profesional_id:
-                # Calcular rango horario del turno existente
-                turno_hora_obj = datetime.strptime(turno.hora, "%H:%M")
-                turno_inicio = turno_hora_obj.hour * 60 + turno_hora_obj.minute
-                
-                # Obtener duración del servicio del turno existente
-                servicio_data = self.servicios_storage.buscar_por_id(turno.servicio_id)
-                if servicio_data:
-                    turno_duracion = servicio_data.get("duracion_minutos", 60)
-                else:
-                    turno_duracion = 60
-                
-                turno_fin = turno_inicio + turno_duracion
-                
-                # Verificar superposición
-                if (inicio_minutos < turno_fin and fin_minutos > turno_inicio):
-                    return True
-            
-            # Si hay recurso asignado, verificar conflictos del recurso
-            if recurso and turno.recurso == recurso:
-                # Similar lógica para recursos
-                turno_hora_obj = datetime.strptime(turno.hora, "%H:%M")
-                turno_inicio = turno_hora_obj.hour * 60 + turno_hora_obj.minute
-                
-                servicio_data = self.servicios_storage.buscar_por_id(turno.servicio_id)
-                if servicio_data:
-                    turno_duracion = servicio_data.get("duracion_minutos", 60)
-                else:
-                    turno_duracion = 60
-                
-                turno_fin = turno_inicio + turno_duracion
-                
-                if (inicio_minutos < turno_fin and fin_minutos > turno_inicio):
-                    return True
+        indices = self._indice_fecha(fecha)
+        
+        # Conflictos del profesional
+        if profesional_id:
+            indice = indices["profesional"].get(profesional_id)
+            if indice and indice.hay_superposicion(inicio_minutos, fin_minutos):
+                return True
+        
+        # Conflictos del recurso
+        if recurso:
+            indice = indices["recurso"].get(recurso)
+            if indice and indice.hay_superposicion(inicio_minutos, fin_minutos):
+                return True
         
         return False
 
@@ -0,0 +1,80 @@
+# prueba_asignador.py
+"""
+Prueba del asignador automático: la búsqueda exacta debe ubicar al menos
+los mismos turnos que la voraz y, con los mismos minutos, repartirlos
+de forma más pareja.
+"""
+import sys
+import os
+from contextlib import redirect_stdout
+from io import StringIO
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+with redirect_stdout(StringIO()):
+    from salon_belleza.core.asignador import AsignadorTurnos
+    from salon_belleza.models.turno import Turno
+    from salon_belleza.models.servicio import Servicio
+
+print("="*60)
+print("PRUEBA DEL ASIGNADOR - voraz contra búsqueda exacta")
+print("="*60)
+
+servicios = {
+    1: Servicio(1, "Esmaltado", 30, 1000, "Uñas"),
+    2: Servicio(2, "Esculpidas", 90, 3000, "Uñas"),
+}
+profesionales = [
+    {"id": 1, "especialidades": [1, 2], "recursos_posibles": ["mesa_1"], "preferencia_recurso": "mesa_1"},
+    {"id": 2, "especialidades": [1, 2], "recursos_posibles": ["mesa_2"], "preferencia_recurso": "mesa_2"},
+]
+asignador = AsignadorTurnos(profesionales, servicios.get)
+
+def turno(turno_id: int, hora: str, servicio_id: int) -> Turno:
+    return Turno.desde_almacenamiento({
+        "id": turno_id, "cliente_nombre": f"Cliente {turno_id}",
+        "fecha": "2026-10-20", "hora": hora, "servicio_id": servicio_id
+    })
+
+def cargas(asignaciones) -> dict:
+    resultado = {}
+    for t in pendientes:
+        asignacion = asignaciones[t.id]
+        if asignacion:
+            resultado[asignacion[0]] = resultado.get(asignacion[0], 0) + servicios[t.servicio_id].duracion_minutos
+    return resultado
+
+# La voraz reparte los dos cortos uno a cada profesional y, con la carga
+# empatada, da el largo al primero: 120/30. Juntando los dos cortos en un
+# mismo profesional los mismos turnos quedan 60/90.
+pendientes = [turno(1, "09:00", 1), turno(2, "10:00", 1), turno(3, "11:00", 2)]
+fallas = 0
+
+voraz = asignador.asignar(pendientes, exacto=False)
+exacta = asignador.asignar(pendientes, exacto=True)
+carga_voraz, carga_exacta = cargas(voraz), cargas(exacta)
+print(f"     voraz:  {carga_voraz}")
+print(f"     exacta: {carga_exacta}")
+
+if sum(1 for a in exacta.values() if a) < sum(1 for a in voraz.values() if a):
+    print("❌ 1. La búsqueda exacta ubicó menos turnos que la voraz")
+    fallas += 1
+else:
+    print("✅ 1. La búsqueda exacta ubica todos los turnos")
+
+desbalance_voraz = max(carga_voraz.values()) - min(carga_voraz.values())
+desbalance_exacta = max(carga_exacta.values()) - min(carga_exacta.values())
+if sum(carga_exacta.values()) != sum(carga_voraz.values()) or desbalance_exacta >= desbalance_voraz:
+    print("❌ 2. La búsqueda exacta no equilibró la carga")
+    fallas += 1
+else:
+    print(f"✅ 2. Diferencia de carga: {desbalance_voraz} min (voraz) -> {desbalance_exacta} min (exacta)")
+
+print("\n" + "="*60)
+if fallas:
+    print("PRUEBA FALLIDA")
+    print("="*60)
+    sys.exit(1)
+print("PRUEBA COMPLETADA")
+print("="*60)
\ No newline at end of file
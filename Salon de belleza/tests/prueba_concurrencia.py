@@ -0,0 +1,169 @@
+# prueba_concurrencia.py
+"""
+Prueba de estrés: una sola instancia de SistemaSalon usada desde muchos hilos,
+como la que app.py comparte entre sesiones de Streamlit.
+
+Trabaja sobre una copia de data/ en un directorio temporal.
+"""
+import sys
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from io import StringIO
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+HILOS = 16
+OPERACIONES = 600
+
+print("="*60)
+print("PRUEBA DE CONCURRENCIA - SistemaSalon compartido entre hilos")
+print("="*60)
+
+# 1. Copiar los datos a un directorio temporal (sin turnos)
+directorio = tempfile.mkdtemp(prefix="salon_concurrencia_")
+for archivo in ["config.json", "profesionales.json", "servicios.json"]:
+    shutil.copy(os.path.join(RAIZ, "data", archivo), directorio)
+with open(os.path.join(directorio, "turnos.json"), "w", encoding="utf-8") as f:
+    f.write("[]")
+
+with redirect_stdout(StringIO()):
+    from salon_belleza.core.sistema_salon import SistemaSalon
+    sistema = SistemaSalon(directorio)
+sistema.calendario.config["turnos"]["max_turnos_dia"] = 1000
+print(f"✅ 1. Sistema creado sobre {directorio}")
+
+# 2. Fechas con horarios libres para los servicios de la prueba
+servicios = [1, 4, 6, 8, 10]
+fechas = sorted({hueco["fecha"] for hueco in sistema.buscar_proximos_huecos(4, n=60)})[:3]
+if not fechas:
+    print("❌ 2. No hay fechas abiertas para probar")
+    sys.exit(1)
+print(f"✅ 2. Fechas de prueba: {', '.join(fechas)}")
+
+# 3. Operaciones mezcladas desde un pool de hilos
+errores = []
+creados = []
+contadores = {"lecturas": 0, "altas": 0, "rechazos": 0, "cambios_estado": 0}
+mutex_contadores = threading.Lock()
+
+def contar(clave: str):
+    with mutex_contadores:
+        contadores[clave] += 1
+
+def operacion(numero: int):
+    azar = random.Random(numero)
+    fecha = azar.choice(fechas)
+    servicio_id = azar.choice(servicios)
+    tipo = azar.random()
+    try:
+        if tipo < 0.45:
+            disponibilidad = sistema.obtener_disponibilidad(fecha, servicio_id)
+            sistema.obtener_turnos(fecha=fecha)
+            list(sistema.buscar_proximos_huecos(servicio_id, desde=fecha, n=5))
+            sistema.obtener_estadisticas()
+            assert "error" not in disponibilidad, disponibilidad
+            contar("lecturas")
+        elif tipo < 0.85:
+            hora = f"{azar.randint(9, 17):02d}:{azar.choice(['00', '15', '30', '45'])}"
+            exito, _, turno = sistema.crear_turno(
+                f"Cliente {numero}", fecha, hora, servicio_id, asignar_automaticamente=True
+            )
+            if exito:
+                creados.append(turno.id)
+                contar("altas")
+                if azar.random() < 0.5:
+                    sistema.confirmar_turno(turno.id)
+                    contar("cambios_estado")
+            else:
+                contar("rechazos")
+        else:
+            # Solo se cancelan turnos ajenos: confirmar uno ajeno podría
+            # reactivar uno que otro hilo acaba de cancelar
+            turnos = sistema.obtener_turnos(fecha=fecha)
+            if turnos:
+                sistema.cancelar_turno(azar.choice(turnos).id)
+                contar("cambios_estado")
+    except Exception as e:
+        errores.append(f"operación {numero}: {type(e).__name__}: {e}")
+
+# Cambiar de hilo mucho más seguido que lo normal para forzar intercalados
+sys.setswitchinterval(1e-5)
+
+inicio = time.perf_counter()
+with redirect_stdout(StringIO()):
+    with ThreadPoolExecutor(max_workers=HILOS) as pool:
+        list(pool.map(operacion, range(OPERACIONES)))
+duracion = time.perf_counter() - inicio
+
+print(f"✅ 3. {OPERACIONES} operaciones en {HILOS} hilos en {duracion:.2f} s")
+print(f"     {contadores}")
+
+if errores:
+    print(f"❌   {len(errores)} operaciones lanzaron excepciones, por ejemplo:")
+    for error in errores[:5]:
+        print(f"     {error}")
+else:
+    print("✅   Ninguna operación lanzó excepciones")
+
+# 4. Verificar consistencia del resultado
+fallas = 0
+
+turnos = sistema.turno_repository.obtener_todos_turnos()
+ids = [turno.id for turno in turnos]
+if len(ids) != len(set(ids)):
+    print("❌ 4. Hay IDs de turno repetidos")
+    fallas += 1
+elif sorted(map(str, creados)) != sorted(map(str, ids)):
+    print(f"❌ 4. Se crearon {len(creados)} turnos pero hay {len(ids)} guardados")
+    fallas += 1
+else:
+    print(f"✅ 4. Los {len(ids)} turnos creados están guardados con IDs únicos")
+
+superposiciones = 0
+activos = [turno for turno in turnos if turno.estado != "cancelado"]
+for i, a in enumerate(activos):
+    for b in activos[i + 1:]:
+        if a.fecha != b.fecha or a.inicio_minutos >= b.fin_minutos or b.inicio_minutos >= a.fin_minutos:
+            continue
+        if (a.profesional_id and a.profesional_id == b.profesional_id) or (a.recurso and a.recurso == b.recurso):
+            superposiciones += 1
+if superposiciones:
+    print(f"❌ 5. {superposiciones} pares de turnos comparten profesional o recurso")
+    fallas += 1
+else:
+    print("✅ 5. Ningún profesional ni recurso tiene turnos superpuestos")
+
+if sistema.turno_repository.obtener_estadisticas() != sistema.turno_repository.recalcular_estadisticas():
+    print("❌ 6. Los contadores incrementales no coinciden con un recálculo completo")
+    fallas += 1
+else:
+    print("✅ 6. Los contadores incrementales coinciden con un recálculo completo")
+
+faltantes = [
+    turno for turno in activos
+    if turno.profesional_id and not sistema.turno_repository.existe_conflicto_horario(
+        turno.fecha, turno.hora, turno.duracion_minutos, profesional_id=turno.profesional_id
+    )
+]
+if faltantes:
+    print(f"❌ 7. {len(faltantes)} turnos no aparecen en el índice de su fecha")
+    fallas += 1
+else:
+    print("✅ 7. Los índices por fecha reflejan los turnos guardados")
+
+shutil.rmtree(directorio, ignore_errors=True)
+
+print("\n" + "="*60)
+if errores or fallas:
+    print("PRUEBA FALLIDA")
+    print("="*60)
+    sys.exit(1)
+print("PRUEBA COMPLETADA")
+print("="*60)
\ No newline at end of file